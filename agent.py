@@ -1,37 +1,378 @@
 #!/usr/bin/env python3
 """
 Autonomous Trading Agent - 24/7 Bot Manager
-Monitors, restarts, and manages the crypto trading bot
+Monitors, restarts, and manages a pool of crypto trading bots
 """
 import asyncio
 import os
 import sys
 import time
 import json
+import re
 import subprocess
+from collections import deque
 from datetime import datetime, timezone
 from pathlib import Path
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent))
+from utils.heartbeat import HeartbeatMonitor, HEARTBEAT_FD_ENV
 
 # Configuration
 BOT_SCRIPT = "strategies/unified_trading_bot_v3.py"  # Using fixed version
-CHECK_INTERVAL = 60  # seconds between health checks
-MAX_RESTARTS_PER_HOUR = 5
+BOTS_CONFIG_FILE = "config/bots.json"  # Declarative instance list (falls back to BOT_SCRIPT)
+CHECK_INTERVAL = 60  # seconds between status reports
+HEALTH_CHECK_INTERVAL = 5  # seconds between liveness checks
+MAX_RESTARTS_PER_HOUR = 5  # default per-instance restart budget
 RESTART_COOLDOWN = 60  # seconds to wait before restart
+RESTART_RETRY_DELAY = 300  # seconds to wait after a failed restart
+STOP_TIMEOUT = 10  # seconds to wait for a bot to exit after SIGTERM
 STATE_FILE = "data/agent_state.json"
 LOG_FILE = "logs/agent.log"
 
-class TradingAgent:
-    def __init__(self):
+# Liveness (heartbeat) thresholds
+STARTUP_GRACE_SEC = 180    # Time allowed for exchange init + history before the first beat
+HEARTBEAT_LAG_WARN_SEC = 10  # Loop iteration slower than this → warning
+HEARTBEAT_STALL_SEC = 60   # No loop progress for this long → restart (SL verify worst case is ~40s)
+MAX_CANDLE_AGE_SEC = 120   # No market data for this long → dead feed, restart
+
+# Bot output forwarding (batched, rate-limited)
+OUTPUT_RING_SIZE = 500          # Recent bot lines kept in memory for crash forensics
+OUTPUT_FLUSH_INTERVAL = 1.0     # Seconds between batched writes to the agent log
+OUTPUT_FLUSH_LINES = 200        # Flush early once this many lines are pending
+OUTPUT_MAX_LINES_PER_SEC = 50   # Lines forwarded per second; the excess is counted, not written
+ALERT_MAX_PER_MINUTE = 10       # Error alerts logged per minute per instance
+ALERT_PATTERN = re.compile(rb'ERROR|EXCEPTION|Traceback|CIRCUIT BREAKER', re.IGNORECASE)
+CRASH_DUMP_DIR = "logs/crash"
+
+DEFAULT_INSTANCE = 'default'
+HEARTBEAT_SCRIPTS = {"strategies/unified_trading_bot_v3.py"}  # Scripts that write heartbeats (utils/heartbeat.py)
+
+
+class OutputForwarder:
+    """
+    Consumes a bot's stdout without per-line file I/O: lines are batched into
+    the agent log, matched against ALERT_PATTERN on raw bytes, and the last
+    OUTPUT_RING_SIZE lines are kept for a crash dump
+    """
+
+    def __init__(self, instance):
+        self.instance = instance
+        self.ring = deque(maxlen=OUTPUT_RING_SIZE)
+        self.pending = []
+        self.suppressed = 0
+        self.window_start = 0.0
+        self.window_lines = 0
+        self.alert_window_start = 0.0
+        self.alerts_in_window = 0
+        self.alerts_suppressed = 0
+        self.last_flush = time.monotonic()
+
+    async def run(self, stream):
+        try:
+            async for line in stream:
+                line = line.rstrip()
+                if not line:
+                    continue
+                now = time.monotonic()
+                self.ring.append(line)
+
+                if ALERT_PATTERN.search(line):
+                    self.alert(line, now)
+
+                # Rate limit what reaches the log file
+                if now - self.window_start >= 1.0:
+                    self.window_start = now
+                    self.window_lines = 0
+                if self.window_lines < OUTPUT_MAX_LINES_PER_SEC:
+                    self.window_lines += 1
+                    self.pending.append(line)
+                else:
+                    self.suppressed += 1
+
+                if len(self.pending) >= OUTPUT_FLUSH_LINES or now - self.last_flush >= OUTPUT_FLUSH_INTERVAL:
+                    await self.flush()
+        except Exception as e:
+            self.instance.log(f"Output monitoring error: {e}", "ERROR")
+        finally:
+            await self.flush()
+
+    def alert(self, line, now):
+        if now - self.alert_window_start >= 60:
+            if self.alerts_suppressed:
+                self.instance.log(f"⚠️ {self.alerts_suppressed} more bot errors suppressed in the last minute", "WARNING")
+            self.alert_window_start = now
+            self.alerts_in_window = 0
+            self.alerts_suppressed = 0
+        if self.alerts_in_window < ALERT_MAX_PER_MINUTE:
+            self.alerts_in_window += 1
+            self.instance.log(f"⚠️ Bot error detected: {line.decode(errors='replace')}", "WARNING")
+        else:
+            self.alerts_suppressed += 1
+
+    async def flush(self):
+        self.last_flush = time.monotonic()
+        if not self.pending and not self.suppressed:
+            return
+        timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
+        prefix = f"[{timestamp}] [INFO] [{self.instance.tag}] "
+        chunk = ''.join(f"{prefix}{line.decode(errors='replace')}\n" for line in self.pending)
+        if self.suppressed:
+            chunk += f"{prefix}... {self.suppressed} lines not forwarded (rate limit)\n"
+        self.pending = []
+        self.suppressed = 0
+        await asyncio.get_running_loop().run_in_executor(None, self._append, LOG_FILE, chunk)
+
+    @staticmethod
+    def _append(path, chunk):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'a') as f:
+                f.write(chunk)
+        except Exception as e:
+            print(f"Failed to write log: {e}")
+
+    def dump(self, reason):
+        """Write the recent-output ring buffer to a crash file. Returns the path."""
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')
+        path = os.path.join(CRASH_DUMP_DIR, f"{self.instance.name}_{stamp}.log")
+        header = f"# {self.instance.name} | {reason} | last {len(self.ring)} lines\n"
+        self._append(path, header + ''.join(line.decode(errors='replace') + '\n' for line in self.ring))
+        return path
+
+
+class BotInstance:
+    """One supervised bot process with its own restart budget and liveness monitor"""
+
+    def __init__(self, agent, spec):
+        self.agent = agent
+        self.spec = spec
+        self.name = spec['name']
         self.process = None
         self.restart_count = 0
         self.restart_timestamps = []
+        self.restart_at = None  # Scheduled (re)start time, None while running
+        self.liveness_state = None
+        self.unhealthy_reason = None
+        self.output = None
+        self.heartbeat = HeartbeatMonitor(
+            stall_sec=spec.get('stall_sec', HEARTBEAT_STALL_SEC),
+            lag_warn_sec=HEARTBEAT_LAG_WARN_SEC,
+            max_candle_age_sec=spec.get('max_candle_age_sec', MAX_CANDLE_AGE_SEC),
+            startup_grace_sec=STARTUP_GRACE_SEC,
+        )
+
+    @property
+    def tag(self):
+        return "BOT" if self.name == DEFAULT_INSTANCE else f"BOT:{self.name}"
+
+    @property
+    def uses_heartbeat(self):
+        # Opt-in: a script that never beats would be restarted as stalled after the grace period
+        return self.spec.get('heartbeat', os.path.normpath(self.spec['script']) in HEARTBEAT_SCRIPTS)
+
+    @property
+    def state(self):
+        return self.agent.state.setdefault('instances', {}).setdefault(self.name, {
+            'total_restarts': 0,
+            'last_started': None,
+            'last_crash': None,
+        })
+
+    def log(self, message, level="INFO"):
+        self.agent.log(f"[{self.name}] {message}", level)
+
+    def is_running(self):
+        return self.process is not None and self.process.returncode is None
+
+    def can_restart(self):
+        """Check if we can restart (per-instance rate limiting)"""
+        budget = self.spec.get('max_restarts_per_hour', MAX_RESTARTS_PER_HOUR)
+        now = time.time()
+        # Remove old timestamps (older than 1 hour)
+        self.restart_timestamps = [ts for ts in self.restart_timestamps if now - ts < 3600]
+
+        if len(self.restart_timestamps) >= budget:
+            self.log(f"⛔ Restart limit reached ({budget}/hour). Waiting...", "WARNING")
+            return False
+        return True
+
+    def build_env(self):
+        env = {**os.environ, 'PYTHONUNBUFFERED': '1', 'BOT_INSTANCE': self.name}  # Force unbuffered
+        if self.spec.get('symbol'):
+            env['BOT_SYMBOL'] = self.spec['symbol']
+        if self.spec.get('timeframe'):
+            env['BOT_TIMEFRAME'] = self.spec['timeframe']
+        env.update({k: str(v) for k, v in self.spec.get('env', {}).items()})
+        return env
+
+    def pin_cpus(self):
+        """Pin the bot process to the configured CPU(s) (Linux only)"""
+        cpus = self.spec.get('cpu')
+        if cpus is None or not hasattr(os, 'sched_setaffinity'):
+            return
+        cpus = {cpus} if isinstance(cpus, int) else set(cpus)
+        try:
+            os.sched_setaffinity(self.process.pid, cpus)
+            self.log(f"Pinned to CPU(s) {sorted(cpus)}")
+        except OSError as e:
+            self.log(f"CPU pinning failed (non-fatal): {e}", "WARNING")
+
+    async def start(self, count_restart=True):
+        """Start the bot subprocess"""
+        if count_restart and not self.can_restart():
+            return False
+
+        try:
+            self.log(f"🚀 Starting {self.spec['script']}...")
+            # Use venv Python if available, otherwise system Python
+            venv_python = os.path.join(os.path.dirname(os.path.abspath(__file__)), "venv/bin/python3")
+            python_executable = venv_python if os.path.exists(venv_python) else sys.executable
+            env = self.build_env()
+
+            # Heartbeat pipe: the bot writes liveness beats to hb_write
+            hb_read = hb_write = None
+            pass_fds = ()
+            if self.uses_heartbeat:
+                hb_read, hb_write = self.heartbeat.open_pipe()
+                env[HEARTBEAT_FD_ENV] = str(hb_write)
+                pass_fds = (hb_write,)
+            try:
+                self.process = await asyncio.create_subprocess_exec(
+                    python_executable, "-u", self.spec['script'], *self.spec.get('args', []),  # -u for unbuffered output
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.STDOUT,
+                    cwd=os.path.dirname(os.path.abspath(__file__)),
+                    env=env,
+                    pass_fds=pass_fds,
+                )
+            except Exception:
+                if hb_read is not None:
+                    os.close(hb_read)
+                raise
+            finally:
+                if hb_write is not None:
+                    os.close(hb_write)
+            if hb_read is not None:
+                self.heartbeat.attach(hb_read)
+            self.liveness_state = None
+            self.restart_at = None
+            self.pin_cpus()
+
+            if count_restart:
+                self.restart_count += 1
+                self.restart_timestamps.append(time.time())
+            self.state['total_restarts'] = self.state.get('total_restarts', 0) + 1
+            self.state['last_started'] = datetime.now(timezone.utc).isoformat()
+            self.agent.state['total_restarts'] = self.agent.state.get('total_restarts', 0) + 1
+            self.agent.save_state()
+
+            # Monitor bot output in background
+            self.output = OutputForwarder(self)
+            asyncio.create_task(self.output.run(self.process.stdout))
+
+            self.log(f"✅ Bot started (PID: {self.process.pid})")
+            return True
+
+        except Exception as e:
+            self.log(f"❌ Failed to start bot: {e}", "ERROR")
+            return False
+
+    async def stop(self, graceful=True):
+        """Stop the bot subprocess (SIGTERM first when graceful)"""
+        if self.is_running():
+            try:
+                if graceful:
+                    self.process.terminate()
+                    await asyncio.wait_for(self.process.wait(), timeout=STOP_TIMEOUT)
+                else:
+                    self.process.kill()
+                    await self.process.wait()
+            except:
+                try:
+                    self.process.kill()
+                    await self.process.wait()
+                except:
+                    pass
+        self.heartbeat.close()
+
+    def check_health(self):
+        """Check if bot is running and healthy"""
+        if not self.process:
+            self.log("Bot process not found", "WARNING")
+            self.unhealthy_reason = "process not found"
+            return False
+
+        # Check if process is still running
+        if self.process.returncode is not None:
+            self.log(f"Bot exited with code {self.process.returncode}", "WARNING")
+            self.unhealthy_reason = f"exit code {self.process.returncode}"
+            self.state['last_crash'] = datetime.now(timezone.utc).isoformat()
+            self.agent.state['last_crash'] = self.state['last_crash']
+            self.agent.save_state()
+            return False
+
+        if not self.uses_heartbeat:
+            return True
+
+        # Check liveness reported over the heartbeat pipe
+        liveness, detail = self.heartbeat.status()
+        if liveness != self.liveness_state:
+            if liveness == 'lagging':
+                self.log(f"⏳ Bot lagging: {detail}", "WARNING")
+            elif liveness == 'ok' and self.liveness_state == 'lagging':
+                self.log(f"Bot recovered: {detail}")
+            self.liveness_state = liveness
+
+        if liveness in ('stalled', 'stale_data'):
+            self.log(f"Bot {liveness}: {detail}", "WARNING")
+            self.unhealthy_reason = f"{liveness}: {detail}"
+            self.state['last_stall'] = datetime.now(timezone.utc).isoformat()
+            self.state['last_stall_reason'] = detail
+            self.agent.save_state()
+            return False
+
+        return True
+
+    async def supervise(self):
+        """One supervision step: health check, kill, and scheduled restarts"""
+        if self.restart_at is not None:
+            if time.time() >= self.restart_at:
+                if not await self.start():
+                    self.log(f"❌ Failed to restart bot. Retrying in {RESTART_RETRY_DELAY}s...", "ERROR")
+                    self.restart_at = time.time() + RESTART_RETRY_DELAY
+            return
+
+        if not self.check_health():
+            self.log("🔄 Bot unhealthy, attempting restart...")
+            await self.stop(graceful=False)
+            if self.output:
+                await self.output.flush()
+                self.log(f"Recent output saved to {self.output.dump(self.unhealthy_reason)}")
+            self.log(f"Waiting {RESTART_COOLDOWN}s before restart...")
+            self.restart_at = time.time() + RESTART_COOLDOWN
+        elif self.output and self.output.pending:
+            # Quiet bots still get their last lines written out
+            await self.output.flush()
+
+    def status_line(self):
+        if self.restart_at is not None:
+            return f"[{self.name}] restart pending in {max(0, self.restart_at - time.time()):.0f}s"
+        summary = f" | {self.heartbeat.summary()}" if self.uses_heartbeat else ""
+        return f"[{self.name}] ✓ healthy | Restarts: {self.restart_count}{summary}"
+
+
+class TradingAgent:
+    """Supervises a pool of bot instances declared in BOTS_CONFIG_FILE"""
+
+    def __init__(self):
+        self.instances = {}  # {name: BotInstance}
         self.start_time = datetime.now(timezone.utc)
         self.last_check = None
+        self.last_status_report = 0
+        self.config_mtime = -1  # Forces the initial load (a missing file has mtime None)
         self.state = self.load_state()
-        
+
     def load_state(self):
         """Load agent state from disk"""
         try:
@@ -45,7 +386,7 @@ class TradingAgent:
             'last_started': None,
             'last_crash': None,
         }
-    
+
     def save_state(self):
         """Save agent state to disk"""
         try:
@@ -55,157 +396,126 @@ class TradingAgent:
                 json.dump(self.state, f, indent=2)
         except Exception as e:
             self.log(f"Failed to save state: {e}")
-    
+
     def log(self, message, level="INFO"):
         """Log message to file and console"""
         timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
         log_line = f"[{timestamp}] [{level}] {message}\n"
         print(log_line.strip())
-        
+
         try:
             os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
             with open(LOG_FILE, 'a') as f:
                 f.write(log_line)
         except Exception as e:
             print(f"Failed to write log: {e}")
-    
-    def can_restart(self):
-        """Check if we can restart (rate limiting)"""
-        now = time.time()
-        # Remove old timestamps (older than 1 hour)
-        self.restart_timestamps = [ts for ts in self.restart_timestamps if now - ts < 3600]
-        
-        if len(self.restart_timestamps) >= MAX_RESTARTS_PER_HOUR:
-            self.log(f"⛔ Restart limit reached ({MAX_RESTARTS_PER_HOUR}/hour). Waiting...", "WARNING")
-            return False
-        return True
-    
-    async def start_bot(self):
-        """Start the trading bot subprocess"""
-        if not self.can_restart():
-            return False
-        
+
+    def load_instance_specs(self):
+        """
+        Read the declarative instance list
+        Returns: {name: spec}, or None if the config is invalid
+        """
+        if not os.path.exists(BOTS_CONFIG_FILE):
+            return {DEFAULT_INSTANCE: {'name': DEFAULT_INSTANCE, 'script': BOT_SCRIPT}}
+
         try:
-            self.log("🚀 Starting trading bot...")
-            # Use venv Python if available, otherwise system Python
-            venv_python = os.path.join(os.path.dirname(os.path.abspath(__file__)), "venv/bin/python3")
-            python_executable = venv_python if os.path.exists(venv_python) else sys.executable
-            
-            self.process = await asyncio.create_subprocess_exec(
-                python_executable, "-u", BOT_SCRIPT,  # -u for unbuffered output
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.STDOUT,
-                cwd=os.path.dirname(os.path.abspath(__file__)),
-                env={**os.environ, 'PYTHONUNBUFFERED': '1'}  # Force unbuffered
-            )
-            
-            self.restart_count += 1
-            self.restart_timestamps.append(time.time())
-            self.state['total_restarts'] = self.state.get('total_restarts', 0) + 1
-            self.save_state()
-            
-            # Monitor bot output in background
-            asyncio.create_task(self.monitor_output())
-            
-            self.log(f"✅ Bot started (PID: {self.process.pid})")
-            return True
-            
+            with open(BOTS_CONFIG_FILE, 'r') as f:
+                config = json.load(f)
         except Exception as e:
-            self.log(f"❌ Failed to start bot: {e}", "ERROR")
-            return False
-    
-    async def monitor_output(self):
-        """Monitor bot output and log it"""
-        if not self.process or not self.process.stdout:
-            return
-        
+            self.log(f"Failed to read {BOTS_CONFIG_FILE}: {e}", "ERROR")
+            return None
+
+        specs = {}
+        for spec in config.get('instances', []):
+            if not spec.get('enabled', True):
+                continue
+            name = spec.get('name')
+            if not name or not spec.get('script'):
+                self.log(f"Invalid instance (needs name and script): {spec}", "ERROR")
+                return None
+            if name in specs:
+                self.log(f"Duplicate instance name: {name}", "ERROR")
+                return None
+            if not os.path.exists(os.path.join(os.path.dirname(os.path.abspath(__file__)), spec['script'])):
+                self.log(f"Instance {name}: script not found: {spec['script']}", "ERROR")
+                return None
+            specs[name] = spec
+        return specs
+
+    def config_changed(self):
         try:
-            async for line in self.process.stdout:
-                output = line.decode().strip()
-                if output:
-                    # Forward bot output to agent log
-                    self.log(f"[BOT] {output}")
-                    
-                    # Check for critical errors
-                    if "ERROR" in output.upper() or "EXCEPTION" in output.upper():
-                        self.log(f"⚠️ Bot error detected: {output}", "WARNING")
-        except Exception as e:
-            self.log(f"Output monitoring error: {e}", "ERROR")
-    
-    async def check_health(self):
-        """Check if bot is running and healthy"""
-        self.last_check = datetime.now(timezone.utc)
-        
-        if not self.process:
-            self.log("Bot process not found", "WARNING")
-            return False
-        
-        # Check if process is still running
-        if self.process.returncode is not None:
-            self.log(f"Bot exited with code {self.process.returncode}", "WARNING")
-            self.state['last_crash'] = datetime.now(timezone.utc).isoformat()
-            self.save_state()
+            mtime = os.path.getmtime(BOTS_CONFIG_FILE)
+        except OSError:
+            mtime = None
+        if mtime == self.config_mtime:
             return False
-        
+        self.config_mtime = mtime
         return True
-    
+
+    async def apply_config(self):
+        """Start, stop or restart instances so the pool matches the config; untouched instances keep running"""
+        specs = self.load_instance_specs()
+        if specs is None:
+            self.log("Keeping current instances (config invalid)", "WARNING")
+            return
+
+        for name in list(self.instances):
+            if name not in specs:
+                self.log(f"➖ Removing instance {name}")
+                await self.instances.pop(name).stop()
+
+        for name, spec in specs.items():
+            instance = self.instances.get(name)
+            if instance is None:
+                self.log(f"➕ Adding instance {name} ({spec['script']})")
+                instance = BotInstance(self, spec)
+                self.instances[name] = instance
+                await instance.start()
+            elif instance.spec != spec:
+                self.log(f"♻️ Instance {name} changed, restarting")
+                await instance.stop()
+                instance.spec = spec
+                await instance.start(count_restart=False)
+
     async def run(self):
         """Main agent loop"""
         self.log("═" * 60)
         self.log("AUTONOMOUS TRADING AGENT STARTED")
-        self.log(f"Managing bot: {BOT_SCRIPT}")
-        self.log(f"Check interval: {CHECK_INTERVAL}s")
-        self.log(f"Max restarts/hour: {MAX_RESTARTS_PER_HOUR}")
+        self.log(f"Instance config: {BOTS_CONFIG_FILE} (default: {BOT_SCRIPT})")
+        self.log(f"Check interval: {HEALTH_CHECK_INTERVAL}s (stall after {HEARTBEAT_STALL_SEC}s)")
+        self.log(f"Max restarts/hour per instance: {MAX_RESTARTS_PER_HOUR} (unless overridden)")
         self.log("═" * 60)
-        
-        # Start the bot initially
-        await self.start_bot()
-        
+
         try:
             while True:
-                await asyncio.sleep(CHECK_INTERVAL)
-                
-                is_healthy = await self.check_health()
-                
-                if not is_healthy:
-                    self.log("🔄 Bot unhealthy, attempting restart...")
-                    
-                    # Cleanup old process
-                    if self.process:
-                        try:
-                            self.process.kill()
-                            await self.process.wait()
-                        except:
-                            pass
-                    
-                    # Wait before restart
-                    self.log(f"Waiting {RESTART_COOLDOWN}s before restart...")
-                    await asyncio.sleep(RESTART_COOLDOWN)
-                    
-                    # Restart
-                    success = await self.start_bot()
-                    if not success:
-                        self.log("❌ Failed to restart bot. Waiting before retry...", "ERROR")
-                        await asyncio.sleep(300)  # Wait 5 minutes
-                else:
+                # Pick up instance list changes without touching healthy instances
+                if self.config_changed():
+                    await self.apply_config()
+
+                self.last_check = datetime.now(timezone.utc)
+                for instance in list(self.instances.values()):
+                    await instance.supervise()
+
+                if time.time() - self.last_status_report >= CHECK_INTERVAL:
+                    self.last_status_report = time.time()
                     uptime = (datetime.now(timezone.utc) - self.start_time).total_seconds()
-                    self.log(f"✓ Bot healthy | Uptime: {uptime/3600:.1f}h | Restarts: {self.restart_count}")
-        
+                    self.log(f"✓ Agent uptime: {uptime/3600:.1f}h | Instances: {len(self.instances)}")
+                    for instance in self.instances.values():
+                        self.log(instance.status_line())
+
+                await asyncio.sleep(HEALTH_CHECK_INTERVAL)
+
         except KeyboardInterrupt:
             self.log("🛑 Agent stopped by user")
         except Exception as e:
             self.log(f"❌ Agent error: {e}", "ERROR")
         finally:
             # Cleanup
-            if self.process:
-                self.log("Stopping bot...")
-                try:
-                    self.process.terminate()
-                    await asyncio.wait_for(self.process.wait(), timeout=10)
-                except:
-                    self.process.kill()
-                    await self.process.wait()
-            
+            if self.instances:
+                self.log("Stopping bots...")
+                await asyncio.gather(*(instance.stop() for instance in self.instances.values()),
+                                     return_exceptions=True)
+
             self.log("Agent shutdown complete")
 
 
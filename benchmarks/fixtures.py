@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Candle fixtures for the benchmarks
+Synthetic candles are deterministic (seeded) so runs are comparable; a recorded
+OHLCV CSV (e.g. the signal generator output) can be used instead.
+"""
+import numpy as np
+import pandas as pd
+
+TIMEFRAME_MS = {'1m': 60_000, '3m': 180_000, '5m': 300_000, '15m': 900_000, '1h': 3_600_000}
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+def synthetic_candles(n: int = 2000, seed: int = 7, start_price: float = 2500.0,
+                      timeframe: str = '3m', start_ms: int = 1_700_000_000_000) -> list:
+    """
+    Random-walk candles with trending/ranging regimes and volume-backed breakouts,
+    so the momentum-breakout rules actually fire. Returns ccxt-style [ts, o, h, l, c, v] rows.
+    """
+    rng = np.random.default_rng(seed)
+    step = TIMEFRAME_MS[timeframe]
+
+    # Regimes of 30-120 bars with their own drift and volatility
+    drift = np.empty(n)
+    vol = np.empty(n)
+    i = 0
+    while i < n:
+        length = int(rng.integers(30, 120))
+        drift[i:i + length] = rng.normal(0, 0.0006)
+        vol[i:i + length] = rng.uniform(0.0008, 0.003)
+        i += length
+
+    returns = rng.normal(drift, vol)
+    volume = rng.lognormal(mean=6.0, sigma=0.35, size=n)
+
+    # Breakouts: a calm trend, a two-bar dip below the middle band, a turn bar,
+    # then a strong bar back through the band on heavy volume plus continuation
+    for start in np.flatnonzero(rng.random(n) < 0.02):
+        if start < 30 or start + 3 >= n:
+            continue
+        d = rng.choice([-1.0, 1.0])
+        vol[start - 20:start + 3] = 0.0002
+        returns[start - 20:start - 3] = rng.normal(d * 0.0003, 0.0001, size=17)
+        returns[start - 3:start - 1] = -d * 0.002
+        returns[start - 1] = d * 0.0004
+        returns[start] = d * rng.uniform(0.005, 0.007)
+        returns[start + 1:start + 3] = d * rng.uniform(0.001, 0.002, size=2)
+        volume[start:start + 3] *= rng.uniform(2.5, 4.0, size=3)
+
+    close = start_price * np.exp(np.cumsum(returns))
+    open_ = np.concatenate([[start_price], close[:-1]])
+    wick = np.abs(rng.normal(0, vol, size=(2, n))) * close
+    high = np.maximum(open_, close) + wick[0]
+    low = np.minimum(open_, close) - wick[1]
+
+    ts = start_ms + np.arange(n, dtype=np.int64) * step
+    return [[int(t), float(o), float(h), float(l), float(c), float(v)]
+            for t, o, h, l, c, v in zip(ts, open_, high, low, close, volume)]
+
+
+def load_recorded_candles(path: str) -> list:
+    """ccxt-style rows from a recorded OHLCV CSV with a timestamp column"""
+    df = pd.read_csv(path, usecols=OHLCV_COLUMNS)
+    ts = pd.to_datetime(df['timestamp']).astype('int64') // 1_000_000
+    values = df[['open', 'high', 'low', 'close', 'volume']].astype(float).to_numpy()
+    return [[int(t), *row] for t, row in zip(ts, values.tolist())]
+
+
+def candles_to_df(candles: list) -> pd.DataFrame:
+    """Same frame layout the bots build from fetch_ohlcv"""
+    df = pd.DataFrame(candles, columns=OHLCV_COLUMNS)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    return df
+
+
+def intra_candle_updates(candle: list, updates: int = 4) -> list:
+    """
+    Split a closed candle into the partial kline pushes a websocket would deliver:
+    the running high/low/close converge to the final candle on the last update
+    """
+    ts, o, h, l, c, v = candle
+    rows = []
+    for k in range(1, updates):
+        price = o + (c - o) * k / updates
+        rows.append([ts, o, max(o, price), min(o, price), price, v * k / updates])
+    rows.append(list(candle))
+    return rows
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Local Binance USD-M order-entry stub
+Answers the REST order endpoints (/fapi/v1/order, /algoOrder, /batchOrders) and the
+ws-fapi trading API (order.place, algoOrder.place, order.cancel, v2/account.balance) on
+127.0.0.1, so a real ccxt.pro client can exercise utils/order_transport.py offline.
+Signatures are not checked; market orders fill in full at STUB_PRICE.
+
+latency_ms delays every answer (the same for both transports) to stand in for the
+exchange's own processing time; the network difference is what the comparison measures.
+drop_ws_acks = True places websocket orders without answering, to exercise the
+transport's lookup-by-client-id fallback (GET /fapi/v1/order and /algoOrder).
+
+Usage:
+    stub = OrderStub(latency_ms=0)
+    await stub.start()
+    exchange = stub.client()               # binanceusdm pointed at the stub
+    ...
+    await exchange.close(); await stub.stop()
+"""
+import asyncio
+import itertools
+import json
+import time
+
+from aiohttp import WSMsgType, web
+
+STUB_SYMBOL = 'ETH/USDT:USDT'
+STUB_PRICE = 3000.0
+
+# exchangeInfo entry the client's market is parsed from (no markets request needed)
+STUB_MARKET_INFO = {
+    'symbol': 'ETHUSDT', 'pair': 'ETHUSDT', 'contractType': 'PERPETUAL', 'status': 'TRADING',
+    'baseAsset': 'ETH', 'quoteAsset': 'USDT', 'marginAsset': 'USDT',
+    'pricePrecision': 2, 'quantityPrecision': 3, 'baseAssetPrecision': 8, 'quotePrecision': 8,
+    'onboardDate': 1569398400000, 'deliveryDate': 4133404800000, 'underlyingType': 'COIN',
+    'orderTypes': ['LIMIT', 'MARKET', 'STOP', 'STOP_MARKET', 'TAKE_PROFIT', 'TAKE_PROFIT_MARKET', 'TRAILING_STOP_MARKET'],
+    'timeInForce': ['GTC', 'IOC', 'FOK', 'GTX', 'GTD'],
+    'filters': [
+        {'filterType': 'PRICE_FILTER', 'minPrice': '39.86', 'maxPrice': '306177', 'tickSize': '0.01'},
+        {'filterType': 'LOT_SIZE', 'minQty': '0.001', 'maxQty': '10000', 'stepSize': '0.001'},
+        {'filterType': 'MARKET_LOT_SIZE', 'minQty': '0.001', 'maxQty': '10000', 'stepSize': '0.001'},
+        {'filterType': 'MIN_NOTIONAL', 'notional': '20'},
+    ],
+}
+
+
+class OrderStub:
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+        self.drop_ws_acks = False
+        self.orders = {}  # client id → order
+        self.calls = {}
+        self._ids = itertools.count(1000)
+        self._runner = None
+        self.port = None
+
+    # ── lifecycle ──
+    async def start(self, port: int = 0):
+        app = web.Application()
+        app.router.add_post('/fapi/v1/order', self._rest_order)
+        app.router.add_post('/fapi/v1/algoOrder', self._rest_algo_order)
+        app.router.add_post('/fapi/v1/batchOrders', self._rest_batch)
+        app.router.add_delete('/fapi/v1/order', self._rest_cancel)
+        app.router.add_get('/fapi/v1/order', self._rest_fetch)
+        app.router.add_get('/fapi/v1/algoOrder', self._rest_fetch)
+        app.router.add_get('/ws-fapi/v1', self._ws)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    def client(self):
+        """ccxt.pro binanceusdm with REST and ws-fapi URLs pointed at the stub"""
+        import ccxt.pro as ccxtpro
+        exchange = ccxtpro.binanceusdm({'apiKey': 'stub', 'secret': 'stub', 'enableRateLimit': False})
+        http, ws = f"http://127.0.0.1:{self.port}", f"ws://127.0.0.1:{self.port}"
+        exchange.urls['api']['fapiPrivate'] = f"{http}/fapi/v1"
+        exchange.urls['api']['ws']['ws-api']['future'] = f"{ws}/ws-fapi/v1"
+        exchange.set_markets([exchange.parse_market(STUB_MARKET_INFO)])
+        return exchange
+
+    def _count(self, name: str):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    # ── orders ──
+    def _order(self, params: dict) -> dict:
+        now = int(time.time() * 1000)
+        qty = params.get('quantity', '0')
+        market = params.get('type', 'MARKET') == 'MARKET'
+        return self._store(params.get('newClientOrderId'), {
+            'orderId': next(self._ids), 'symbol': params.get('symbol', 'ETHUSDT'),
+            'clientOrderId': params.get('newClientOrderId', ''), 'side': params.get('side'),
+            'type': params.get('type'), 'origType': params.get('type'), 'positionSide': 'BOTH',
+            'status': 'FILLED' if market else 'NEW', 'price': '0', 'avgPrice': f"{STUB_PRICE:.2f}" if market else '0',
+            'origQty': qty, 'executedQty': qty if market else '0', 'cumQuote': f"{STUB_PRICE * float(qty):.2f}" if market else '0',
+            'reduceOnly': params.get('reduceOnly') in (True, 'true'), 'timeInForce': params.get('timeInForce', 'GTC'),
+            'stopPrice': params.get('stopPrice', '0'), 'workingType': 'CONTRACT_PRICE', 'updateTime': now,
+        })
+
+    def _algo_order(self, params: dict) -> dict:
+        return self._store(params.get('clientAlgoId'), {
+            'algoId': next(self._ids), 'clientAlgoId': params.get('clientAlgoId', ''), 'algoType': 'CONDITIONAL',
+            'orderType': params.get('type'), 'symbol': params.get('symbol', 'ETHUSDT'), 'side': params.get('side'),
+            'positionSide': 'BOTH', 'quantity': params.get('quantity', '0'), 'algoStatus': 'NEW',
+            'triggerPrice': params.get('triggerPrice', '0'), 'price': '0', 'reduceOnly': True,
+            'timeInForce': params.get('timeInForce', 'GTC'), 'createTime': int(time.time() * 1000),
+        })
+
+    def _store(self, client_id, order: dict) -> dict:
+        if client_id:
+            self.orders[client_id] = order
+        return order
+
+    def _cancelled(self, params: dict) -> dict:
+        order = dict(self._order({'symbol': params.get('symbol'), 'type': 'STOP_MARKET', 'side': 'SELL'}))
+        order.update(orderId=int(params.get('orderId') or 0), status='CANCELED')
+        return order
+
+    async def _answer(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    # ── REST ──
+    async def _rest_order(self, request):
+        self._count('rest:order')
+        await self._answer()
+        return web.json_response(self._order(dict(request.query) | dict(await request.post())))
+
+    async def _rest_algo_order(self, request):
+        self._count('rest:algoOrder')
+        await self._answer()
+        return web.json_response(self._algo_order(dict(request.query) | dict(await request.post())))
+
+    async def _rest_batch(self, request):
+        self._count('rest:batchOrders')
+        params = dict(request.query) | dict(await request.post())
+        await self._answer()
+        return web.json_response([self._order(o) for o in json.loads(params.get('batchOrders', '[]'))])
+
+    async def _rest_cancel(self, request):
+        self._count('rest:cancel')
+        await self._answer()
+        return web.json_response(self._cancelled(dict(request.query)))
+
+    async def _rest_fetch(self, request):
+        self._count('rest:fetch')
+        client_id = request.query.get('origClientOrderId') or request.query.get('clientAlgoId')
+        if client_id not in self.orders:
+            return web.json_response({'code': -2013, 'msg': 'Order does not exist.'}, status=400)
+        return web.json_response(self.orders[client_id])
+
+    # ── ws-fapi ──
+    async def _ws(self, request):
+        ws = web.WebSocketResponse(autoping=True)
+        await ws.prepare(request)
+        pending = set()
+        async for message in ws:
+            if message.type != WSMsgType.TEXT:
+                continue
+            # Requests are answered concurrently, like the exchange (responses may overtake)
+            task = asyncio.create_task(self._ws_request(ws, json.loads(message.data)))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        return ws
+
+    async def _ws_request(self, ws, request: dict):
+        method, params = request.get('method'), request.get('params', {})
+        self._count(f"ws:{method}")
+        await self._answer()
+        if method == 'order.place':
+            result = self._order(params)
+        elif method == 'algoOrder.place':
+            result = self._algo_order(params)
+        elif method == 'order.cancel':
+            result = self._cancelled(params)
+        elif method == 'v2/account.balance':
+            result = [{'accountAlias': 'stub', 'asset': 'USDT', 'balance': '100000', 'crossWalletBalance': '100000',
+                       'availableBalance': '100000', 'maxWithdrawAmount': '100000', 'updateTime': 0}]
+        else:
+            await ws.send_json({'id': request.get('id'), 'status': 400, 'error': {'code': -1, 'msg': f'unknown method {method}'}})
+            return
+        if not ws.closed and not self.drop_ws_acks:
+            await ws.send_json({'id': request.get('id'), 'status': 200, 'result': result})
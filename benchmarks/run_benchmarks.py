@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+Hot-path benchmarks for the v3 bot
+Times the per-candle work of strategies/unified_trading_bot_v3.py against a simulated
+exchange (no network, asyncio.sleep patched to zero) and compares the result with a
+stored baseline. The order_transport[*] benchmarks time REST against ws-fapi order
+entry on a local stub server (benchmarks/order_stub.py, 127.0.0.1 only); history_merge
+times the timestamp merge of a year of downloaded history pages (utils/candle_store.py).
+
+Usage:
+    python3 benchmarks/run_benchmarks.py                   # run, save, compare with baseline
+    python3 benchmarks/run_benchmarks.py --save-baseline   # ...and make this run the baseline
+    python3 benchmarks/run_benchmarks.py --quick           # fewer iterations
+    python3 benchmarks/run_benchmarks.py --fixture FILE    # recorded OHLCV CSV instead of synthetic candles
+
+Results go to benchmarks/results/ (<UTC time>.json, latest.json, baseline.json).
+benchmarks/thresholds.json sets the allowed slowdown of the median ns/call per
+benchmark ("default" applies to the rest). Exit status is 1 on a regression.
+
+Reported per benchmark: ns per call (median / mean / p95 / min), peak traced memory
+during the calls, and net memory blocks allocated per call (retained allocations).
+"""
+import asyncio
+import contextlib
+import gc
+import inspect
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+from benchmarks.fixtures import synthetic_candles, load_recorded_candles, candles_to_df
+from benchmarks.sim_exchange import SimExchange
+from benchmarks.order_stub import OrderStub, STUB_SYMBOL
+from utils.market_data import ConflatingBuffer, FirstArrivalFeed
+from utils.candle_store import merge_rows
+from utils.order_transport import RestTransport, WsApiTransport
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+BASELINE_FILE = os.path.join(RESULTS_DIR, 'baseline.json')
+THRESHOLDS_FILE = os.path.join(ROOT, 'benchmarks', 'thresholds.json')
+
+HISTORY_CANDLES = 500          # Same buffer size the bot keeps
+HISTORY_PAGES = 175            # A year of 3m candles in 1000-candle download pages
+REPLAY_CANDLES = 300           # Candles streamed through main_loop
+UPDATES_PER_CANDLE = 4         # Kline pushes per candle in the replay
+ITERATIONS = {'full': 300, 'quick': 50}
+REPLAY_RUNS = {'full': 3, 'quick': 1}
+MEMORY_ITERATIONS = 50         # Calls traced by tracemalloc (tracing is slow)
+
+_real_sleep = asyncio.sleep
+
+
+async def _no_sleep(delay, result=None):
+    return await _real_sleep(0, result)
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# BOT UNDER TEST
+# ════════════════════════════════════════════════════════════════════════════
+def load_bot(tmp_dir: str):
+    """Import the v3 bot with its log/snapshot files redirected to a scratch dir"""
+    import strategies.unified_trading_bot_v3 as bot
+    bot.STATE_LOG_FILE = os.path.join(tmp_dir, 'state_debug.log')
+    bot.TRADE_LOG_FILE = os.path.join(tmp_dir, 'trade_log.txt')
+    bot.SNAPSHOT_FILE = os.path.join(tmp_dir, 'bot_snapshot.pkl')
+    return bot
+
+
+def reset_bot(bot, exchange, df=None):
+    bot.exchange = exchange
+    bot.order_transport = RestTransport(exchange)
+    bot.SYMBOL = exchange.symbol
+    bot.current_position = None
+    bot.stop_order_id = None
+    bot.order_history.clear()
+    bot.price_df = df if df is not None else bot.pd.DataFrame()
+    bot.trail_stats.seed([])
+    bot.market_data = LockstepBuffer(exchange)
+    bot.MARKET_DATA_CONNECTIONS = 1  # One simulated stream (FirstArrivalFeed has its own benchmark)
+    if df is not None and not df.empty:
+        bot.seed_trail_stats(df)
+    bot.last_processed_candle_time = None
+    bot.last_reconcile_time = 0
+    bot.last_reconcile_fingerprint = None
+    bot.last_reconcile_orders = {}
+    bot.bot_halted = False
+    bot.sl_placement_failures = 0
+    bot.consecutive_network_failures = 0
+    bot.consecutive_cancel_failures = 0
+    bot.consecutive_reconcile_timeouts = 0
+
+
+class LockstepBuffer(ConflatingBuffer):
+    """Kline buffer that releases the simulated stream's next push once an update is taken"""
+
+    def __init__(self, exchange: SimExchange):
+        super().__init__()
+        self.exchange = exchange
+
+    def take_nowait(self, key):
+        rows = super().take_nowait(key)
+        if rows is not None and self.exchange.demand:
+            self.exchange.demand.set()
+        return rows
+
+
+def open_long(bot, entry: float, risk: float, qty: float = 0.6, trailing: bool = False):
+    """Position dict as place_entry builds it (optionally already trailing)"""
+    bot.current_position = {
+        'side': 'long',
+        'entry_price': entry,
+        'quantity': qty,
+        'initial_risk': risk,
+        'sl_price': entry - risk,
+        'breakeven_triggered': trailing,
+        'trailing_active': trailing,
+        'peak_r': bot.TRAIL_ACTIVATE_AT_R if trailing else 0.0,
+        'trail_distance': 0.0,
+        'entry_notional': entry * qty,
+        'entry_time': datetime.now(timezone.utc),
+        'partial_exit_1_done': False,
+        'partial_exit_2_done': False,
+        'remaining_quantity': qty,
+    }
+    bot.exchange.position_amt = qty
+    bot.exchange.entry_price = entry
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# MEASUREMENT
+# ════════════════════════════════════════════════════════════════════════════
+def summarize(samples: list) -> dict:
+    ordered = sorted(samples)
+    n = len(ordered)
+    return {
+        'calls': n,
+        'median_ns': ordered[n // 2],
+        'mean_ns': int(sum(ordered) / n),
+        'p95_ns': ordered[min(n - 1, int(n * 0.95))],
+        'min_ns': ordered[0],
+    }
+
+
+async def _call(fn):
+    result = fn()
+    if inspect.isawaitable(result):
+        await result
+
+
+async def measure(fn, iterations: int, setup=None) -> dict:
+    """Time fn per call (setup excluded), then trace memory over a shorter pass"""
+    await _call(fn)  # Warm-up (imports, caches)
+
+    samples = []
+    for _ in range(iterations):
+        if setup:
+            setup()
+        start = time.perf_counter_ns()
+        await _call(fn)
+        samples.append(time.perf_counter_ns() - start)
+    stats = summarize(samples)
+
+    traced = min(iterations, MEMORY_ITERATIONS)
+    gc.collect()
+    tracemalloc.start()
+    base_current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    blocks_before = sys.getallocatedblocks()
+    for _ in range(traced):
+        if setup:
+            setup()
+        await _call(fn)
+    blocks_after = sys.getallocatedblocks()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats['peak_kib'] = round((peak - base_current) / 1024, 1)
+    stats['net_blocks_per_call'] = round((blocks_after - blocks_before) / traced, 1)
+    return stats
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# BENCHMARKS
+# ════════════════════════════════════════════════════════════════════════════
+async def bench_indicators(bot, candles, iterations) -> dict:
+    results = {}
+    df = candles_to_df(candles[:HISTORY_CANDLES])
+    reset_bot(bot, SimExchange('ETH/USDT:USDT', candles), df)
+
+    results['compute_indicators'] = await measure(lambda: bot.compute_indicators(df), iterations)
+    results['detect_signal'] = await measure(lambda: bot.detect_signal(df), iterations)
+    results['detect_momentum_slowdown'] = await measure(
+        lambda: bot.detect_momentum_slowdown(df, 'long', bot.MOMENTUM_LOOKBACK), iterations)
+    return results
+
+
+async def bench_trailing(bot, candles, iterations) -> dict:
+    results = {}
+    df = candles_to_df(candles[:HISTORY_CANDLES])
+    bot.compute_indicators(df)
+    atr = bot.get_atr_from_df(df)
+    entry = float(df['close'].iloc[-1])
+    risk = bot.INITIAL_SL_MULT * atr
+
+    # Price inside the initial risk band: decision logic only, no order traffic
+    exchange = SimExchange('ETH/USDT:USDT', candles)
+    reset_bot(bot, exchange, df)
+    results['update_trailing_or_close[hold]'] = await measure(
+        lambda: bot.update_trailing_or_close(entry + 0.5 * risk, atr),
+        iterations, setup=lambda: open_long(bot, entry, risk))
+
+    # Trailing position making a new high each call: cancel + replace + verify the stop
+    exchange = SimExchange('ETH/USDT:USDT', candles)
+    reset_bot(bot, exchange, df)
+    results['update_trailing_or_close[trail]'] = await measure(
+        lambda: bot.update_trailing_or_close(entry + 1.5 * risk, atr),
+        iterations, setup=lambda: open_long(bot, entry, risk, trailing=True))
+    return results
+
+
+async def bench_market_data(candles, iterations) -> dict:
+    """Conflating buffer: one kline push stored and taken; FirstArrivalFeed dedupe of two copies"""
+    buffer = ConflatingBuffer()
+    key = ('ETH/USDT:USDT', '3m')
+    rows = [list(c) for c in candles[HISTORY_CANDLES - 2:HISTORY_CANDLES]]
+
+    def push_take():
+        buffer.put(key, rows)
+        buffer.take_nowait(key)
+    results = {'market_data_put_take': await measure(push_take, iterations)}
+
+    # Two connections delivering the same push: first copy stored, second dropped as late
+    feed = FirstArrivalFeed(ConflatingBuffer())
+    connections = [feed.connection('ws0'), feed.connection('ws1')]
+    volume = itertools.count(1)
+
+    def first_arrival():
+        update = [rows[0], rows[1][:5] + [float(next(volume))]]
+        for connection in connections:
+            connection.put(key, update)
+        feed.buffer.take_nowait(key)
+    results['market_data_first_arrival'] = await measure(first_arrival, iterations)
+    return results
+
+
+async def bench_history_merge(iterations) -> dict:
+    """A year of downloaded pages (neighbours overlap by one candle) merged by timestamp"""
+    import numpy as np
+    tf_ms = 180_000
+    pages = []
+    for i in range(HISTORY_PAGES):
+        ts = np.arange(i * 999, i * 999 + 1000, dtype=np.float64) * tf_ms
+        pages.append(np.column_stack([ts] + [np.full(len(ts), float(i))] * 5))
+    return {'history_merge': await measure(lambda: merge_rows(*pages), iterations)}
+
+
+async def bench_order_transport(iterations) -> dict:
+    """
+    One order round trip per call against the local stub (benchmarks/order_stub.py):
+    REST vs the ws-fapi websocket, single market order and the exit pair
+    (reduce-only market + replacement stop) that partial exits send
+    """
+    results = {}
+    asyncio.sleep = _real_sleep  # The websocket client's background loops would spin on a zero sleep
+    stub = OrderStub()
+    await stub.start()
+    exchange = stub.client()
+    stop_params = {'stopPrice': 2900.0, 'timeInForce': 'GTE_GTC', 'type': 'STOP_MARKET', 'reduceOnly': True}
+    exit_pair = [
+        {'symbol': STUB_SYMBOL, 'type': 'market', 'side': 'sell', 'amount': '0.050', 'params': {'reduceOnly': True}},
+        {'symbol': STUB_SYMBOL, 'type': 'STOP_MARKET', 'side': 'sell', 'amount': '0.050', 'price': None,
+         'params': stop_params},
+    ]
+    try:
+        for transport in (RestTransport(exchange), WsApiTransport(exchange)):
+            await transport.start()
+            results[f'order_transport[{transport.name}]'] = await measure(
+                lambda: transport.create_market_order(STUB_SYMBOL, 'buy', '0.100'), iterations)
+            results[f'order_transport[{transport.name}_exit_pair]'] = await measure(
+                lambda: transport.create_orders(exit_pair), iterations)
+    finally:
+        await exchange.close()
+        await stub.stop()
+        asyncio.sleep = _no_sleep
+    return results
+
+
+async def bench_replay(bot, candles, runs) -> dict:
+    """Full main_loop: history load, reconcile, then every kline push of REPLAY_CANDLES candles"""
+    history = candles[:HISTORY_CANDLES]
+    replay = candles[HISTORY_CANDLES:HISTORY_CANDLES + REPLAY_CANDLES]
+    updates = len(replay) * UPDATES_PER_CANDLE
+    samples = []
+    exchange = None
+
+    for _ in range(runs):
+        exchange = SimExchange('ETH/USDT:USDT', replay, UPDATES_PER_CANDLE,
+                               on_exhausted=lambda: setattr(bot, 'bot_halted', True), lockstep=True)
+        reset_bot(bot, exchange)
+
+        async def init_exchange(snapshot=None, _exchange=exchange):
+            return _exchange
+
+        async def load_historical_data():
+            return candles_to_df(history)
+
+        bot.init_exchange = init_exchange
+        bot.load_snapshot = lambda: None
+        bot.load_historical_data = load_historical_data
+
+        start = time.perf_counter_ns()
+        await bot.main_loop()
+        samples.append(time.perf_counter_ns() - start)
+
+    stats = summarize(samples)
+    stats['median_ns_per_update'] = stats['median_ns'] // updates
+    stats['updates'] = updates
+    stats['exchange_calls'] = dict(sorted(exchange.calls.items()))
+    stats['conflated_updates'] = bot.market_data.conflated((exchange.symbol, bot.TIMEFRAME))
+    return {'main_loop_replay': stats}
+
+
+async def run_all(candles, mode: str) -> dict:
+    asyncio.sleep = _no_sleep
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir, open(os.devnull, 'w') as devnull:
+        bot = load_bot(tmp_dir)
+        with contextlib.redirect_stdout(devnull):
+            results.update(await bench_indicators(bot, candles, ITERATIONS[mode]))
+            results.update(await bench_trailing(bot, candles, ITERATIONS[mode]))
+            results.update(await bench_market_data(candles, ITERATIONS[mode]))
+            results.update(await bench_history_merge(ITERATIONS[mode]))
+            results.update(await bench_order_transport(ITERATIONS[mode]))
+            results.update(await bench_replay(bot, candles, REPLAY_RUNS[mode]))
+    asyncio.sleep = _real_sleep
+    return results
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# STORAGE / COMPARISON
+# ════════════════════════════════════════════════════════════════════════════
+def environment_info(fixture: str, mode: str) -> dict:
+    import numpy
+    import pandas
+    return {
+        'timestamp': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'pandas': pandas.__version__,
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'fixture': fixture,
+        'mode': mode,
+    }
+
+
+def save_results(report: dict, as_baseline: bool) -> str:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = report['meta']['timestamp'].replace(':', '').replace('-', '')
+    path = os.path.join(RESULTS_DIR, f"{stamp}.json")
+    for target in [path, os.path.join(RESULTS_DIR, 'latest.json')] + ([BASELINE_FILE] if as_baseline else []):
+        with open(target, 'w') as f:
+            json.dump(report, f, indent=2)
+    return path
+
+
+def load_thresholds() -> dict:
+    try:
+        with open(THRESHOLDS_FILE) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'default': 0.25}
+
+
+def compare(current: dict, baseline: dict, thresholds: dict) -> list:
+    """Rows of (name, baseline_ns, current_ns, change, limit, status)"""
+    rows = []
+    for name, stats in current.items():
+        base = baseline.get(name)
+        if not base:
+            rows.append((name, None, stats['median_ns'], None, None, 'new'))
+            continue
+        change = stats['median_ns'] / base['median_ns'] - 1
+        limit = thresholds.get(name, thresholds.get('default', 0.25))
+        status = 'REGRESSION' if change > limit else ('faster' if change < -limit else 'ok')
+        rows.append((name, base['median_ns'], stats['median_ns'], change, limit, status))
+    return rows
+
+
+def print_report(results: dict):
+    print(f"\n{'Benchmark':<36} {'median ns':>14} {'p95 ns':>14} {'peak KiB':>10} {'blocks/call':>12}")
+    print('─' * 90)
+    for name, s in results.items():
+        print(f"{name:<36} {s['median_ns']:>14,} {s['p95_ns']:>14,} {s['peak_kib']:>10} {s['net_blocks_per_call']:>12}"
+              if 'peak_kib' in s else
+              f"{name:<36} {s['median_ns']:>14,} {s['p95_ns']:>14,} {'':>10} {'':>12}")
+    replay = results.get('main_loop_replay')
+    if replay:
+        print(f"\nReplay: {replay['updates']} kline updates | {replay['median_ns_per_update']:,} ns/update | "
+              f"{replay.get('conflated_updates', 0)} conflated | exchange calls: {replay['exchange_calls']}")
+
+
+def main() -> int:
+    mode = 'quick' if '--quick' in sys.argv else 'full'
+    fixture = 'synthetic'
+    if '--fixture' in sys.argv:
+        fixture = sys.argv[sys.argv.index('--fixture') + 1]
+        candles = load_recorded_candles(fixture)
+    else:
+        candles = synthetic_candles(HISTORY_CANDLES + REPLAY_CANDLES)
+    if len(candles) < HISTORY_CANDLES + 50:
+        print(f"Fixture too short: {len(candles)} candles (need {HISTORY_CANDLES + 50}+)")
+        return 2
+
+    print(f"Running {mode} benchmarks on {fixture} candles ({len(candles)})...")
+    results = asyncio.run(run_all(candles, mode))
+    report = {'meta': environment_info(fixture, mode), 'benchmarks': results}
+    print_report(results)
+
+    baseline = None
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as f:
+            baseline = json.load(f)
+
+    path = save_results(report, '--save-baseline' in sys.argv)
+    print(f"\nSaved → {path}")
+
+    if not baseline:
+        print("No baseline yet - run with --save-baseline to create one")
+        return 0
+
+    rows = compare(results, baseline['benchmarks'], load_thresholds())
+    print(f"\nAgainst baseline from {baseline['meta']['timestamp']} ({baseline['meta']['platform']}):")
+    for name, base_ns, cur_ns, change, limit, status in rows:
+        if change is None:
+            print(f"  {name:<36} {'':>14} {cur_ns:>14,}  {status}")
+        else:
+            print(f"  {name:<36} {base_ns:>14,} {cur_ns:>14,}  {change:+7.1%} (limit +{limit:.0%})  {status}")
+
+    regressions = [r for r in rows if r[-1] == 'REGRESSION']
+    if regressions:
+        print(f"\n❌ {len(regressions)} benchmark(s) regressed beyond threshold")
+        return 1
+    print("\n✅ No regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
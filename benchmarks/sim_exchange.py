@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Simulated exchange for benchmarks
+Implements the subset of the ccxt.pro client the v3 bot uses, in memory and without
+latency, so timings measure the bot's own code. Market orders fill at the current
+price; reduce-only STOP_MARKET orders trigger when a replayed candle crosses them.
+"""
+import asyncio
+import itertools
+from typing import Callable, Optional
+
+from ccxt.base.errors import NotSupported, OrderNotFound
+
+from benchmarks.fixtures import intra_candle_updates
+
+
+class SimExchange:
+    def __init__(self, symbol: str, candles: Optional[list] = None, updates_per_candle: int = 4,
+                 on_exhausted: Optional[Callable[[], None]] = None, lockstep: bool = False):
+        self.symbol = symbol
+        self.markets = {symbol: {'symbol': symbol}}
+        self.options = {}
+        self.has = {'createOrders': True}
+        self.price = float(candles[0][4]) if candles else 0.0
+        self.position_amt = 0.0
+        self.entry_price = 0.0
+        self.open_orders = {}
+        self.calls = {}
+        self._ids = itertools.count(1)
+
+        # Websocket replay
+        self._updates = (u for c in (candles or []) for u in intra_candle_updates(c, updates_per_candle))
+        self._window = []
+        self.on_exhausted = on_exhausted
+        # Lockstep: the next push waits until the consumer calls demand.set() (no conflation)
+        self.demand = asyncio.Event() if lockstep else None
+        if self.demand:
+            self.demand.set()
+
+    def _count(self, name: str):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    # ── precision ──
+    def amount_to_precision(self, symbol, amount):
+        return f"{float(amount):.3f}"
+
+    def price_to_precision(self, symbol, price):
+        return f"{float(price):.2f}"
+
+    # ── account ──
+    async def fetch_positions(self, symbols=None, params=None):
+        self._count('fetch_positions')
+        if self.position_amt == 0:
+            return []
+        return [{
+            'symbol': self.symbol,
+            'contracts': abs(self.position_amt),
+            'side': 'long' if self.position_amt > 0 else 'short',
+            'entryPrice': self.entry_price,
+            'markPrice': self.price,
+            'info': {'positionAmt': str(self.position_amt)},
+        }]
+
+    async def fetch_open_orders(self, symbol=None, since=None, limit=None, params=None):
+        """Like binanceusdm: conditional (stop) orders are only listed with trigger=True"""
+        self._count('fetch_open_orders')
+        conditional = bool((params or {}).get('trigger'))
+        return [dict(o) for o in self.open_orders.values() if (o.get('stopPrice') is not None) == conditional]
+
+    async def fetch_balance(self, params=None):
+        self._count('fetch_balance')
+        return {'USDT': {'free': 100_000.0, 'used': 0.0, 'total': 100_000.0}}
+
+    # ── orders ──
+    def _fill(self, side: str, qty: float, reduce_only: bool = False):
+        signed = qty if side == 'buy' else -qty
+        if reduce_only:
+            signed = max(-abs(self.position_amt), min(abs(self.position_amt), signed))
+            if signed == 0:
+                return  # Nothing left to reduce (a triggered stop expires)
+        new_amt = self.position_amt + signed
+        if self.position_amt == 0 or (new_amt * self.position_amt > 0 and abs(new_amt) > abs(self.position_amt)):
+            total = abs(self.position_amt) + abs(signed)
+            self.entry_price = (self.entry_price * abs(self.position_amt) + self.price * abs(signed)) / total
+        self.position_amt = round(new_amt, 9)
+        if self.position_amt == 0:
+            self.entry_price = 0.0
+            self.open_orders = {k: o for k, o in self.open_orders.items() if not o['reduceOnly']}
+
+    async def create_market_order(self, symbol, side, amount, price=None, params=None):
+        self._count('create_market_order')
+        qty = float(amount)
+        reduce_only = bool((params or {}).get('reduceOnly'))
+        if reduce_only and self.position_amt == 0:
+            raise Exception('binanceusdm {"code":-2022,"msg":"ReduceOnly Order is rejected."}')
+        self._fill(side, qty, reduce_only)
+        return {'id': str(next(self._ids)), 'symbol': symbol, 'type': 'market', 'side': side,
+                'amount': qty, 'filled': qty, 'average': self.price, 'status': 'closed'}
+
+    async def create_order(self, symbol, type, side, amount, price=None, params=None):
+        self._count('create_order')
+        params = params or {}
+        if type.upper() == 'MARKET':
+            return await self.create_market_order(symbol, side, amount, price, params)
+        order = {
+            'id': str(next(self._ids)), 'symbol': symbol, 'type': type, 'side': side,
+            'amount': float(amount), 'price': price, 'stopPrice': params.get('stopPrice'),
+            'reduceOnly': bool(params.get('reduceOnly')), 'status': 'open', 'info': {'type': type},
+        }
+        self.open_orders[order['id']] = order
+        return dict(order)
+
+    async def create_orders(self, orders, params=None):
+        """
+        Batch: one call, orders applied in sequence
+        Like ccxt's binanceusdm, conditional orders are refused before any request is sent
+        (USD-M stop orders go to the algo-order endpoint, which has no batch variant)
+        """
+        if any(any(k in (o.get('params') or {}) for k in ('stopPrice', 'triggerPrice', 'stopLossPrice', 'takeProfitPrice'))
+               for o in orders):
+            raise NotSupported('createOrders() does not support conditional order types for linear markets')
+        self._count('create_orders')
+        results = []
+        for o in orders:
+            results.append(await self.create_order(o['symbol'], o['type'], o['side'], o['amount'],
+                                                   o.get('price'), o.get('params')))
+        return results
+
+    async def cancel_order(self, id, symbol=None, params=None):
+        """Conditional orders are only found with trigger=True (the algo-order endpoint)"""
+        self._count('cancel_order')
+        order = self.open_orders.get(id)
+        if order is None or (order.get('stopPrice') is not None) != bool((params or {}).get('trigger')):
+            raise OrderNotFound(f'Unknown order sent: {id}')
+        del self.open_orders[id]
+        return {'id': id, 'status': 'canceled'}
+
+    # ── market data ──
+    def set_price(self, candle: list):
+        """Move the market and trigger any stop the candle crossed"""
+        self.price = float(candle[4])
+        high, low = float(candle[2]), float(candle[3])
+        for order_id, order in list(self.open_orders.items()):
+            stop = order.get('stopPrice')
+            if stop is None:
+                continue
+            hit = low <= stop if order['side'] == 'sell' else high >= stop
+            if hit and order_id in self.open_orders:
+                del self.open_orders[order_id]
+                self.price = float(stop)
+                self._fill(order['side'], order['amount'], order['reduceOnly'])
+                self.price = float(candle[4])
+
+    async def watch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        self._count('watch_ohlcv')
+        if self.demand:
+            await self.demand.wait()
+            self.demand.clear()
+        await asyncio.sleep(0)  # A push is a separate event-loop wakeup
+        update = next(self._updates, None)
+        if update is None:
+            if self.on_exhausted:
+                self.on_exhausted()
+            return list(self._window)
+        if self._window and self._window[-1][0] == update[0]:
+            self._window[-1] = update
+        else:
+            self._window.append(update)
+            self._window = self._window[-2:]
+        self.set_price(update)
+        return list(self._window)
+
+    async def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        self._count('fetch_ohlcv')
+        return list(self._window[-(limit or 1):])
+
+    async def close(self):
+        pass
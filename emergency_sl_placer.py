@@ -1,69 +1,62 @@
 #!/usr/bin/env python3
 """
 Emergency Stop-Loss Placer
-Detects open positions without SL and places them immediately
+Detects open positions without SL (all symbols, one account-wide sweep)
 """
 import asyncio
-import ccxt.pro as ccxtpro
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from config.api_keys import API_KEY, API_SECRET
+from utils.exchange_broker import connect_exchange
+from utils.account_sync import AccountReconciler, exchange_issues, is_stop_order, position_amount
 from datetime import datetime, timezone
 
-SYMBOL = 'ETH/USDT:USDT'
 
 async def place_emergency_sl():
-    """Check for open positions and place SL if missing"""
-    exchange = ccxtpro.binanceusdm({
-        'apiKey': API_KEY,
-        'secret': API_SECRET,
-        'enableRateLimit': True,
-        'options': {'defaultType': 'future'}
-    })
-    
-    exchange.enable_demo_trading(True)
-    await exchange.load_markets()
+    """Check every open position on the account and report any without SL"""
+    exchange = await connect_exchange('demo')  # Broker if running, else direct client
     
     try:
-        # Get current position
-        positions = await exchange.fetch_positions([SYMBOL])
-        position = None
-        for pos in positions:
-            if pos['contracts'] and abs(pos['contracts']) > 0:
-                position = pos
-                break
+        # One account-wide sweep: all positions + all open orders
+        snapshot = await AccountReconciler(exchange).sweep()
+        positions = snapshot['positions']
         
-        if not position:
+        if not positions:
             print(f"[{datetime.now(timezone.utc).strftime('%H:%M:%S')}] No open position found")
-            return
-        
-        # Get open orders
-        orders = await exchange.fetch_open_orders(SYMBOL)
-        sl_orders = [o for o in orders if 'STOP' in o.get('type', '').upper() or 'STOP' in o.get('info', {}).get('type', '').upper()]
-        
-        print(f"\n[{datetime.now(timezone.utc).strftime('%H:%M:%S')}] POSITION DETECTED:")
-        print(f"  Side: {position['side']}")
-        print(f"  Contracts: {position['contracts']}")
-        print(f"  Entry: {position['percentage']}")
-        print(f"  Open Orders Total: {len(orders)}")
-        print(f"  SL Orders: {len(sl_orders)}")
         
-        if orders:
-            print(f"\n  📋 ALL OPEN ORDERS:")
-            for order in orders:
-                order_type = order.get('type') or order.get('info', {}).get('type', 'UNKNOWN')
-                order_price = order.get('stopPrice') or order.get('info', {}).get('stopPrice') or order.get('price', 'N/A')
-                print(f"    - {order_type} @ {order_price} | Amount: {order.get('amount')} | ID: {order.get('id')}")
+        for symbol, position in positions.items():
+            orders = snapshot['orders'].get(symbol, [])
+            sl_orders = [o for o in orders if is_stop_order(o)]
+            
+            print(f"\n[{datetime.now(timezone.utc).strftime('%H:%M:%S')}] POSITION DETECTED: {symbol}")
+            print(f"  Side: {position['side']}")
+            print(f"  Contracts: {position['contracts']}")
+            print(f"  Entry: {position.get('entryPrice')}")
+            print(f"  Open Orders Total: {len(orders)}")
+            print(f"  SL Orders: {len(sl_orders)}")
+            
+            if orders:
+                print(f"\n  📋 ALL OPEN ORDERS:")
+                for order in orders:
+                    order_type = order.get('type') or order.get('info', {}).get('type', 'UNKNOWN')
+                    order_price = order.get('stopPrice') or order.get('info', {}).get('stopPrice') or order.get('price', 'N/A')
+                    print(f"    - {order_type} @ {order_price} | Amount: {order.get('amount')} | ID: {order.get('id')}")
+            
+            if len(sl_orders) == 0 and position_amount(position) != 0:
+                print(f"\n⚠️ CRITICAL: Position without stop-loss detected!")
+                print(f"Position needs immediate SL placement.")
+                print(f"Manual action required on exchange dashboard.")
+            elif sl_orders:
+                print(f"\n✅ Position has {len(sl_orders)} SL order(s)")
+                for sl in sl_orders:
+                    print(f"   - SL @ {float(sl.get('stopPrice') or sl.get('price') or 0):.2f}")
         
-        if len(sl_orders) == 0 and position['contracts'] != 0:
-            print(f"\n⚠️ CRITICAL: Position without stop-loss detected!")
-            print(f"Position needs immediate SL placement.")
-            print(f"Manual action required on exchange dashboard.")
-        elif sl_orders:
-            print(f"\n✅ Position has {len(sl_orders)} SL order(s)")
-            for sl in sl_orders:
-                print(f"   - SL @ {sl.get('stopPrice') or sl.get('price'):.2f}")
+        # Orders left behind on symbols without a position
+        for symbol, orders in snapshot['orders'].items():
+            if symbol in positions:
+                continue
+            for issue in exchange_issues(None, orders):
+                print(f"\n⚠️ {symbol}: {issue['detail']}")
     
     except Exception as e:
         print(f"Error: {e}")
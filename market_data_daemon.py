@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Market Data Daemon
+Owns the market-data websockets for one symbol and writes normalized bars (and optionally
+best bid/ask or trade ticks) into a shared-memory ring (utils/shm_ring.py). A bot started
+with BOT_MARKET_DATA=shm reads the ring instead of opening its own streams, so the
+market-data side and the strategy/execution side can be restarted or profiled on their own.
+
+The ring outlives this process: a restarted daemon continues the sequence and readers
+pick up where they stopped.
+
+Usage:
+    python3 market_data_daemon.py                   # BOT_SYMBOL / BOT_TIMEFRAME bars (default ETH 3m)
+    MD_TICKS=bookTicker python3 market_data_daemon.py   # plus best bid/ask ('trades' for aggTrades)
+    python3 market_data_daemon.py --unlink          # remove the ring on exit
+
+Under agent.py it runs as its own instance (script market_data_daemon.py; it writes no heartbeats, so none are expected);
+the bots that read it get "env": {"BOT_MARKET_DATA": "shm"} in config/bots.json.
+"""
+import asyncio
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from utils.exchange_factory import create_exchange, prepare_exchange
+from utils.bar_close import BarCloseTracker
+from utils.shm_ring import DEFAULT_SLOTS, ShmRing, ring_name
+from datetime import datetime, timezone
+
+# ════════════════════════════════════════════════════════════════════════════
+# CONFIG
+# ════════════════════════════════════════════════════════════════════════════
+SYMBOL = os.environ.get('BOT_SYMBOL', 'ETH/USDT:USDT')
+TIMEFRAME = os.environ.get('BOT_TIMEFRAME', '3m')
+TICKS = os.environ.get('MD_TICKS', 'none')   # 'bookTicker', 'trades' or 'none'
+RING_SLOTS = DEFAULT_SLOTS
+RETRY_DELAY_SEC = 2              # After a failed watch call
+STATUS_INTERVAL_SEC = 60
+LOG_FILE = 'logs/market_data_daemon.log'
+
+# ════════════════════════════════════════════════════════════════════════════
+# GLOBALS
+# ════════════════════════════════════════════════════════════════════════════
+exchange = None
+ring = None
+counts = {'bars': 0, 'finals': 0, 'ticks': 0, 'errors': 0}
+
+
+def log(message: str):
+    timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    line = f"[{timestamp}] {message}"
+    print(line)
+    os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+    with open(LOG_FILE, 'a', encoding='utf-8') as f:
+        f.write(line + "\n")
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# EXCHANGE
+# ════════════════════════════════════════════════════════════════════════════
+async def init_exchange():
+    """Public streams only - no API keys needed"""
+    client = create_exchange('live', with_keys=False)
+    source = await prepare_exchange(client, 'live')
+    log(f"Markets loaded from {source} ({len(client.markets)} symbols)")
+    return client
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# STREAMS
+# ════════════════════════════════════════════════════════════════════════════
+async def bars_loop(symbol: str, timeframe: str):
+    """Forming bar on every push; a closed bar is written once more with its final values"""
+    bars = BarCloseTracker(timeframe)
+    if not bars.attach(exchange, symbol):
+        log("Kline final flag unavailable - closes marked from the next bar")
+    while True:
+        try:
+            ohlcv = await exchange.watch_ohlcv(symbol, timeframe)
+            if not ohlcv:
+                continue
+            closed = bars.update(ohlcv[-2:])
+            if closed:
+                ring.write_bar(int(closed[0]), timeframe, *closed[1:6], final=True)
+                counts['finals'] += 1
+            latest = ohlcv[-1]
+            if not closed or int(latest[0]) != closed[0]:
+                ring.write_bar(int(latest[0]), timeframe, *map(float, latest[1:6]))
+                counts['bars'] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            counts['errors'] += 1
+            log(f"watch_ohlcv error: {type(e).__name__}: {e}")
+            await asyncio.sleep(RETRY_DELAY_SEC)
+
+
+async def ticks_loop(symbol: str, source: str):
+    """Best bid/ask ('bookTicker') or last trade ('trades', written as bid = ask = last)"""
+    while True:
+        try:
+            if source == 'trades':
+                for trade in await exchange.watch_trades(symbol):
+                    price = float(trade['price'])
+                    ring.write_tick(int(trade['timestamp']), price, price, last=price)
+                    counts['ticks'] += 1
+                continue
+            ticker = (await exchange.watch_bids_asks([symbol])).get(symbol) or {}
+            if ticker.get('bid') and ticker.get('ask'):
+                ring.write_tick(int(ticker.get('timestamp') or time.time() * 1000),
+                                float(ticker['bid']), float(ticker['ask']),
+                                float(ticker.get('bidVolume') or 0), float(ticker.get('askVolume') or 0))
+                counts['ticks'] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            counts['errors'] += 1
+            log(f"{source} stream error: {type(e).__name__}: {e}")
+            await asyncio.sleep(RETRY_DELAY_SEC)
+
+
+async def status_loop():
+    while True:
+        await asyncio.sleep(STATUS_INTERVAL_SEC)
+        age = ring.age_sec()
+        log(f"Ring head {int(ring.header['head'])} | bars {counts['bars']} | finals {counts['finals']} | "
+            f"ticks {counts['ticks']} | errors {counts['errors']} | last write {f'{age:.1f}s ago' if age is not None else '-'}")
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# MAIN
+# ════════════════════════════════════════════════════════════════════════════
+async def main():
+    global exchange, ring
+    exchange = await init_exchange()
+    if SYMBOL not in exchange.markets:
+        log(f"❌ Unknown symbol {SYMBOL}")
+        await exchange.close()
+        return
+
+    name = ring_name(SYMBOL)
+    ring = ShmRing.create(name, slots=RING_SLOTS)
+    log(f"Writing {SYMBOL} {TIMEFRAME} bars{'' if TICKS == 'none' else f' + {TICKS} ticks'} "
+        f"to shared memory '{name}' ({ring.slots} slots, head {int(ring.header['head'])})")
+
+    tasks = [asyncio.create_task(bars_loop(SYMBOL, TIMEFRAME)), asyncio.create_task(status_loop())]
+    if TICKS != 'none':
+        tasks.append(asyncio.create_task(ticks_loop(SYMBOL, TICKS)))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await exchange.close()
+        ring.close()
+        if '--unlink' in sys.argv:
+            ShmRing.unlink(name)
+            log(f"Removed shared memory '{name}'")
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n✓ Market data daemon stopped")
@@ -3,25 +3,16 @@
 EMERGENCY: Place SL for current open position
 """
 import asyncio
-import ccxt.pro as ccxtpro
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from config.api_keys import API_KEY, API_SECRET
+from utils.exchange_broker import connect_exchange
 from datetime import datetime, timezone
 
 SYMBOL = 'ETH/USDT:USDT'
 
 async def place_sl_emergency():
-    exchange = ccxtpro.binanceusdm({
-        'apiKey': API_KEY,
-        'secret': API_SECRET,
-        'enableRateLimit': True,
-        'options': {'defaultType': 'future'}
-    })
-    
-    exchange.enable_demo_trading(True)
-    await exchange.load_markets()
+    exchange = await connect_exchange('demo')  # Broker if running, else direct client
     
     try:
         # Get position
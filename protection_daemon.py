@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Position Protection Daemon
+Long-running replacement for emergency_sl_placer.py / place_sl_now.py runs.
+Keeps one warm exchange client, follows positions and orders for the whole account
+over the user-data stream, and places a reduce-only STOP_MARKET for any position that
+stays without a stop-loss longer than UNPROTECTED_GRACE_SEC.
+
+Usage:
+    python3 protection_daemon.py                # live account, run until stopped
+    python3 protection_daemon.py demo --once    # demo account: one sweep, protect what needs it, exit
+    EXCHANGE_MODE=demo python3 protection_daemon.py
+"""
+import asyncio
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from utils.exchange_factory import MODES, create_exchange, prepare_exchange
+from utils.account_sync import AccountReconciler, is_stop_order, position_amount
+from utils.telegram_notifier import send_telegram_alert
+from datetime import datetime, timezone
+
+# ════════════════════════════════════════════════════════════════════════════
+# CONFIG
+# ════════════════════════════════════════════════════════════════════════════
+# Account to protect: mode argument, else EXCHANGE_MODE, else live (the account the v3 bot trades)
+EXCHANGE_MODE = next((arg for arg in sys.argv[1:] if arg in MODES), os.environ.get('EXCHANGE_MODE', 'live'))
+EMERGENCY_SL_PCT = 0.03          # Stop distance from entry (same 3% the bot uses on recovery)
+MIN_STOP_GAP_PCT = 0.005         # If entry-based stop would trigger at once, place it this far from mark
+UNPROTECTED_GRACE_SEC = 10       # Give the owning bot time to place its own SL after entry
+SWEEP_INTERVAL_SEC = 60          # REST resync in case a stream update was missed
+CHECK_INTERVAL_SEC = 1           # Grace timers are re-checked at least this often
+RETRY_DELAY_SEC = 5              # After a failed placement
+LOG_FILE = 'logs/protection_daemon.log'
+
+# ════════════════════════════════════════════════════════════════════════════
+# GLOBALS
+# ════════════════════════════════════════════════════════════════════════════
+exchange = None
+positions = {}          # {symbol: position}
+open_orders = {}        # {symbol: {order_id: order}}
+unprotected_since = {}  # {symbol: monotonic time first seen without a stop}
+retry_after = {}        # {symbol: monotonic time of the next placement attempt}
+placing = set()         # Symbols with a placement in flight
+state_changed = asyncio.Event()  # Set by the streams so gaps are checked immediately
+
+
+def log(message: str):
+    timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    line = f"[{timestamp}] {message}"
+    print(line)
+    os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+    with open(LOG_FILE, 'a', encoding='utf-8') as f:
+        f.write(line + "\n")
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# EXCHANGE
+# ════════════════════════════════════════════════════════════════════════════
+async def init_exchange():
+    """One client for the daemon's lifetime; markets + time offset come from the shared cache when fresh"""
+    client = create_exchange(EXCHANGE_MODE)
+    source = await prepare_exchange(client, EXCHANGE_MODE)
+    log(f"{EXCHANGE_MODE} account | markets loaded from {source} ({len(client.markets)} symbols)")
+    return client
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# STATE
+# ════════════════════════════════════════════════════════════════════════════
+def apply_position(position):
+    symbol = position['symbol']
+    if position_amount(position) != 0:
+        positions[symbol] = position
+    else:
+        positions.pop(symbol, None)
+
+
+def apply_order(order):
+    symbol_orders = open_orders.setdefault(order['symbol'], {})
+    if order.get('status') == 'open':
+        symbol_orders[order['id']] = order
+    else:
+        symbol_orders.pop(order['id'], None)
+
+
+async def sweep(reconciler: AccountReconciler):
+    """Replace local state with an account-wide REST snapshot"""
+    global positions, open_orders
+    snapshot = await reconciler.sweep()
+    positions = dict(snapshot['positions'])
+    open_orders = {symbol: {o['id']: o for o in orders} for symbol, orders in snapshot['orders'].items()}
+
+
+def unprotected_symbols():
+    """Symbols with an open position and no stop order"""
+    return [
+        symbol for symbol in positions
+        if not any(is_stop_order(o) for o in open_orders.get(symbol, {}).values())
+    ]
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# PROTECTION
+# ════════════════════════════════════════════════════════════════════════════
+def emergency_stop_price(position) -> float:
+    amt = position_amount(position)
+    entry = float(position.get('entryPrice') or 0)
+    mark = float(position.get('markPrice') or position.get('info', {}).get('markPrice') or entry)
+
+    if amt > 0:
+        stop = entry * (1 - EMERGENCY_SL_PCT)
+        if stop >= mark:  # Already below the emergency level - keep a stop just under mark
+            stop = mark * (1 - MIN_STOP_GAP_PCT)
+    else:
+        stop = entry * (1 + EMERGENCY_SL_PCT)
+        if stop <= mark:
+            stop = mark * (1 + MIN_STOP_GAP_PCT)
+    return stop
+
+
+async def exchange_stops(symbol: str) -> list:
+    """Open stop orders for symbol straight from REST (regular and conditional/algo orders)"""
+    regular, conditional = await asyncio.gather(
+        exchange.fetch_open_orders(symbol),
+        exchange.fetch_open_orders(symbol, params={'trigger': True}),
+    )
+    return [o for o in regular + conditional if is_stop_order(o)]
+
+
+async def place_stop(symbol: str):
+    """One create_order round trip; the order stream confirms it"""
+    position = positions.get(symbol)
+    if not position:
+        return
+    amt = position_amount(position)
+    sl_side = 'sell' if amt > 0 else 'buy'
+    qty = exchange.amount_to_precision(symbol, abs(amt))
+    stop_price = float(exchange.price_to_precision(symbol, emergency_stop_price(position)))
+
+    placing.add(symbol)
+    try:
+        # Local state can miss a stop (stream gap): never stack a second one
+        stops = await exchange_stops(symbol)
+        if stops:
+            for order in stops:
+                apply_order(order)
+            unprotected_since.pop(symbol, None)
+            log(f"✓ {symbol}: stop already on the exchange ({stops[0]['id']}) - none placed")
+            return
+
+        log(f"🛡️ {symbol}: {'LONG' if amt > 0 else 'SHORT'} {abs(amt)} unprotected - placing STOP_MARKET @ {stop_price}")
+        order = await exchange.create_order(
+            symbol, 'STOP_MARKET', sl_side, qty, None,
+            {
+                'stopPrice': stop_price,
+                'timeInForce': 'GTE_GTC',
+                'type': 'STOP_MARKET',
+                'reduceOnly': True
+            }
+        )
+        order.setdefault('symbol', symbol)
+        order['type'] = order.get('type') or 'STOP_MARKET'
+        order['status'] = order.get('status') or 'open'
+        apply_order(order)
+        unprotected_since.pop(symbol, None)
+        log(f"✅ {symbol}: stop placed ({order['id']} @ {stop_price})")
+        send_telegram_alert(f"Protection daemon placed stop for {symbol} @ {stop_price}")
+    except Exception as e:
+        retry_after[symbol] = time.monotonic() + RETRY_DELAY_SEC
+        log(f"❌ {symbol}: stop placement failed: {type(e).__name__}: {e}")
+        send_telegram_alert(f"Protection daemon FAILED to place stop for {symbol}: {e}")
+    finally:
+        placing.discard(symbol)
+
+
+async def check_protection(grace_sec: float = UNPROTECTED_GRACE_SEC):
+    """Start grace timers for new gaps and protect symbols whose grace has expired"""
+    now = time.monotonic()
+    gaps = set(unprotected_symbols())
+
+    for symbol in list(unprotected_since):
+        if symbol not in gaps:
+            log(f"✓ {symbol}: protected")
+            del unprotected_since[symbol]
+            retry_after.pop(symbol, None)
+
+    for symbol in gaps:
+        if symbol not in unprotected_since:
+            unprotected_since[symbol] = now
+            log(f"⚠️ {symbol}: position without stop-loss (grace {grace_sec:.0f}s)")
+        if symbol in placing or now < retry_after.get(symbol, 0):
+            continue
+        if now - unprotected_since[symbol] >= grace_sec:
+            await place_stop(symbol)
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# STREAMS
+# ════════════════════════════════════════════════════════════════════════════
+async def watch_positions_loop():
+    while True:
+        try:
+            for position in await exchange.watch_positions():
+                apply_position(position)
+            state_changed.set()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log(f"Position stream error: {type(e).__name__}: {e}")
+            await asyncio.sleep(5)
+
+
+async def watch_orders_loop():
+    while True:
+        try:
+            for order in await exchange.watch_orders():
+                apply_order(order)
+            state_changed.set()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log(f"Order stream error: {type(e).__name__}: {e}")
+            await asyncio.sleep(5)
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# MAIN
+# ════════════════════════════════════════════════════════════════════════════
+async def run_once():
+    """Single sweep; protect immediately (no grace)"""
+    await sweep(AccountReconciler(exchange))
+    log(f"Positions: {len(positions)} | Symbols with orders: {len(open_orders)}")
+    await check_protection(grace_sec=0)
+    for symbol in unprotected_symbols():
+        log(f"⚠️ {symbol}: still unprotected")
+
+
+async def run_forever():
+    reconciler = AccountReconciler(exchange)
+    await sweep(reconciler)
+    last_sweep = time.monotonic()
+    log(f"🛡️ Protection daemon started | Positions: {len(positions)} | Grace: {UNPROTECTED_GRACE_SEC}s")
+
+    streams = [asyncio.create_task(watch_positions_loop()), asyncio.create_task(watch_orders_loop())]
+    try:
+        while True:
+            if time.monotonic() - last_sweep >= SWEEP_INTERVAL_SEC:
+                try:
+                    await sweep(reconciler)
+                except Exception as e:
+                    log(f"Sweep failed: {type(e).__name__}: {e}")
+                last_sweep = time.monotonic()
+
+            await check_protection()
+            try:
+                await asyncio.wait_for(state_changed.wait(), timeout=CHECK_INTERVAL_SEC)
+            except asyncio.TimeoutError:
+                pass
+            state_changed.clear()
+    finally:
+        for task in streams:
+            task.cancel()
+
+
+async def main():
+    global exchange
+    exchange = await init_exchange()
+    try:
+        if '--once' in sys.argv:
+            await run_once()
+        else:
+            await run_forever()
+    finally:
+        await exchange.close()
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n✓ Protection daemon stopped")
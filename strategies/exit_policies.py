@@ -0,0 +1,244 @@
+# exit_policies.py
+# Composable exit rules shared by the live bots and the backtests.
+# A rule is a small stateless function of the position inputs (floats for one live
+# update, NumPy arrays for every bar of a trade path); compile_chain() fixes the rule
+# order once and returns an evaluator that runs the same code on both.
+import numpy as np
+from typing import Dict, Optional, Sequence, Tuple
+
+# Inputs an evaluator reads (floats or equal-length arrays):
+#   side            +1 long / -1 short
+#   entry, risk     entry price and initial risk (price distance to the first stop)
+#   price           price the rules act on (tick or bar close)
+#   peak_r          best R reached so far, this update included (optional, defaults to the current R)
+#   atr, avg_atr    current ATR and its rolling mean
+#   momentum_ratio  recent / earlier mean move (NaN when unknown)
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# TRAIL DISTANCE RULES
+# ════════════════════════════════════════════════════════════════════════════
+def fixed_distance(mult: float):
+    """Trail at mult x ATR"""
+    def rule(x, out):
+        out['distance'] = mult * x['atr']
+    rule.kind = 'distance'
+    rule.name = 'fixed_distance'
+    return rule
+
+
+def tiered_distance(tiers: Sequence[Tuple[float, float]] = ((3.0, 1.5), (6.0, 1.8)), top: float = 2.5):
+    """
+    Looser trail as profit grows: (below_r, mult) tiers, `top` mult above the last tier
+    Default: < 3R 1.5 ATR, 3-6R 1.8 ATR, >= 6R 2.5 ATR
+    """
+    mults = [m for _, m in tiers] + [top]
+    steps = tuple((bound, mults[k + 1] - mults[k]) for k, (bound, _) in enumerate(tiers))
+
+    def rule(x, out):
+        mult = mults[0]
+        for bound, delta in steps:
+            mult = mult + (out['r'] >= bound) * delta
+        out['distance'] = mult * x['atr']
+    rule.kind = 'distance'
+    rule.name = 'tiered_distance'
+    return rule
+
+
+def volatility_scaled(high_ratio: float = 1.5, widen: float = 1.4, low_ratio: float = 0.7, tighten: float = 0.7):
+    """Widen the trail when ATR is well above its mean, tighten it when well below"""
+    def rule(x, out):
+        atr, avg_atr = x['atr'], x['avg_atr']
+        known = avg_atr > 0  # False for 0 and NaN
+        high = known & (atr > high_ratio * avg_atr)
+        low = known & (atr < low_ratio * avg_atr)
+        out['distance'] = out['distance'] * (1 + high * (widen - 1) + low * (tighten - 1))
+    rule.kind = 'distance'
+    rule.name = 'volatility_scaled'
+    return rule
+
+
+def momentum_cap(threshold: float = 0.3, mult: float = 0.3):
+    """Cap the trail at mult x ATR while momentum_ratio is below threshold (trend exhaustion)"""
+    def rule(x, out):
+        cap = mult * x['atr']
+        tight = (x['momentum_ratio'] < threshold) & (cap < out['distance'])  # False for NaN ratios
+        out['momentum_tight'] = tight
+        out['distance'] = out['distance'] + tight * (cap - out['distance'])
+    rule.kind = 'distance'
+    rule.name = 'momentum_cap'
+    return rule
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# STOP RULES (propose a stop price and when the proposal is active)
+# ════════════════════════════════════════════════════════════════════════════
+def breakeven(trigger_r: float = 1.0):
+    """Stop to entry once the position has been trigger_r in profit"""
+    def rule(x, out):
+        return x['entry'], out['peak_r'] >= trigger_r
+    rule.kind = 'stop'
+    rule.name = 'breakeven'
+    rule.trigger_r = trigger_r
+    rule.min_step = (0.0, 0.0)
+    return rule
+
+
+def trailing(activate_r: float = 1.0, min_step: Tuple[float, float] = (0.0, 0.0)):
+    """
+    Stop `distance` behind price once the position has been activate_r in profit
+    min_step: (long, short) ATR multiples a new stop must improve on the current one by
+    (keeps small moves from replacing the stop order)
+    """
+    def rule(x, out):
+        return x['price'] - x['side'] * out['distance'], out['peak_r'] >= activate_r
+    rule.kind = 'stop'
+    rule.name = 'trailing'
+    rule.trigger_r = activate_r
+    rule.min_step = tuple(min_step)
+    return rule
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# SCALE-OUT RULES
+# ════════════════════════════════════════════════════════════════════════════
+def scale_out(*levels: Tuple[float, float]):
+    """
+    Partial exits: (r_level, fraction of the remaining quantity) in ascending R
+    Sets out['scale_out'] to the number of levels reached
+    """
+    r_levels = tuple(r for r, _ in levels)
+
+    def rule(x, out):
+        out['scale_out'] = sum(out['peak_r'] >= level for level in r_levels)
+    rule.kind = 'scale_out'
+    rule.name = 'scale_out'
+    rule.trigger_r = r_levels[0] if r_levels else float('inf')
+    rule.levels = tuple(levels)
+    return rule
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# CHAIN
+# ════════════════════════════════════════════════════════════════════════════
+class ExitChain:
+    """
+    Rules grouped and ordered once; evaluate() has no per-call dispatch on rule types.
+    Rules use plain arithmetic and comparisons, so one live update costs a few float
+    operations while the same code broadcasts over arrays in a backtest.
+    """
+
+    def __init__(self, rules: Sequence):
+        kinds = [r.kind for r in rules]
+        if kinds != sorted(kinds, key=['distance', 'stop', 'scale_out'].index):
+            raise ValueError("Exit rules must be ordered: distance rules, then stop rules, then scale_out")
+        if 'distance' not in kinds and any(r.name == 'trailing' for r in rules):
+            raise ValueError("trailing needs a distance rule before it")
+        self.rules = tuple(rules)
+        self.distance_rules = tuple(r for r in rules if r.kind == 'distance')
+        self.stop_rules = tuple(r for r in rules if r.kind == 'stop')
+        self.scale_rule = next((r for r in rules if r.kind == 'scale_out'), None)
+        self.levels = self.scale_rule.levels if self.scale_rule else ()
+        self._steps = tuple((r.name, r.min_step) for r in self.stop_rules)
+        self._stepless = all(s == (0.0, 0.0) for _, s in self._steps)
+        # Below this peak R no rule can act (live callers skip the evaluation)
+        self.idle_below_r = min((r.trigger_r for r in rules if r.kind != 'distance'), default=float('inf'))
+
+    def evaluate(self, x: Dict) -> Dict:
+        """
+        Run every rule on the inputs
+        Returns: r, peak_r, distance, per stop rule its proposal (out[name]) and whether
+                 it is active (out[name + '_on']), scale_out (levels reached) and rule
+                 flags such as momentum_tight
+        """
+        r = x['side'] * (x['price'] - x['entry']) / x['risk']
+        peak_r = x.get('peak_r')
+        out = {'r': r, 'peak_r': r if peak_r is None else peak_r, 'scale_out': 0, 'momentum_tight': False}
+        for rule in self.distance_rules:
+            rule(x, out)
+        for rule in self.stop_rules:
+            out[rule.name], out[rule.name + '_on'] = rule(x, out)
+        if self.scale_rule:
+            self.scale_rule(x, out)
+        return out
+
+    def next_stop(self, sl: float, out: Dict, side: float, atr: float) -> Tuple[float, list]:
+        """
+        Apply one (scalar) evaluation to the current stop, in rule order
+        A proposal is taken when it beats the stop by the rule's min_step x ATR.
+        Returns: (new stop, names of the rules that moved it)
+        """
+        moved = []
+        for name, (step_long, step_short) in self._steps:
+            if not out[name + '_on']:
+                continue
+            proposal = float(out[name])
+            step = (step_long if side > 0 else step_short) * atr
+            if side * (proposal - sl) > step:
+                sl = proposal
+                moved.append(name)
+        return sl, moved
+
+    def stop_path(self, sl0: float, out: Dict, side: float, atr: np.ndarray) -> np.ndarray:
+        """Stop after each bar of a path (ratcheting; vectorized when no rule has a min_step)"""
+        n = len(out['r'])
+        if self._stepless:
+            best = np.full(n, side * sl0)
+            for name, _ in self._steps:
+                best = np.where(out[name + '_on'], np.maximum(best, side * out[name]), best)
+            return side * np.maximum.accumulate(best)
+        cols = {key: np.broadcast_to(out[key], (n,)) for name, _ in self._steps for key in (name, name + '_on')}
+        stops = np.empty(n)
+        sl = sl0
+        for i in range(n):
+            bar = {key: col[i] for key, col in cols.items()}
+            sl, _ = self.next_stop(sl, bar, side, atr[i])
+            stops[i] = sl
+        return stops
+
+
+def compile_chain(*rules) -> ExitChain:
+    return ExitChain(rules)
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# BACKTEST
+# ════════════════════════════════════════════════════════════════════════════
+def simulate_exit(chain: ExitChain, side: float, entry: float, risk: float, close: np.ndarray,
+                  high: np.ndarray, low: np.ndarray, atr: np.ndarray, avg_atr: Optional[np.ndarray] = None,
+                  momentum_ratio: Optional[np.ndarray] = None) -> Dict:
+    """
+    Walk a trade over the bars after entry (arrays start at the first bar after the entry bar)
+    Rules run at each bar close; the resulting stop applies from the next bar.
+    Partial exits fill at their R level. Returns exit_bar (None = still open), exit_price,
+    the stop path and the trade result in R (weighted over the partial exits).
+    """
+    n = len(close)
+    extreme = high if side > 0 else low
+    peak_r = np.maximum.accumulate(side * (extreme - entry) / risk)
+    x = {
+        'side': side, 'entry': entry, 'risk': risk, 'price': close, 'peak_r': peak_r, 'atr': atr,
+        'avg_atr': atr if avg_atr is None else avg_atr,
+        'momentum_ratio': np.full(n, np.nan) if momentum_ratio is None else momentum_ratio,
+    }
+    out = chain.evaluate(x)
+    stops = chain.stop_path(entry - side * risk, out, side, atr)
+
+    # Stop in force during each bar: the initial stop, then the one set at the previous close
+    active = np.concatenate([[entry - side * risk], stops[:-1]])
+    hit = (low <= active) if side > 0 else (high >= active)
+    exit_bar = int(np.argmax(hit)) if hit.any() else None
+
+    # Levels reached before the stop bar (on the stop bar itself the order of touches is unknown)
+    remaining, result_r = 1.0, 0.0
+    reached = out['scale_out'][:exit_bar] if chain.levels else np.zeros(0, dtype=int)
+    for level_r, pct in chain.levels[:int(reached.max()) if reached.size else 0]:
+        result_r += remaining * pct * level_r
+        remaining -= remaining * pct
+
+    exit_price = None
+    if exit_bar is not None:
+        exit_price = float(active[exit_bar])
+        result_r += remaining * side * (exit_price - entry) / risk
+    return {'exit_bar': exit_bar, 'exit_price': exit_price, 'stops': stops, 'result_r': result_r,
+            'remaining': remaining if exit_bar is None else 0.0}
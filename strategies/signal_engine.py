@@ -0,0 +1,129 @@
+# signal_engine.py
+# Columnar signal rules shared by the live bots and the backtests.
+# Rules take NumPy column arrays and return BUY/SELL masks for a range of bars:
+# live trading evaluates the last bar, research evaluates every bar, same code.
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+SIGNAL_COLUMNS = (
+    'open', 'high', 'low', 'close', 'volume',
+    'rsi', 'bb_upper', 'bb_middle', 'bb_lower', 'volume_sma',
+)
+
+VOLUME_SURGE_MULT = 1.5
+
+
+def columns_from_df(df, names=SIGNAL_COLUMNS) -> Dict[str, np.ndarray]:
+    """Column arrays for the rules (no copy for float64 columns)"""
+    return {name: df[name].to_numpy(dtype=np.float64) for name in names}
+
+
+def _bar_index(n: int, lookback: int, start: Optional[int], stop: Optional[int]) -> np.ndarray:
+    """Bars to evaluate; bars without enough history for the rule are skipped"""
+    start = 0 if start is None else (start + n if start < 0 else start)
+    stop = n if stop is None else (stop + n if stop < 0 else min(stop, n))
+    return np.arange(max(start, lookback), stop)
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# RULE SETS
+# ════════════════════════════════════════════════════════════════════════════
+def momentum_breakout_rules(c: Dict[str, np.ndarray], i: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    v3 rules: RSI momentum over 3 bars + close crossing the BB middle
+    + higher lows / lower highs + middle-band slope + volume surge + band expansion
+    """
+    rsi, close, mid = c['rsi'], c['close'], c['bb_middle']
+
+    volume_surge = c['volume'][i] > c['volume_sma'][i] * VOLUME_SURGE_MULT
+    band_width = c['bb_upper'] - c['bb_lower']
+    expanding = band_width[i] > band_width[i - 1] * 1.1
+
+    buy = (
+        (rsi[i] > 50) & (rsi[i] > rsi[i - 1]) & (rsi[i - 1] > rsi[i - 2]) & (rsi[i] < 70)
+        & (close[i] > mid[i]) & (close[i - 1] <= mid[i - 1]) & (close[i] > c['open'][i])
+        & (c['low'][i] > c['low'][i - 2])
+        & (mid[i] > mid[i - 4])
+        & volume_surge & expanding
+    )
+    sell = (
+        (rsi[i] < 50) & (rsi[i] < rsi[i - 1]) & (rsi[i - 1] < rsi[i - 2]) & (rsi[i] > 30)
+        & (close[i] < mid[i]) & (close[i - 1] >= mid[i - 1]) & (close[i] < c['open'][i])
+        & (c['high'][i] < c['high'][i - 2])
+        & (mid[i] < mid[i - 4])
+        & volume_surge & expanding
+    )
+    return buy, sell & ~buy
+
+
+momentum_breakout_rules.lookback = 4
+
+
+def rsi_bb_volume_rules(c: Dict[str, np.ndarray], i: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    v1/v2/signal_generator rules: RSI cross of 50 + close beyond the middle band
+    with a band breakout or expansion + volume surge
+    """
+    rsi, close = c['rsi'], c['close']
+    upper, mid, lower = c['bb_upper'], c['bb_middle'], c['bb_lower']
+
+    volume_surge = c['volume'][i] > c['volume_sma'][i] * VOLUME_SURGE_MULT
+    band_width = upper - lower
+    expanding = band_width[i] > band_width[i - 1]
+
+    buy = (
+        (rsi[i] > 50) & (rsi[i] > rsi[i - 1]) & (rsi[i - 1] >= 40)
+        & (close[i] > mid[i]) & ((close[i] > upper[i - 1]) | expanding)
+        & volume_surge
+    )
+    sell = (
+        (rsi[i] < 50) & (rsi[i] < rsi[i - 1]) & (rsi[i - 1] <= 60)
+        & (close[i] < mid[i]) & ((close[i] < lower[i - 1]) | expanding)
+        & volume_surge
+    )
+    return buy, sell & ~buy
+
+
+rsi_bb_volume_rules.lookback = 1
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# EVALUATION
+# ════════════════════════════════════════════════════════════════════════════
+def evaluate(rules, cols: Dict[str, np.ndarray], start: Optional[int] = None,
+             stop: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Evaluate a rule set over bars [start, stop)
+    Returns: (bar_indices, buy_mask, sell_mask)
+    """
+    n = len(cols['close'])
+    bars = _bar_index(n, rules.lookback, start, stop)
+    if len(bars) == 0:
+        empty = np.zeros(0, dtype=bool)
+        return bars, empty, empty
+    with np.errstate(invalid='ignore'):
+        buy, sell = rules(cols, bars)
+    return bars, buy, sell
+
+
+def signal_at(rules, cols: Dict[str, np.ndarray], bar: int = -1) -> Optional[str]:
+    """Live path: 'BUY', 'SELL' or None for a single bar (default: the last one)"""
+    n = len(cols['close'])
+    bar = bar + n if bar < 0 else bar
+    bars, buy, sell = evaluate(rules, cols, bar, bar + 1)
+    if len(bars) == 0:
+        return None
+    if buy[0]:
+        return 'BUY'
+    if sell[0]:
+        return 'SELL'
+    return None
+
+
+def signal_column(rules, cols: Dict[str, np.ndarray], start: Optional[int] = None) -> np.ndarray:
+    """Research path: object array of 'BUY' / 'SELL' / '' for every bar"""
+    out = np.full(len(cols['close']), '', dtype=object)
+    bars, buy, sell = evaluate(rules, cols, start)
+    out[bars[buy]] = 'BUY'
+    out[bars[sell]] = 'SELL'
+    return out
@@ -1,16 +1,17 @@
 # realtime_ohlcv_binance_futures_testnet_rsi_bb_volume.py
 # Streams ETHUSDT 1h (futures) from Binance TESTNET → computes RSI+BB+Volume signals → saves to CSV
 import asyncio
+import io
 import pandas as pd
 import numpy as np
-import ccxt.async_support as ccxt  # for historical fetch
-import ccxt.pro as ccxtpro  # for websocket
 import talib
 from datetime import datetime, timedelta
 import os
+import sys
 import time
-from ccxt.pro import binanceusdm
-from config.api_keys import API_KEY, API_SECRET
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.exchange_factory import get_exchange, close_shared
+from strategies.signal_engine import columns_from_df, signal_at, signal_column, rsi_bb_volume_rules
 
 # ────────────────────────────────────────────────
 # CONFIG
@@ -21,6 +22,12 @@ HISTORY_DAYS = 3
 CSV_PATH = f'ethusdt_{TIMEFRAME}_rsi_bb_volume_signals_futures_{HISTORY_DAYS}d.csv'
 SAVE_EVERY = 10  # seconds between forced saves
 MIN_CANDLES_FOR_IND = 100
+WINDOW_BARS = 500  # Bars kept in memory for indicator warmup; older bars live only in the CSV journal
+
+CSV_COLUMNS = [
+    'timestamp', 'open', 'high', 'low', 'close', 'volume',
+    'rsi', 'bb_upper', 'bb_middle', 'bb_lower', 'atr', 'volume_sma', 'signal',
+]
 
 # Set to True when you want to use real testnet API keys (for future execution logic)
 USE_API_KEYS = True
@@ -29,39 +36,83 @@ USE_API_KEYS = True
 # Helper: Load historical futures data from TESTNET
 # ────────────────────────────────────────────────
 async def load_historical_data():
-    exchange = ccxt.binanceusdm({'apiKey': API_KEY,
-                                  'secret': API_SECRET,
-                                  'enableRateLimit': True,
-                                  'options': {
-                                      'adjustForTimeDifference': True,
-                                  },
-                                  })
-    # Activate testnet (sandbox mode)
-    exchange.set_sandbox_mode(True)
+    # Shared testnet client: the same connection is reused for the WebSocket stream
+    exchange = await get_exchange('sandbox')
+
+    since = int((datetime.utcnow() - timedelta(days=HISTORY_DAYS)).timestamp() * 1000)
+    print(f"Fetching historical futures data (testnet) since {datetime.utcfromtimestamp(since/1000)} UTC ...")
+    ohlcv = []
+    while since < int(time.time() * 1000):
+        data = await exchange.fetch_ohlcv(SYMBOL, TIMEFRAME, since=since, limit=1000)
+        if not data:
+            break
+        ohlcv.extend(data)
+        since = data[-1][0] + 1
+        await asyncio.sleep(0.4)  # slightly longer delay for safety
+
+    if not ohlcv:
+        print("No historical data fetched.")
+        return pd.DataFrame()
+
+    df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    df = df.drop_duplicates(subset='timestamp', keep='last').reset_index(drop=True)
+    print(f"Loaded {len(df)} historical 1h futures candles (testnet).")
+    return df
 
-    try:
-        since = int((datetime.utcnow() - timedelta(days=HISTORY_DAYS)).timestamp() * 1000)
-        print(f"Fetching historical futures data (testnet) since {datetime.utcfromtimestamp(since/1000)} UTC ...")
-        ohlcv = []
-        while since < int(time.time() * 1000):
-            data = await exchange.fetch_ohlcv(SYMBOL, TIMEFRAME, since=since, limit=1000)
-            if not data:
-                break
-            ohlcv.extend(data)
-            since = data[-1][0] + 1
-            await asyncio.sleep(0.4)  # slightly longer delay for safety
-
-        if not ohlcv:
-            print("No historical data fetched.")
-            return pd.DataFrame()
-
-        df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        df = df.drop_duplicates(subset='timestamp', keep='last').reset_index(drop=True)
-        print(f"Loaded {len(df)} historical 1h futures candles (testnet).")
-        return df
-    finally:
-        await exchange.close()
+
+# ────────────────────────────────────────────────
+# CSV journal: closed bars are appended once, the forming bar is rewritten in place
+# ────────────────────────────────────────────────
+class SignalJournal:
+    """
+    The signal CSV as an append-only journal
+    Closed bars are written once; saving the forming bar truncates back to the end of the
+    closed rows and rewrites only that row, so a save costs the same after a week as after
+    a minute. Readers still see every bar with the forming one last.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.closed_end = 0  # Byte offset where the closed rows end
+
+    @staticmethod
+    def _rows(df: pd.DataFrame, header: bool = False) -> str:
+        return df.reindex(columns=CSV_COLUMNS).to_csv(index=False, header=header, float_format='%.8f')
+
+    def rewrite(self, df: pd.DataFrame):
+        """Write the whole frame (startup); its last row is the forming bar"""
+        with open(self.path, 'w', newline='') as f:
+            f.write(self._rows(df.iloc[:-1], header=True))
+            self.closed_end = f.tell()
+            f.write(self._rows(df.iloc[-1:]))
+
+    def append_closed(self, rows: pd.DataFrame):
+        """Replace the forming row with the bar(s) that just closed"""
+        with open(self.path, 'r+', newline='') as f:
+            f.seek(self.closed_end)
+            f.truncate()
+            f.write(self._rows(rows))
+            self.closed_end = f.tell()
+
+    def write_forming(self, row: pd.DataFrame):
+        with open(self.path, 'r+', newline='') as f:
+            f.seek(self.closed_end)
+            f.truncate()
+            f.write(self._rows(row))
+
+
+def read_journal_tail(path: str = CSV_PATH, rows: int = 2) -> pd.DataFrame:
+    """Last rows of the signal CSV without parsing the whole file"""
+    with open(path, 'rb') as f:
+        header = f.readline()
+        f.seek(0, os.SEEK_END)
+        start = max(len(header), f.tell() - 4096 * rows)
+        f.seek(start)
+        lines = f.read().splitlines()
+    if start > len(header):
+        lines = lines[1:]  # First line may be cut
+    return pd.read_csv(io.BytesIO(header + b'\n'.join(lines[-rows:])))
 
 
 # ────────────────────────────────────────────────
@@ -87,81 +138,41 @@ def compute_indicators(df):
 def detect_signals(df):
     if len(df) < 2:
         return
-    i = -1  # newest
-    prev = -2
-
-    rsi_buy = (df['rsi'].iloc[i] > 50) and \
-              (df['rsi'].iloc[i] > df['rsi'].iloc[prev]) and \
-              (df['rsi'].iloc[prev] >= 40)
-    bb_buy = (df['close'].iloc[i] > df['bb_middle'].iloc[i]) and \
-             (df['close'].iloc[i] > df['bb_upper'].iloc[prev] or
-              (df['bb_upper'].iloc[i] - df['bb_lower'].iloc[i]) >
-              (df['bb_upper'].iloc[prev] - df['bb_lower'].iloc[prev]))
-    volume_buy = df['volume'].iloc[i] > df['volume_sma'].iloc[i] * 1.5
-
-    if rsi_buy and bb_buy and volume_buy:
-        price = df['close'].iloc[i]
-        atr_val = df['atr'].iloc[i]
-        risk_pct = 1.1 * atr_val / price
+    cols = columns_from_df(df)
+    sig = signal_at(rsi_bb_volume_rules, cols)
+    if sig is None:
+        return
+
+    price = cols['close'][-1]
+    atr_val = df['atr'].iloc[-1]
+    risk_pct = 1.1 * atr_val / price
+    if sig == 'BUY':
         sl = price * (1 - risk_pct)
         tp = price * (1 + 3 * risk_pct)
-        print(f"  🚀 BUY SIGNAL @ {price:,.2f} | {df['timestamp'].iloc[i]}")
-        print(f"     RSI {df['rsi'].iloc[i]:.1f}")
-        print(f"     SL ≈ {sl:,.2f} | TP(1:3) ≈ {tp:,.2f}")
-        df.iloc[i, df.columns.get_loc('signal')] = 'BUY'
-
-    # SELL
-    rsi_sell = (df['rsi'].iloc[i] < 50) and \
-               (df['rsi'].iloc[i] < df['rsi'].iloc[prev]) and \
-               (df['rsi'].iloc[prev] <= 60)
-    bb_sell = (df['close'].iloc[i] < df['bb_middle'].iloc[i]) and \
-              (df['close'].iloc[i] < df['bb_lower'].iloc[prev] or
-               (df['bb_upper'].iloc[i] - df['bb_lower'].iloc[i]) >
-               (df['bb_upper'].iloc[prev] - df['bb_lower'].iloc[prev]))
-    volume_sell = df['volume'].iloc[i] > df['volume_sma'].iloc[i] * 1.5
-
-    if rsi_sell and bb_sell and volume_sell:
-        price = df['close'].iloc[i]
-        atr_val = df['atr'].iloc[i]
-        risk_pct = 1.1 * atr_val / price
+        print(f"  🚀 BUY SIGNAL @ {price:,.2f} | {df['timestamp'].iloc[-1]}")
+    else:
         sl = price * (1 + risk_pct)
         tp = price * (1 - 3 * risk_pct)
-        print(f"  🔴 SELL SIGNAL @ {price:,.2f} | {df['timestamp'].iloc[i]}")
-        print(f"     RSI {df['rsi'].iloc[i]:.1f}")
-        print(f"     SL ≈ {sl:,.2f} | TP(1:3) ≈ {tp:,.2f}")
-        df.iloc[i, df.columns.get_loc('signal')] = 'SELL'
+        print(f"  🔴 SELL SIGNAL @ {price:,.2f} | {df['timestamp'].iloc[-1]}")
+    print(f"     RSI {cols['rsi'][-1]:.1f}")
+    print(f"     SL ≈ {sl:,.2f} | TP(1:3) ≈ {tp:,.2f}")
+    df.iloc[-1, df.columns.get_loc('signal')] = sig
 
 
 def backtest_signals(df):
     if len(df) < 50 or 'signal' not in df.columns:
         return
     print("Backtesting signals on historical futures data...")
-    buy_count = sell_count = 0
-    for idx in range(2, len(df)):
-        i = idx
-        prev = idx - 1
-        rsi_buy = (df['rsi'].iloc[i] > 50) and (df['rsi'].iloc[i] > df['rsi'].iloc[prev]) and (df['rsi'].iloc[prev] >= 40)
-        bb_buy = (df['close'].iloc[i] > df['bb_middle'].iloc[i]) and \
-                 (df['close'].iloc[i] > df['bb_upper'].iloc[prev] or
-                  (df['bb_upper'].iloc[i] - df['bb_lower'].iloc[i]) >
-                  (df['bb_upper'].iloc[prev] - df['bb_lower'].iloc[prev]))
-        volume_buy = df['volume'].iloc[i] > df['volume_sma'].iloc[i] * 1.5
-        if rsi_buy and bb_buy and volume_buy:
-            df.iloc[i, df.columns.get_loc('signal')] = 'BUY'
-            print(f"Historical BUY at row {i}: {df['timestamp'].iloc[i]}")
-            buy_count += 1
-
-        rsi_sell = (df['rsi'].iloc[i] < 50) and (df['rsi'].iloc[i] < df['rsi'].iloc[prev]) and (df['rsi'].iloc[prev] <= 60)
-        bb_sell = (df['close'].iloc[i] < df['bb_middle'].iloc[i]) and \
-                  (df['close'].iloc[i] < df['bb_lower'].iloc[prev] or
-                   (df['bb_upper'].iloc[i] - df['bb_lower'].iloc[i]) >
-                   (df['bb_upper'].iloc[prev] - df['bb_lower'].iloc[prev]))
-        volume_sell = df['volume'].iloc[i] > df['volume_sma'].iloc[i] * 1.5
-        if rsi_sell and bb_sell and volume_sell:
-            df.iloc[i, df.columns.get_loc('signal')] = 'SELL'
-            print(f"Historical SELL at row {i}: {df['timestamp'].iloc[i]}")
-            sell_count += 1
+    signals = signal_column(rsi_bb_volume_rules, columns_from_df(df), start=2)
+    hits = np.flatnonzero(signals != '')
+    df.iloc[hits, df.columns.get_loc('signal')] = signals[hits]
 
+    timestamps = df['timestamp'].to_numpy()
+    for i in hits:
+        print(f"Historical {signals[i]} at row {i}: {pd.Timestamp(timestamps[i])}")
+
+    buy_count = int((signals == 'BUY').sum())
+    sell_count = int((signals == 'SELL').sum())
     print(f"Backtest complete. Found {buy_count + sell_count} signals (BUY: {buy_count}, SELL: {sell_count})")
 
 
@@ -169,30 +180,23 @@ async def main():
     # Load history from testnet futures
     df = await load_historical_data()
     if df.empty:
-        df = pd.DataFrame(columns=[
-            'timestamp', 'open', 'high', 'low', 'close', 'volume',
-            'rsi', 'bb_upper', 'bb_middle', 'bb_lower', 'atr', 'volume_sma', 'signal'
-        ])
+        df = pd.DataFrame(columns=CSV_COLUMNS)
     else:
         if 'signal' not in df.columns:
             df['signal'] = ''
 
+    journal = SignalJournal(CSV_PATH)
     if not df.empty:
         compute_indicators(df)
         backtest_signals(df)
-        df.to_csv(CSV_PATH, index=False, float_format='%.8f')
+    journal.rewrite(df)
+    if not df.empty:
         print(f"  Saved historical futures data + signals → {CSV_PATH}")
+        df = df.iloc[-WINDOW_BARS:].reset_index(drop=True)
 
     exchange = None
     try:
-        exchange = ccxtpro.binance({
-            'enableRateLimit': True,
-            'options': {
-                'defaultType': 'future',  # ← futures
-            },
-        })
-        # Activate TESTNET
-        exchange.set_sandbox_mode(True)
+        exchange = await get_exchange('sandbox')
 
         print(f"  Starting WebSocket stream for {SYMBOL} {TIMEFRAME} (Futures Testnet) ...")
         print("Signals will be marked in CSV column 'signal' ")
@@ -208,6 +212,9 @@ async def main():
                 if not df.empty and df['timestamp'].iloc[-1] == ts_dt:
                     df.loc[df.index[-1], ['open','high','low','close','volume']] = candle[1:6]
                 else:
+                    if not df.empty:
+                        # The previous bar has closed: journal it with its final signal
+                        journal.append_closed(df.iloc[-1:])
                     new_row = {
                         'timestamp': ts_dt,
                         'open': float(candle[1]),
@@ -217,14 +224,16 @@ async def main():
                         'volume': float(candle[5]),
                     }
                     df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
+                    if len(df) > WINDOW_BARS:
+                        df = df.iloc[-WINDOW_BARS:].reset_index(drop=True)
 
                 compute_indicators(df)
                 detect_signals(df)
 
                 current_time = time.time()
                 if current_time - last_save_time >= SAVE_EVERY:
-                    df.to_csv(CSV_PATH, index=False, float_format='%.8f')
-                    print(f"  Saved {len(df)} rows → {CSV_PATH} ({df['timestamp'].iloc[-1]})")
+                    journal.write_forming(df.iloc[-1:])
+                    print(f"  Saved forming bar → {CSV_PATH} ({df['timestamp'].iloc[-1]})")
                     last_save_time = current_time
 
             except Exception as e:
@@ -235,12 +244,12 @@ async def main():
         print("  Stopped by user.")
     finally:
         if exchange:
-            await exchange.close()
+            await close_shared()
         if not df.empty:
             compute_indicators(df)
             detect_signals(df)
-            df.to_csv(CSV_PATH, index=False, float_format='%.8f')
-            print(f"  Final save → {len(df)} rows → {CSV_PATH}")
+            journal.write_forming(df.iloc[-1:])
+            print(f"  Final save → {CSV_PATH} ({df['timestamp'].iloc[-1]})")
 
 
 if __name__ == "__main__":
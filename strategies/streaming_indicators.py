@@ -0,0 +1,106 @@
+# streaming_indicators.py
+# Indicators maintained incrementally, one closed bar at a time, so the
+# per-tick path reads a float instead of re-downloading and recomputing history.
+import math
+from collections import deque
+from typing import Optional, Sequence
+
+
+class IncrementalATR:
+    """
+    Wilder ATR updated once per closed bar.
+    Seeded with the same bars it produces the same values as talib.ATR.
+    """
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.value: Optional[float] = None
+        self.prev_close: Optional[float] = None
+        self.last_bar_ts: Optional[int] = None
+        self._seed_trs = []
+
+    def seed(self, ohlcv: Sequence[Sequence[float]]):
+        """Rebuild from closed candles [ts, open, high, low, close, volume]"""
+        self.value = None
+        self.prev_close = None
+        self.last_bar_ts = None
+        self._seed_trs = []
+        for candle in ohlcv:
+            self.update(candle)
+
+    def update(self, candle: Sequence[float]) -> Optional[float]:
+        """Add one closed candle; candles at or before the last one are ignored"""
+        ts = int(candle[0])
+        if self.last_bar_ts is not None and ts <= self.last_bar_ts:
+            return self.value
+        self.last_bar_ts = ts
+
+        high, low, close = float(candle[2]), float(candle[3]), float(candle[4])
+        if self.prev_close is None:
+            # talib has no true range for the first bar
+            self.prev_close = close
+            return None
+
+        tr = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+
+        if self.value is None:
+            self._seed_trs.append(tr)
+            if len(self._seed_trs) == self.period:
+                self.value = sum(self._seed_trs) / self.period
+                self._seed_trs = []
+        else:
+            self.value = (self.value * (self.period - 1) + tr) / self.period
+        return self.value
+
+
+class RollingTrailStats:
+    """
+    Candle features of the trailing logic, updated once per closed bar:
+    - mean absolute close-to-close move over the recent and the earlier momentum window
+      (same windows as detect_momentum_slowdown: the last `lookback` closes and the
+      `lookback` closes before them)
+    - rolling mean of ATR over `atr_window` bars (NaN ATRs are skipped, like Series.mean)
+    Readers get plain floats, so a tick costs no pandas work.
+    """
+
+    def __init__(self, lookback: int = 5, atr_window: int = 50):
+        self.lookback = lookback
+        self.atr_window = atr_window
+        self._closes = deque(maxlen=2 * lookback)
+        self._atrs = deque(maxlen=atr_window)
+        self.last_bar_ts: Optional[int] = None
+        self.recent_avg_move: Optional[float] = None
+        self.earlier_avg_move: Optional[float] = None
+        self.avg_atr: Optional[float] = None
+
+    def seed(self, bars: Sequence[Sequence[float]]):
+        """Rebuild from closed bars [(ts, close, atr), ...]"""
+        self._closes.clear()
+        self._atrs.clear()
+        self.last_bar_ts = None
+        for ts, close, atr in bars:
+            self.update(ts, close, atr)
+
+    def update(self, ts: int, close: float, atr: Optional[float] = None):
+        """Add one closed bar; bars at or before the last one are ignored"""
+        if self.last_bar_ts is not None and ts <= self.last_bar_ts:
+            return
+        self.last_bar_ts = ts
+        self._closes.append(float(close))
+        if atr is not None and not math.isnan(atr):
+            self._atrs.append(float(atr))
+
+        closes = list(self._closes)
+        n = self.lookback
+        if n > 1 and len(closes) >= 2 * n:
+            recent, earlier = closes[-n:], closes[-2 * n:-n]
+            self.recent_avg_move = sum(abs(b - a) for a, b in zip(recent, recent[1:])) / (n - 1)
+            self.earlier_avg_move = sum(abs(b - a) for a, b in zip(earlier, earlier[1:])) / (n - 1)
+        self.avg_atr = sum(self._atrs) / len(self._atrs) if len(self._atrs) == self.atr_window else None
+
+    def momentum_ratio(self) -> Optional[float]:
+        """Recent vs earlier mean move, None until both windows are filled (or no earlier movement)"""
+        if not self.earlier_avg_move:
+            return None
+        return self.recent_avg_move / self.earlier_avg_move
@@ -1,16 +1,15 @@
 # live_trader_futures_testnet_trailing.py
 # Real-time trading on Binance Futures TESTNET with trailing SL + breakeven
 import asyncio
-import ccxt.pro as ccxtpro
 import time
-import pandas as pd
-import numpy as np
-import talib
 from datetime import datetime, timezone
 import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config.api_keys import API_KEY, API_SECRET
+from utils.exchange_factory import create_exchange, prepare_exchange
+from strategies.streaming_indicators import IncrementalATR
+from utils.candle_aggregator import CandleAggregator
+from strategies.signal_generator import CSV_PATH as SIGNAL_CSV, read_journal_tail
 
 # ────────────────────────────────────────────────
 # CONFIG
@@ -23,7 +22,12 @@ INITIAL_SL_MULT = 1.1
 BREAKEVEN_TRIGGER_R = 1.0
 TRAIL_ACTIVATE_AT_R = 1.5
 TRAIL_DISTANCE_MULT = 1.8
-POLL_INTERVAL_SEC = 15
+POLL_INTERVAL_SEC = 15      # Signal CSV / status cadence (stops react per tick)
+ATR_TIMEFRAME = '5m'         # Built from the base stream by the candle aggregator
+BASE_TIMEFRAME = '1m'        # Kline stream feeding the aggregator when PRICE_STREAM is not 'trades'
+ATR_PERIOD = 14
+PRICE_STREAM = 'trades'     # 'trades' (every fill) or 'ticker'
+PRICE_STALE_SEC = 10        # Fall back to REST fetch_ticker when the stream is silent this long
 TRADE_LOG_FILE = 'logs/trades/trade_log.txt'
 
 # ────────────────────────────────────────────────
@@ -32,6 +36,14 @@ current_position = None
 exchange = None
 stop_order_id = None
 
+# Streaming market data
+last_price = None
+last_price_time = 0.0
+price_event = asyncio.Event()
+atr_tracker = IncrementalATR(ATR_PERIOD)
+candles = CandleAggregator(BASE_TIMEFRAME, [ATR_TIMEFRAME])  # One stream feeds every timeframe
+candles.subscribe(ATR_TIMEFRAME, on_close=atr_tracker.update)
+
 
 # ────────────────────────────────────────────────
 def log_trade(entry_side, entry_price, exit_price, quantity, reason=""):
@@ -64,15 +76,10 @@ def log_trade(entry_side, entry_price, exit_price, quantity, reason=""):
 
 async def init_exchange():
     global exchange, SYMBOL
-    exchange = ccxtpro.binanceusdm({
-        'apiKey': API_KEY,
-        'secret': API_SECRET,
-        'enableRateLimit': True,
-        'options': {'defaultType': 'future', 'adjustForTimeDifference': True},
-    })
-    exchange.enableDemoTrading(True)
+    exchange = create_exchange('demo')
     print("Loading markets...")
-    await exchange.load_markets(reload=True)
+    source = await prepare_exchange(exchange, 'demo')
+    print(f"{len(exchange.markets)} markets from {source}")
 
     # Auto-detect symbol
     detected = next((m for m in exchange.markets if 'ETH' in m and 'USDT' in m), None)
@@ -108,23 +115,75 @@ async def get_current_price_and_atr():
         return None
 
 
-async def get_atr():
-    """Get ATR from historical data"""
+async def seed_atr():
+    """Seed the incremental ATR once from closed 5m candles (the only ATR REST call)"""
     try:
-        ohlcv = await exchange.fetch_ohlcv(SYMBOL, '5m', limit=100)
+        ohlcv = await exchange.fetch_ohlcv(SYMBOL, ATR_TIMEFRAME, limit=100)
         if len(ohlcv) < 30:
             return None
-        df = pd.DataFrame(ohlcv, columns=['ts', 'o', 'h', 'l', 'c', 'v'])
-        close = df['c'].astype(float).to_numpy()
-        high = df['h'].astype(float).to_numpy()
-        low = df['l'].astype(float).to_numpy()
-        atr = float(talib.ATR(high, low, close, timeperiod=14)[-1])
-        return None if np.isnan(atr) else atr
+        atr_tracker.seed(ohlcv[:-1])  # Last candle is still forming
+        candles.seed(ATR_TIMEFRAME, ohlcv[:-1], forming=ohlcv[-1])
+        return atr_tracker.value
     except Exception as e:
         print(f"ATR error: {e}")
         return None
 
 
+async def stream_base_candles():
+    """
+    Feed base klines into the candle aggregator (only needed when prices come from the
+    ticker; the trade stream feeds it directly). The ATR updates when a 5m bar closes.
+    """
+    while True:
+        try:
+            for candle in await exchange.watch_ohlcv(SYMBOL, BASE_TIMEFRAME):
+                candles.update(candle)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Candle stream error: {type(e).__name__} → {e}")
+            await asyncio.sleep(5)
+
+
+async def stream_prices():
+    """Keep last_price current from the websocket and wake the main loop on every update"""
+    global last_price, last_price_time
+    while True:
+        try:
+            if PRICE_STREAM == 'trades':
+                trades = await exchange.watch_trades(SYMBOL)
+                for trade in trades:
+                    candles.update_trade(trade['timestamp'], trade['price'], trade.get('amount') or 0.0)
+                price = trades[-1]['price'] if trades else None
+            else:
+                ticker = await exchange.watch_ticker(SYMBOL)
+                price = ticker.get('last')
+            if price:
+                last_price = float(price)
+                last_price_time = time.time()
+                price_event.set()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Price stream error: {type(e).__name__} → {e}")
+            await asyncio.sleep(2)
+
+
+async def wait_for_price(timeout: float):
+    """
+    Wait for the next streamed price; fall back to REST when the stream is stale
+    Returns: latest price or None
+    """
+    try:
+        await asyncio.wait_for(price_event.wait(), timeout=timeout)
+    except asyncio.TimeoutError:
+        pass
+    price_event.clear()
+    if last_price is None or time.time() - last_price_time > PRICE_STALE_SEC:
+        return await get_current_price_and_atr()
+    return last_price
+
+
 async def cancel_all_stop_orders():
     """Cancel all existing STOP orders and VERIFY they're gone"""
     try:
@@ -201,18 +260,11 @@ async def place_entry(side: str, signal_price: float, atr: float):
         print(f"Entry failed: {type(e).__name__} → {e}")
 
 
-async def update_trailing_or_close():
+async def update_trailing_or_close(price: float, atr: float):
     global current_position, stop_order_id
     if not current_position:
         return
 
-    price = await get_current_price_and_atr()
-    if price is None:
-        return
-    atr = await get_atr()
-    if atr is None:
-        return
-
     entry = current_position['entry_price']
     side = current_position['side']
     risk = current_position['initial_risk']
@@ -297,22 +349,25 @@ async def close_position(price=None, reason="Manual/SL/TP"):
 # ────────────────────────────────────────────────
 # Signal source
 # ────────────────────────────────────────────────
-LAST_SIGNAL_ROW = -1
+LAST_SIGNAL_TS = None  # Bar timestamp of the last signal acted on
 
 
 async def get_signal():
-    global LAST_SIGNAL_ROW
+    """
+    Newest signal on the forming or just-closed bar of the signal CSV, once per bar
+    Keyed by bar timestamp: row numbers change when signal_generator restarts and rewrites the file
+    """
+    global LAST_SIGNAL_TS
     try:
-        df = pd.read_csv('ethusdt_3m_rsi_bb_volume_signals_futures_3d.csv')
-        if len(df) == 0:
-            return None
-        latest_idx = df.index[-1]
-        if latest_idx <= LAST_SIGNAL_ROW:
-            return None
-        sig = str(df.iloc[-1].get('signal', '')).strip().upper()
-        if sig in ['BUY', 'SELL']:
-            LAST_SIGNAL_ROW = latest_idx
-            print(f"New signal: {sig} (row {latest_idx})")
+        df = read_journal_tail(SIGNAL_CSV, rows=2)
+        for ts, sig in zip(reversed(df['timestamp'].tolist()), reversed(df['signal'].tolist())):
+            sig = str(sig).strip().upper()
+            if sig not in ['BUY', 'SELL']:
+                continue
+            if LAST_SIGNAL_TS is not None and ts <= LAST_SIGNAL_TS:
+                return None
+            LAST_SIGNAL_TS = ts
+            print(f"New signal: {sig} (bar {ts})")
             return sig
     except Exception as e:
         print(f"CSV error: {e}")
@@ -357,19 +412,33 @@ async def main_loop():
         with open(TRADE_LOG_FILE, 'w', encoding='utf-8') as f:
             f.write("Timestamp | Side | Entry | Exit | Qty | PNL USDT | PNL % | Reason\n")
 
+    # Market data: ATR seeded once over REST, then price and ATR come from websockets
+    await seed_atr()
+    stream_tasks = [asyncio.create_task(stream_prices())]
+    if PRICE_STREAM != 'trades':
+        stream_tasks.append(asyncio.create_task(stream_base_candles()))
+    last_poll = 0.0
+
     while True:
         try:
-            signal = await get_signal()
-            price = await get_current_price_and_atr()
-            atr = await get_atr()
+            price = await wait_for_price(POLL_INTERVAL_SEC)
+            atr = atr_tracker.value
 
             if price is None or atr is None:
-                await asyncio.sleep(POLL_INTERVAL_SEC)
+                await asyncio.sleep(1)
                 continue
 
-            # Status line
+            # Stop decisions react to every tick
+            if current_position:
+                await update_trailing_or_close(price, atr)
+
+            # Signal check + status line at the poll cadence
+            if time.time() - last_poll < POLL_INTERVAL_SEC:
+                continue
+            last_poll = time.time()
+            signal = await get_signal()
+
             if current_position:
-                await update_trailing_or_close()
                 direction = "Long" if current_position['side'] == 'long' else "Short"
                 # Correct PNL calculation for both LONG and SHORT
                 if current_position['side'] == 'long':
@@ -380,19 +449,16 @@ async def main_loop():
                 print(f"[{datetime.now(timezone.utc).strftime('%H:%M:%S')}] {direction} open @ {current_position['entry_price']:.2f} | "
                       f"Price: {price:.2f} | PNL: {pnl_sign}{pnl_raw:.2f} USDT | SL: {current_position['sl_price']:.2f}")
 
-            balance = await exchange.fetch_balance()
-            usdt_free = balance.get('USDT', {}).get('free', 0)
-            if usdt_free < POSITION_SIZE_USDT * 1.1:
-                print("Skipping entry: low balance")
-                await asyncio.sleep(POLL_INTERVAL_SEC)
-                continue
-
             if signal in ['BUY', 'SELL'] and not current_position:
+                # Balance only matters when there is something to enter
+                balance = await exchange.fetch_balance()
+                usdt_free = balance.get('USDT', {}).get('free', 0)
+                if usdt_free < POSITION_SIZE_USDT * 1.1:
+                    print("Skipping entry: low balance")
+                    continue
                 print(f"  SIGNAL DETECTED: {signal} @ {price:.2f}")
                 await place_entry(signal, price, atr)
 
-            await asyncio.sleep(POLL_INTERVAL_SEC)
-
         except KeyboardInterrupt:
             print("  Stopped by user.")
             break
@@ -400,6 +466,8 @@ async def main_loop():
             print(f"Loop error: {type(e).__name__} → {str(e)}")
             await asyncio.sleep(30)
 
+    for task in stream_tasks:
+        task.cancel()
     if current_position:
         await close_position(reason="Script stopped")
     await exchange.close()
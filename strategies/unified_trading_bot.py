@@ -12,6 +12,7 @@ import time
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config.api_keys import API_KEY, API_SECRET
+from strategies.signal_engine import columns_from_df, signal_at, rsi_bb_volume_rules
 
 # ════════════════════════════════════════════════════════════════════════════
 # CONFIG
@@ -106,56 +107,30 @@ def detect_signal(df):
     if len(df) < 2:
         return None
 
-    # Check if indicators are available
-    if pd.isna(df['rsi'].iloc[-1]) or pd.isna(df['bb_middle'].iloc[-1]):
+    # Shared rule engine (strategies/signal_engine.py)
+    cols = columns_from_df(df)
+    signal = signal_at(rsi_bb_volume_rules, cols)
+    if signal is None:
         return None
 
-    i = -1  # Current candle
-    prev = -2  # Previous candle
-
-    # ──── BUY SIGNAL ────
-    rsi_buy = (df['rsi'].iloc[i] > 50) and \
-              (df['rsi'].iloc[i] > df['rsi'].iloc[prev]) and \
-              (df['rsi'].iloc[prev] >= 40)
-    bb_buy = (df['close'].iloc[i] > df['bb_middle'].iloc[i]) and \
-             (df['close'].iloc[i] > df['bb_upper'].iloc[prev] or
-              (df['bb_upper'].iloc[i] - df['bb_lower'].iloc[i]) >
-              (df['bb_upper'].iloc[prev] - df['bb_lower'].iloc[prev]))
-    volume_buy = df['volume'].iloc[i] > df['volume_sma'].iloc[i] * 1.5
-
-    if rsi_buy and bb_buy and volume_buy:
-        price = df['close'].iloc[i]
-        atr_val = df['atr'].iloc[i]
-        risk_pct = 1.1 * atr_val / price
+    price = cols['close'][-1]
+    rsi = cols['rsi'][-1]
+    atr_val = df['atr'].iloc[-1]
+    risk_pct = 1.1 * atr_val / price
+
+    if signal == 'BUY':
         sl = price * (1 - risk_pct)
         tp = price * (1 + 3 * risk_pct)
-        print(f"  🚀 BUY SIGNAL @ {price:,.2f} | {df['timestamp'].iloc[i]}")
-        print(f"     RSI {df['rsi'].iloc[i]:.1f} | ATR {atr_val:.2f}")
+        print(f"  🚀 BUY SIGNAL @ {price:,.2f} | {df['timestamp'].iloc[-1]}")
+        print(f"     RSI {rsi:.1f} | ATR {atr_val:.2f}")
         print(f"     Suggested SL ≈ {sl:,.2f} | TP(1:3) ≈ {tp:,.2f}")
-        return 'BUY'
-
-    # ──── SELL SIGNAL ────
-    rsi_sell = (df['rsi'].iloc[i] < 50) and \
-               (df['rsi'].iloc[i] < df['rsi'].iloc[prev]) and \
-               (df['rsi'].iloc[prev] <= 60)
-    bb_sell = (df['close'].iloc[i] < df['bb_middle'].iloc[i]) and \
-              (df['close'].iloc[i] < df['bb_lower'].iloc[prev] or
-               (df['bb_upper'].iloc[i] - df['bb_lower'].iloc[i]) >
-               (df['bb_upper'].iloc[prev] - df['bb_lower'].iloc[prev]))
-    volume_sell = df['volume'].iloc[i] > df['volume_sma'].iloc[i] * 1.5
-
-    if rsi_sell and bb_sell and volume_sell:
-        price = df['close'].iloc[i]
-        atr_val = df['atr'].iloc[i]
-        risk_pct = 1.1 * atr_val / price
+    else:
         sl = price * (1 + risk_pct)
         tp = price * (1 - 3 * risk_pct)
-        print(f"  🔴 SELL SIGNAL @ {price:,.2f} | {df['timestamp'].iloc[i]}")
-        print(f"     RSI {df['rsi'].iloc[i]:.1f} | ATR {atr_val:.2f}")
+        print(f"  🔴 SELL SIGNAL @ {price:,.2f} | {df['timestamp'].iloc[-1]}")
+        print(f"     RSI {rsi:.1f} | ATR {atr_val:.2f}")
         print(f"     Suggested SL ≈ {sl:,.2f} | TP(1:3) ≈ {tp:,.2f}")
-        return 'SELL'
-
-    return None
+    return signal
 
 
 # ════════════════════════════════════════════════════════════════════════════
@@ -1,6 +1,5 @@
 #!/home/ubuntu/.openclaw/workspace/live-crypto/myenv/bin/python
 import asyncio
-import ccxt.pro as ccxtpro
 import pandas as pd
 import numpy as np
 import talib
@@ -8,18 +7,40 @@ from datetime import datetime, timezone, timedelta
 import os
 import time
 import sys
+import pickle
 import threading
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config.api_keys import API_KEY, API_SECRET
+from utils.exchange_factory import MARKETS_CACHE_MAX_AGE_SEC, create_exchange, prepare_exchange, read_markets_cache
+from utils.heartbeat import HeartbeatWriter
+from utils.bar_close import BarCloseTracker
+from utils.market_data import TICK_TIMEFRAME, ConflatingBuffer, FirstArrivalFeed, pump_ohlcv, pump_shm
+from utils.scheduler import HousekeepingScheduler
+from utils.order_transport import RestTransport, create_order_transport
+from utils.candle_store import CandleStore, rows_to_frame
+from utils.history_downloader import HistoryDownloader
+from utils.account_sync import cancel_params, is_stop_order, order_key, state_fingerprint
+from strategies.signal_engine import columns_from_df, signal_at, momentum_breakout_rules
+from strategies.streaming_indicators import RollingTrailStats
+from strategies.exit_policies import (
+    compile_chain, fixed_distance, tiered_distance, volatility_scaled, momentum_cap, breakeven, trailing, scale_out,
+)
 
 # ════════════════════════════════════════════════════════════════════════════
 # CONFIG
 # ════════════════════════════════════════════════════════════════════════════
 
-SYMBOL = 'ETH/USDT:USDT'
-TIMEFRAME = '3m'
+# Overridable per instance by agent.py (config/bots.json)
+BOT_INSTANCE = os.environ.get('BOT_INSTANCE', 'default')
+SYMBOL = os.environ.get('BOT_SYMBOL', 'ETH/USDT:USDT')
+TIMEFRAME = os.environ.get('BOT_TIMEFRAME', '3m')
+# 'ws': own market-data websockets | 'shm': read market_data_daemon.py's shared-memory ring
+MARKET_DATA_SOURCE = os.environ.get('BOT_MARKET_DATA', 'ws')
+# Parallel kline websockets in 'ws' mode; the first copy of each update wins
+MARKET_DATA_CONNECTIONS = int(os.environ.get('BOT_MD_CONNECTIONS', '2'))
+# 'rest' or 'ws': entries, exits and stop updates over the ws-fapi trading API (REST fallback)
+ORDER_TRANSPORT = os.environ.get('BOT_ORDER_TRANSPORT', 'rest')
 POSITION_SIZE_USDT = 50
 LEVERAGE = 30
 
@@ -38,6 +59,7 @@ ENABLE_VOLATILITY_ADJUST = True     # Adapt to volatility changes
 TRAIL_TIGHT = 1.5    # < 3R profit
 TRAIL_MEDIUM = 1.8   # 3R - 6R profit  
 TRAIL_LOOSE = 2.5    # > 6R profit (let big winners run)
+TRAIL_MIN_STEP_ATR = (0.1, 0.3)  # (long, short) ATR a trailing move must gain before the stop order is replaced
 
 # Partial exit settings (if ENABLE_PARTIAL_EXITS = True)
 PARTIAL_EXIT_1_R = 2.0       # First exit at +2R
@@ -52,17 +74,35 @@ ENABLE_MOMENTUM_TRAILING = True      # Tighten trail when momentum slows
 MOMENTUM_LOOKBACK = 5                # Check momentum over last 5 candles
 MOMENTUM_SLOW_THRESHOLD = 0.3        # If momentum drops 70%, tighten trail
 MOMENTUM_TIGHT_MULT = 0.3            # Tighten trail to 0.8x ATR when slow
+AVG_ATR_WINDOW = 50                  # Bars in the volatility-adjustment ATR mean
+
+# ═══ TICK-LEVEL TRAILING (OPTIONAL) ═══
+ENABLE_TICK_TRAILING = False         # Drive trailing/breakeven from best bid/ask instead of kline pushes
+TICK_SOURCE = 'bookTicker'           # 'bookTicker' (best bid/ask) or 'trades' (aggTrades)
+TICK_STALE_SEC = 5                   # Candle path takes over trailing when ticks stop this long
 
 MIN_CANDLES_FOR_IND = 100
 HISTORY_DAYS = 3
+HISTORY_ATTEMPTS = 3                 # Downloads before a history with failed pages is given up on
+CANDLE_STORE_DIR = 'data/candles'    # Closed history kept between starts (shared by instances)
+MAX_BACKFILL_BARS = 499              # One REST page per candle gap; older bars fall outside the 500-candle buffer
+
+# Per-instance files get a suffix so several bots can share one checkout
+INSTANCE_SUFFIX = '' if BOT_INSTANCE == 'default' else f'_{BOT_INSTANCE}'
 
 TRADE_LOG_FILE = 'logs/trades/trade_log.txt'
-STATE_LOG_FILE = 'logs/state_debug.log'
+STATE_LOG_FILE = f'logs/state_debug{INSTANCE_SUFFIX}.log'
 
 # Timing and safety configs
-CANDLE_CLOSE_THRESHOLD = 0.95
+BAR_CLOSE_GRACE_SEC = 2.0       # Quiet stream past bar end this long → close the bar from REST
+WATCH_TIMEOUT_SEC = 15.0        # Stream silence counted as a network failure
 RECONCILE_INTERVAL_SEC = 30
+RECONCILE_TIMEOUT_SEC = 20       # Bounds the reconcile job's REST fetches (not the repairs that follow)
+MAX_RECONCILE_TIMEOUTS = 3       # Consecutive timed-out reconcile fetches before the circuit breaker
 MAX_ORPHAN_ORDER_AGE_SEC = 300
+ORDER_HISTORY_CLEANUP_SEC = 60
+STATUS_INTERVAL_SEC = 5         # Position status line
+HOUSEKEEPING_REPORT_SEC = 300   # Job duration summary in the state log
 
 # NEW: Circuit breaker configs
 MAX_SL_FAILURES = 3
@@ -74,21 +114,57 @@ PARTIAL_FILL_TOLERANCE = 0.95  # Accept fills >= 95% of requested
 ORDER_VERIFY_RETRIES = 5
 ORDER_VERIFY_BACKOFF_BASE = 0.5  # 0.5s, 1s, 2s, 4s, 5s
 
+# Warm-start snapshot configs
+SNAPSHOT_FILE = f'data/bot_snapshot{INSTANCE_SUFFIX}.pkl'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_INTERVAL_SEC = 30      # Persist state this often while running
+SNAPSHOT_MAX_AGE_SEC = 900      # Older snapshots fall back to a cold start
+
 # ════════════════════════════════════════════════════════════════════════════
 # GLOBALS
 # ════════════════════════════════════════════════════════════════════════════
 current_position: Optional[Dict[str, Any]] = None
 exchange = None
+order_transport: Optional[RestTransport] = None  # Entries, exits and stop updates (built in main_loop)
 stop_order_id = None
 price_df = pd.DataFrame()
 last_processed_candle_time = None
 last_reconcile_time = 0
+last_reconcile_fingerprint = None  # Exchange + local state of the last clean reconciliation
+last_reconcile_orders = {}  # {order_id: order_key} seen by the last reconciliation
+last_snapshot_time = 0
+last_candle_rx_time = None  # Wall-clock time of the last candle update received
+bar_events = BarCloseTracker(TIMEFRAME, BAR_CLOSE_GRACE_SEC)  # One close event per bar (final flag / next bar / REST)
+market_data = ConflatingBuffer()  # Latest kline state; updates that arrive during a slow iteration are conflated
+kline_feed: Optional[FirstArrivalFeed] = None  # Dedupes the redundant kline connections (built in main_loop)
 order_history = {}  # {order_id: timestamp}
+stop_cancels = set()  # Background cancels of superseded stops, referenced until they finish
+
+# Trailing features over closed bars (momentum windows, ATR mean)
+trail_stats = RollingTrailStats(MOMENTUM_LOOKBACK, AVG_ATR_WINDOW)
+
+# Tick trailing: per-bar features cached for the per-tick path
+trail_features: Dict[str, Any] = {'atr': None, 'avg_atr': None, 'momentum_ratio': None}
+tick_best_price = None      # Most favourable tick since the last trailing evaluation
+tick_position_ref = None    # Position the best price belongs to
+last_tick_time = 0.0
+
+# Order actions on the position (entry, trailing/partial exits, reconciliation repairs) hold
+# trade_lock; trade_epoch counts them so reconciliation can drop exchange data fetched across one
+trade_lock = asyncio.Lock()
+trade_epoch = 0
+
+# Reconciliation, cleanup, snapshots and status run beside the market-data loop (built in main_loop)
+housekeeping: Optional[HousekeepingScheduler] = None
+
+# Liveness reporting to agent.py (no-op when run standalone)
+heartbeat = HeartbeatWriter()
 
 # NEW: Circuit breaker state
 sl_placement_failures = 0
 consecutive_network_failures = 0
 consecutive_cancel_failures = 0
+consecutive_reconcile_timeouts = 0
 bot_halted = False
 
 # NEW: Thread safety
@@ -158,6 +234,9 @@ async def trigger_circuit_breaker(reason: str):
     
     bot_halted = True
     
+    # A halted bot needs a full cold start and reconciliation next time
+    discard_snapshot()
+    
     # Try to close position safely
     if current_position:
         try:
@@ -205,110 +284,68 @@ def compute_indicators(df: pd.DataFrame):
 # SIGNAL DETECTION
 # ════════════════════════════════════════════════════════════════════════════
 def detect_signal(df: pd.DataFrame) -> Optional[str]:
+    """Evaluate the momentum-breakout rules (strategies/signal_engine.py) on the last bar"""
     if len(df) < 30:
         return None
-    if pd.isna(df['rsi'].iloc[-1]) or pd.isna(df['bb_middle'].iloc[-1]):
-        return None
-    
-    i = -1
     
-    # ═══════════════════════════════════════════════════════════
-    # SHARED CALCULATIONS (used by both BUY and SELL)
-    # ═══════════════════════════════════════════════════════════
-    volume_surge = df['volume'].iloc[i] > df['volume_sma'].iloc[i] * 1.5
-    
-    band_width = df['bb_upper'].iloc[i] - df['bb_lower'].iloc[i]
-    prev_width = df['bb_upper'].iloc[-2] - df['bb_lower'].iloc[-2]
-    expanding = band_width > prev_width * 1.1
-    
-    # ═══════════════════════════════════════════════════════════
-    # BUY SIGNAL
-    # ═══════════════════════════════════════════════════════════
-    rsi_momentum = (
-        df['rsi'].iloc[i] > 50 and
-        df['rsi'].iloc[i] > df['rsi'].iloc[-2] and
-        df['rsi'].iloc[-2] > df['rsi'].iloc[-3] and
-        df['rsi'].iloc[i] < 70
-    )
-    
-    price_action = (
-        df['close'].iloc[i] > df['bb_middle'].iloc[i] and
-        df['close'].iloc[-2] <= df['bb_middle'].iloc[-2] and
-        df['close'].iloc[i] > df['open'].iloc[i]
-    )
+    cols = columns_from_df(df)
+    signal = signal_at(momentum_breakout_rules, cols)
+    if signal is None:
+        return None
     
-    higher_lows = df['low'].iloc[i] > df['low'].iloc[-3]
-    ema_slope = df['bb_middle'].iloc[i] > df['bb_middle'].iloc[-5]
+    price = cols['close'][-1]
+    rsi = cols['rsi'][-1]
+    vol_ratio = cols['volume'][-1] / cols['volume_sma'][-1]
+    risk_pct = 1.1 * df['atr'].iloc[-1] / price
     
-    if rsi_momentum and price_action and higher_lows and ema_slope and volume_surge and expanding:
-        price = df['close'].iloc[i]
-        atr_val = df['atr'].iloc[i]
-        risk_pct = 1.1 * atr_val / price
+    if signal == 'BUY':
         sl = price * (1 - risk_pct)
         tp = price * (1 + 3 * risk_pct)
-        
-        print(f"  🚀 STRONG BUY @ {price:,.2f} | {df['timestamp'].iloc[i]}")
-        print(f"     RSI {df['rsi'].iloc[i]:.1f} (momentum) | Vol {df['volume'].iloc[i]/df['volume_sma'].iloc[i]:.1f}x")
+        print(f"  🚀 STRONG BUY @ {price:,.2f} | {df['timestamp'].iloc[-1]}")
+        print(f"     RSI {rsi:.1f} (momentum) | Vol {vol_ratio:.1f}x")
         print(f"     SL: {sl:,.2f} | TP: {tp:,.2f} (1:3 R:R)")
-        log_state(f"BUY: price={price:.2f}, RSI={df['rsi'].iloc[i]:.1f}, vol_ratio={df['volume'].iloc[i]/df['volume_sma'].iloc[i]:.2f}")
-        return 'BUY'
-    
-    # ═══════════════════════════════════════════════════════════
-    # SELL SIGNAL
-    # ═══════════════════════════════════════════════════════════
-    rsi_momentum_down = (
-        df['rsi'].iloc[i] < 50 and
-        df['rsi'].iloc[i] < df['rsi'].iloc[-2] and
-        df['rsi'].iloc[-2] < df['rsi'].iloc[-3] and
-        df['rsi'].iloc[i] > 30
-    )
-    
-    price_action_down = (
-        df['close'].iloc[i] < df['bb_middle'].iloc[i] and
-        df['close'].iloc[-2] >= df['bb_middle'].iloc[-2] and
-        df['close'].iloc[i] < df['open'].iloc[i]
-    )
-    
-    lower_highs = df['high'].iloc[i] < df['high'].iloc[-3]
-    ema_slope_down = df['bb_middle'].iloc[i] < df['bb_middle'].iloc[-5]
-    
-    if rsi_momentum_down and price_action_down and lower_highs and ema_slope_down and volume_surge and expanding:
-        #                                                          ^^^^^^^^^^^^^^^^ ADDED THIS
-        price = df['close'].iloc[i]
-        atr_val = df['atr'].iloc[i]
-        risk_pct = 1.1 * atr_val / price
+        log_state(f"BUY: price={price:.2f}, RSI={rsi:.1f}, vol_ratio={vol_ratio:.2f}")
+    else:
         sl = price * (1 + risk_pct)
         tp = price * (1 - 3 * risk_pct)
-        
-        print(f"  🔴 STRONG SELL @ {price:,.2f} | {df['timestamp'].iloc[i]}")
-        print(f"     RSI {df['rsi'].iloc[i]:.1f} (momentum) | Vol {df['volume'].iloc[i]/df['volume_sma'].iloc[i]:.1f}x")
-        print(f"     SL: {sl:,.2f} | TP: {tp::.2f}")
-        log_state(f"SELL: price={price:.2f}, RSI={df['rsi'].iloc[i]:.1f}")
-        return 'SELL'
-    
-    return None
+        print(f"  🔴 STRONG SELL @ {price:,.2f} | {df['timestamp'].iloc[-1]}")
+        print(f"     RSI {rsi:.1f} (momentum) | Vol {vol_ratio:.1f}x")
+        print(f"     SL: {sl:,.2f} | TP: {tp:,.2f}")
+        log_state(f"SELL: price={price:.2f}, RSI={rsi:.1f}")
+    return signal
 
 # ════════════════════════════════════════════════════════════════════════════
 # EXCHANGE INITIALIZATION
 # ════════════════════════════════════════════════════════════════════════════
-async def init_exchange():
+async def init_exchange(snapshot: Optional[Dict[str, Any]] = None):
+    """
+    Create the exchange client. With a warm-start snapshot the cached markets
+    and time offset are reused and the account setup calls are skipped
+    (position mode and leverage persist on the exchange side).
+    """
     global exchange, SYMBOL
-    exchange = ccxtpro.binanceusdm({
-        'apiKey': API_KEY,
-        'secret': API_SECRET,
-        'enableRateLimit': True,
-        'options': {'defaultType': 'future', 'adjustForTimeDifference': True},
-    })
-    exchange.enableDemoTrading(False)  # LIVE MODE
+    exchange = create_exchange('live')  # LIVE MODE
+
+    if snapshot:
+        exchange.set_markets(snapshot['markets'])
+        exchange.options['timeDifference'] = snapshot.get('time_difference', 0)
+        print(f"Warm start: {len(exchange.markets)} cached markets | Using symbol: {SYMBOL}")
+        return exchange
+
     print("Loading markets...")
-    await exchange.load_markets(reload=True)
+    source = await prepare_exchange(exchange, 'live')
+    print(f"{len(exchange.markets)} markets from {source}")
 
-    detected = next((m for m in exchange.markets if 'ETH' in m and 'USDT' in m), None)
+    base = SYMBOL.split('/')[0]
+    if SYMBOL in exchange.markets:
+        detected = SYMBOL
+    else:
+        detected = next((m for m in exchange.markets if base in m and 'USDT' in m), None)
     if detected and detected != SYMBOL:
         print(f"Symbol updated: {SYMBOL} → {detected}")
         SYMBOL = detected
     if not detected:
-        raise ValueError("No ETH/USDT market found")
+        raise ValueError(f"No {base}/USDT market found")
     print(f"Using symbol: {SYMBOL}")
 
     try:
@@ -326,33 +363,173 @@ async def init_exchange():
     return exchange
 
 
+def create_market_data_clients(count: int) -> list:
+    """Extra public clients for redundant kline connections (markets shared with the main client)"""
+    clients = []
+    for _ in range(max(0, count)):
+        client = create_exchange('live', with_keys=False)
+        client.set_markets(exchange.markets)
+        clients.append(client)
+    return clients
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# WARM-START SNAPSHOT
+# ════════════════════════════════════════════════════════════════════════════
+def _write_pickle_atomic(path: str, obj: Any):
+    """Write a pickle next to the target and swap it in, so a crash never leaves a torn file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def save_snapshot():
+    """Persist candle buffer, indicators and position/stop bookkeeping for a warm restart"""
+    global last_snapshot_time
+
+    if price_df.empty:
+        return
+
+    with df_lock:
+        candles = price_df.copy()
+    with position_lock:
+        position = dict(current_position) if current_position else None
+
+    try:
+        _write_pickle_atomic(SNAPSHOT_FILE, {
+            'version': SNAPSHOT_VERSION,
+            'saved_at': time.time(),
+            'symbol': SYMBOL,
+            'timeframe': TIMEFRAME,
+            'price_df': candles,
+            'position': position,
+            'stop_order_id': stop_order_id,
+            'order_history': dict(order_history),
+            'last_processed_candle_time': last_processed_candle_time,
+        })
+        last_snapshot_time = time.time()
+    except Exception as e:
+        log_state(f"Snapshot write failed: {e}")
+
+
+def discard_snapshot():
+    """Remove the snapshot so the next start is a full cold start"""
+    try:
+        if os.path.exists(SNAPSHOT_FILE):
+            os.remove(SNAPSHOT_FILE)
+    except Exception as e:
+        log_state(f"Snapshot removal failed: {e}")
+
+
+def load_snapshot() -> Optional[Dict[str, Any]]:
+    """
+    Load the warm-start snapshot together with the markets cache
+    Returns: snapshot dict, or None when a cold start is required
+    """
+    if not os.path.exists(SNAPSHOT_FILE):
+        return None
+    # Markets and clock offset are only reused while fresh: a bot restarting within
+    # SNAPSHOT_MAX_AGE_SEC again and again must not keep the metadata of its last cold start
+    markets_cache = read_markets_cache('live')
+    if not markets_cache:
+        log_state(f"Markets cache missing or older than {MARKETS_CACHE_MAX_AGE_SEC}s, cold start")
+        return None
+
+    try:
+        with open(SNAPSHOT_FILE, 'rb') as f:
+            snapshot = pickle.load(f)
+    except Exception as e:
+        log_state(f"Snapshot unreadable, cold start: {e}")
+        return None
+
+    age = time.time() - snapshot.get('saved_at', 0)
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        reason = f"version {snapshot.get('version')} != {SNAPSHOT_VERSION}"
+    elif snapshot.get('symbol') != SYMBOL or snapshot.get('timeframe') != TIMEFRAME:
+        reason = f"snapshot is for {snapshot.get('symbol')} {snapshot.get('timeframe')}"
+    elif age > SNAPSHOT_MAX_AGE_SEC:
+        reason = f"snapshot is {age:.0f}s old (max {SNAPSHOT_MAX_AGE_SEC}s)"
+    elif SYMBOL not in markets_cache.get('markets', {}):
+        reason = f"{SYMBOL} missing from markets cache"
+    else:
+        reason = None
+
+    if reason:
+        log_state(f"Snapshot rejected, cold start: {reason}")
+        return None
+
+    snapshot['markets'] = markets_cache['markets']
+    snapshot['time_difference'] = markets_cache.get('time_difference', 0)
+    log_state(f"Snapshot accepted: {len(snapshot['price_df'])} candles, age {age:.0f}s, "
+              f"position={'yes' if snapshot['position'] else 'no'}")
+    return snapshot
+
+
+async def restore_from_snapshot(snapshot: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Restore bookkeeping from the snapshot and top up the candle buffer with a
+    single REST call. The restored position is validated by reconcile_state().
+    """
+    global current_position, stop_order_id, order_history, last_processed_candle_time
+
+    with position_lock:
+        current_position = snapshot['position']
+    stop_order_id = snapshot['stop_order_id']
+    order_history = snapshot['order_history']
+    last_processed_candle_time = snapshot['last_processed_candle_time']
+
+    df = snapshot['price_df']
+    last_ms = int(df['timestamp'].iloc[-1].timestamp() * 1000)
+
+    try:
+        data = await exchange.fetch_ohlcv(SYMBOL, TIMEFRAME, since=last_ms, limit=1000)
+    except Exception as e:
+        log_state(f"Snapshot top-up fetch failed: {e}")
+        data = []
+
+    if data:
+        fresh = pd.DataFrame(data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        fresh['timestamp'] = pd.to_datetime(fresh['timestamp'], unit='ms')
+        df = pd.concat([df[df['timestamp'] < fresh['timestamp'].iloc[0]], fresh], ignore_index=True)
+        df = df.iloc[-500:].reset_index(drop=True)
+
+    print(f"Restored {len(df)} candles from snapshot (+{len(data)} fetched)")
+    return df
+
+
 # ════════════════════════════════════════════════════════════════════════════
 # HISTORICAL DATA
 # ════════════════════════════════════════════════════════════════════════════
 async def load_historical_data() -> pd.DataFrame:
-    """Load recent historical data for initial indicators"""
+    """
+    Load recent historical data for initial indicators: pages fetched in parallel,
+    bars already in the candle store are not downloaded again
+    A history with holes (pages that failed every retry) is never used: the download is
+    repeated (pages already stored are skipped), and after HISTORY_ATTEMPTS the bot starts
+    without history, so no signal is computed until enough bars arrive from the stream
+    """
     try:
         since = int((datetime.now(timezone.utc) - timedelta(days=HISTORY_DAYS)).timestamp() * 1000)
         print(f"Fetching historical data since {datetime.fromtimestamp(since/1000, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')} UTC...")
-        ohlcv = []
-        temp_since = since
-        
-        while temp_since < int(time.time() * 1000):
-            data = await exchange.fetch_ohlcv(SYMBOL, TIMEFRAME, since=temp_since, limit=1000)
-            if not data:
+        store = CandleStore(CANDLE_STORE_DIR)
+        for attempt in range(HISTORY_ATTEMPTS):
+            downloader = HistoryDownloader(exchange, store, on_error=log_state)
+            rows = await downloader.download(SYMBOL, TIMEFRAME, since)
+            if not downloader.stats['failed']:
                 break
-            ohlcv.extend(data)
-            temp_since = data[-1][0] + 1
-            await asyncio.sleep(0.4)
+            log_state(f"Historical data incomplete: {downloader.summary()} (attempt {attempt + 1}/{HISTORY_ATTEMPTS})")
+        else:
+            print(f"⚠️ Historical data has gaps after {HISTORY_ATTEMPTS} attempts - starting without history")
+            return pd.DataFrame()
 
-        if not ohlcv:
+        if not len(rows):
             print("No historical data fetched.")
             return pd.DataFrame()
 
-        df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        df = df.drop_duplicates(subset='timestamp', keep='last').reset_index(drop=True)
-        print(f"Loaded {len(df)} historical candles.")
+        df = rows_to_frame(rows)
+        print(f"Loaded {len(df)} historical candles ({downloader.summary()}).")
         return df
     except Exception as e:
         print(f"Historical data error: {e}")
@@ -362,9 +539,19 @@ async def load_historical_data() -> pd.DataFrame:
 # ════════════════════════════════════════════════════════════════════════════
 # ORDER VERIFICATION (NEW)
 # ════════════════════════════════════════════════════════════════════════════
+async def fetch_symbol_orders() -> list:
+    """All open orders for SYMBOL: regular ones plus the conditional (algo) stops, which are only listed with trigger=True"""
+    regular, conditional = await asyncio.gather(
+        exchange.fetch_open_orders(SYMBOL),
+        exchange.fetch_open_orders(SYMBOL, params={'trigger': True}),
+    )
+    return regular + conditional
+
+
 async def verify_order_exists(order_id: str, order_type: str = "order") -> bool:
     """
-    Verify order exists in exchange with exponential backoff
+    Verify a stop order exists in exchange with exponential backoff
+    (looked up in the conditional/algo order list: one request per attempt)
     Returns: True if order confirmed, False otherwise
     """
     for attempt in range(ORDER_VERIFY_RETRIES):
@@ -372,7 +559,7 @@ async def verify_order_exists(order_id: str, order_type: str = "order") -> bool:
             delay = min(ORDER_VERIFY_BACKOFF_BASE * (2 ** attempt), 5.0)
             await asyncio.sleep(delay)
             
-            orders = await exchange.fetch_open_orders(SYMBOL)
+            orders = await exchange.fetch_open_orders(SYMBOL, params={'trigger': True})
             exists = any(o['id'] == order_id for o in orders)
             
             if exists:
@@ -391,164 +578,240 @@ async def verify_order_exists(order_id: str, order_type: str = "order") -> bool:
 # ════════════════════════════════════════════════════════════════════════════
 # STATE RECONCILIATION
 # ════════════════════════════════════════════════════════════════════════════
-async def reconcile_state():
-    """Cross-check internal state with exchange reality"""
-    global current_position, stop_order_id, consecutive_cancel_failures
-    
-    log_state("=== STATE RECONCILIATION START ===")
-    
+def log_order_deltas(open_orders: list):
+    """Log only orders that appeared or disappeared since the last reconciliation"""
+    global last_reconcile_orders
+    current = {o['id']: order_key(o) for o in open_orders}
+    for order_id, key in current.items():
+        if last_reconcile_orders.get(order_id) != key:
+            _, order_type, side, amount, stop_price = key
+            log_state(f"  + Order: {order_type} {side} @ {stop_price or 'N/A'} | Amount: {amount} | ID: {order_id}")
+    for order_id in last_reconcile_orders.keys() - current.keys():
+        log_state(f"  - Order gone: {order_id}")
+    last_reconcile_orders = current
+
+
+async def reconcile_state(positions: Optional[list] = None, open_orders: Optional[list] = None,
+                          epoch: Optional[int] = None) -> Optional[list]:
+    """
+    Cross-check internal state with exchange reality
+    positions / open_orders: data already fetched for SYMBOL (e.g. by reconcile_job);
+    fetched here when not given
+    epoch: trade_epoch from before that data was fetched
+    Returns: the symbol's open orders after reconciliation (None on error), so callers
+    don't need to fetch them again
+    """
+    epoch = trade_epoch if epoch is None else epoch
     try:
         # 1. Get actual position from exchange
-        positions = await exchange.fetch_positions([SYMBOL])
+        if positions is None:
+            positions = await exchange.fetch_positions([SYMBOL])
         exchange_position = next(
             (p for p in positions if float(p.get('contracts', p.get('positionAmt', 0))) != 0), 
             None
         )
         
         # 2. Get all open orders
-        open_orders = await exchange.fetch_open_orders(SYMBOL)
-        
-        log_state(f"Exchange position: {exchange_position.get('contracts', exchange_position.get('positionAmt', 'N/A')) if exchange_position else 'None'}")
-        log_state(f"Internal position: {current_position['side'] if current_position else 'None'}")
-        log_state(f"Open orders: {len(open_orders)}")
-        
-        # Log detailed order info
-        if open_orders:
-            for order in open_orders:
-                order_type = order.get('type', 'UNKNOWN')
-                stop_price = order.get('stopPrice') or order.get('info', {}).get('stopPrice', 'N/A')
-                amount = order.get('amount', 0)
-                order_id = order.get('id', 'UNKNOWN')
-                log_state(f"  Order: {order_type} @ {stop_price} | Amount: {amount} | ID: {order_id}")
-        
-        # Helper function to detect stop orders
-        def is_stop_order(order):
-            order_type = (order.get('type', '') or order.get('info', {}).get('type', '')).upper()
-            return any(x in order_type for x in ['STOP_MARKET', 'STOP_LOSS', 'TAKE_PROFIT_MARKET', 'STOP'])
-        
-        # 3. CASE 1: Exchange has position, we don't know about it
-        if exchange_position and not current_position:
-            with position_lock:
-                amt = float(exchange_position.get('contracts', exchange_position.get('positionAmt', 0)))
-                entry_price = float(exchange_position.get('entryPrice', 0))
-                
-                print(f"⚠️ DESYNC DETECTED: Exchange has position we don't know about!")
-                log_state(f"RECOVERY: Recovering position {amt} @ {entry_price}")
-                
-                # Calculate emergency stop-loss (3% from entry)
-                emergency_sl = entry_price * (0.97 if amt > 0 else 1.03)
-                emergency_risk = abs(entry_price - emergency_sl)
-                
-                current_position = {
-                    'side': 'long' if amt > 0 else 'short',
-                    'entry_price': entry_price,
-                    'quantity': abs(amt),
-                    'initial_risk': emergency_risk,
-                    'sl_price': emergency_sl,
-                    'breakeven_triggered': False,
-                    'trailing_active': False,
-                    'trail_distance': 0.0,
-                }
-                
-                stop_orders = [o for o in open_orders if is_stop_order(o)]
-                if stop_orders:
-                    stop_order_id = stop_orders[0]['id']
-                    sl_price = float(stop_orders[0].get('stopPrice') or stop_orders[0].get('info', {}).get('stopPrice') or 0)
-                    if sl_price > 0:
-                        current_position['sl_price'] = sl_price
-                    log_state(f"✅ Found existing SL order: {stop_order_id} @ {current_position['sl_price']}")
-                else:
-                    log_state(f"⚠️ WARNING: Position has no stop-loss! Emergency SL set to {emergency_sl:.2f}")
-        
-        # 4. CASE 2: We think we have position, but exchange doesn't
-        elif current_position and not exchange_position:
-            with position_lock:
-                print(f"⚠️ DESYNC: We think we have {current_position['side']} but exchange shows none")
-                log_state(f"RECOVERY: Clearing phantom position")
-                current_position = None
-                stop_order_id = None
+        if open_orders is None:
+            open_orders = await fetch_symbol_orders()
         
-        # 5. CASE 3: Orphan orders (orders exist but no position)
-        if not exchange_position and len(open_orders) > 0:
-            print(f"🚨 ORPHAN ORDERS DETECTED: {len(open_orders)} orders with no position")
-            log_state(f"CLEANUP: Cancelling ALL {len(open_orders)} orphan orders")
+        # Nothing changed since the last clean pass - skip the work and the log lines
+        local = reconcile_view()
+        fingerprint = hash((
+            state_fingerprint(exchange_position, open_orders),
+            tuple(sorted(local.items())) if local else None,
+        ))
+        if fingerprint == last_reconcile_fingerprint:
+            return open_orders
+
+        # Data fetched across an order action is stale, and repairs must not race one
+        if trade_lock.locked() or trade_epoch != epoch:
+            log_state("Reconciliation deferred - order action in flight")
+            return None
+        async with trade_lock:
+            return await repair_state(exchange_position, open_orders, fingerprint)
+
+    except Exception as e:
+        log_state(f"Reconciliation error: {e}")
+        print(f"❌ State reconciliation failed: {e}")
+        return None
+
+
+async def repair_state(exchange_position: Optional[Dict[str, Any]], open_orders: list, fingerprint: int) -> list:
+    """The recovery cases of reconcile_state (trade_lock held)"""
+    global current_position, stop_order_id, consecutive_cancel_failures, last_reconcile_fingerprint
+
+    last_reconcile_fingerprint = None
+    clean = True  # Cleared by any recovery action or unresolved problem
+    
+    log_state("=== STATE RECONCILIATION START ===")
+    log_state(f"Exchange position: {exchange_position.get('contracts', exchange_position.get('positionAmt', 'N/A')) if exchange_position else 'None'}")
+    log_state(f"Internal position: {current_position['side'] if current_position else 'None'}")
+    log_state(f"Open orders: {len(open_orders)}")
+    log_order_deltas(open_orders)
+    
+    # 3. CASE 1: Exchange has position, we don't know about it
+    if exchange_position and not current_position:
+        clean = False
+        with position_lock:
+            amt = float(exchange_position.get('contracts', exchange_position.get('positionAmt', 0)))
+            entry_price = float(exchange_position.get('entryPrice', 0))
             
-            failed_cancels = 0
-            for order in open_orders:
-                for attempt in range(3):
-                    try:
-                        await exchange.cancel_order(order['id'], SYMBOL)
-                        log_state(f"✓ Cancelled orphan order: {order['id']}")
-                        if order['id'] in order_history:
-                            del order_history[order['id']]
-                        break
-                    except Exception as e:
-                        if attempt == 2:
-                            log_state(f"❌ Failed to cancel {order['id']} after 3 attempts: {e}")
-                            failed_cancels += 1
-                        else:
-                            await asyncio.sleep(0.5)
+            print(f"⚠️ DESYNC DETECTED: Exchange has position we don't know about!")
+            log_state(f"RECOVERY: Recovering position {amt} @ {entry_price}")
             
-            # Check circuit breaker
-            if failed_cancels > 0:
-                consecutive_cancel_failures += 1
-                if consecutive_cancel_failures >= MAX_ORDER_CANCEL_FAILURES:
-                    await trigger_circuit_breaker(f"Failed to cancel {failed_cancels} orphan orders")
-            else:
-                consecutive_cancel_failures = 0
+            # Calculate emergency stop-loss (3% from entry)
+            emergency_sl = entry_price * (0.97 if amt > 0 else 1.03)
+            emergency_risk = abs(entry_price - emergency_sl)
             
-            # Verify cleanup
-            remaining = await exchange.fetch_open_orders(SYMBOL)
-            if len(remaining) > 0:
-                log_state(f"⚠️ WARNING: {len(remaining)} orders still remain")
+            current_position = {
+                'side': 'long' if amt > 0 else 'short',
+                'entry_price': entry_price,
+                'quantity': abs(amt),
+                'initial_risk': emergency_risk,
+                'sl_price': emergency_sl,
+                'breakeven_triggered': False,
+                'trailing_active': False,
+                'trail_distance': 0.0,
+                'peak_r': 0.0,
+            }
+            
+            stop_orders = [o for o in open_orders if is_stop_order(o)]
+            if stop_orders:
+                stop_order_id = stop_orders[0]['id']
+                sl_price = float(stop_orders[0].get('stopPrice') or stop_orders[0].get('info', {}).get('stopPrice') or 0)
+                if sl_price > 0:
+                    current_position['sl_price'] = sl_price
+                log_state(f"✅ Found existing SL order: {stop_order_id} @ {current_position['sl_price']}")
             else:
-                log_state(f"✓ Orphan order cleanup complete")
+                log_state(f"⚠️ WARNING: Position has no stop-loss! Emergency SL set to {emergency_sl:.2f}")
+    
+    # 4. CASE 2: We think we have position, but exchange doesn't
+    elif current_position and not exchange_position:
+        clean = False
+        with position_lock:
+            print(f"⚠️ DESYNC: We think we have {current_position['side']} but exchange shows none")
+            log_state(f"RECOVERY: Clearing phantom position")
+            current_position = None
+            stop_order_id = None
+    
+    # 5. CASE 3: Orphan orders (orders exist but no position)
+    if not exchange_position and len(open_orders) > 0:
+        clean = False
+        print(f"🚨 ORPHAN ORDERS DETECTED: {len(open_orders)} orders with no position")
+        log_state(f"CLEANUP: Cancelling ALL {len(open_orders)} orphan orders")
         
-        # 6. CASE 4: Position exists but no/multiple stop-loss orders
-        if current_position and exchange_position:
-            stop_orders = [o for o in open_orders if is_stop_order(o)]
-            
-            if len(stop_orders) == 0:
-                print(f"⚠️ CRITICAL: Position has NO STOP-LOSS!")
-                log_state("RECOVERY: Position exists but no SL - emergency SL required")
-                
-                # Use existing emergency SL or set new one
-                if current_position['sl_price'] == 0:
-                    if current_position['side'] == 'long':
-                        current_position['sl_price'] = current_position['entry_price'] * 0.97
+        failed_cancels = 0
+        for order in open_orders:
+            for attempt in range(3):
+                try:
+                    await exchange.cancel_order(order['id'], SYMBOL, cancel_params(order))
+                    log_state(f"✓ Cancelled orphan order: {order['id']}")
+                    if order['id'] in order_history:
+                        del order_history[order['id']]
+                    break
+                except Exception as e:
+                    if attempt == 2:
+                        log_state(f"❌ Failed to cancel {order['id']} after 3 attempts: {e}")
+                        failed_cancels += 1
                     else:
-                        current_position['sl_price'] = current_position['entry_price'] * 1.03
-                
-                log_state(f"Emergency SL target: {current_position['sl_price']:.2f}")
-                
-            elif len(stop_orders) > 1:
-                print(f"⚠️ WARNING: Multiple stop orders ({len(stop_orders)}) - cancelling extras")
-                for order in stop_orders[1:]:
-                    try:
-                        await exchange.cancel_order(order['id'], SYMBOL)
-                        log_state(f"Cancelled duplicate SL: {order['id']}")
-                        if order['id'] in order_history:
-                            del order_history[order['id']]
-                    except Exception as e:
-                        log_state(f"Failed to cancel duplicate SL: {e}")
+                        await asyncio.sleep(0.5)
+        
+        # Check circuit breaker
+        if failed_cancels > 0:
+            consecutive_cancel_failures += 1
+            if consecutive_cancel_failures >= MAX_ORDER_CANCEL_FAILURES:
+                await trigger_circuit_breaker(f"Failed to cancel {failed_cancels} orphan orders")
+        else:
+            consecutive_cancel_failures = 0
         
-        log_state("=== STATE RECONCILIATION COMPLETE ===")
+        # Verify cleanup
+        open_orders = await fetch_symbol_orders()
+        if len(open_orders) > 0:
+            log_state(f"⚠️ WARNING: {len(open_orders)} orders still remain")
+        else:
+            log_state(f"✓ Orphan order cleanup complete")
+    
+    # 6. CASE 4: Position exists but no/multiple stop-loss orders
+    if current_position and exchange_position:
+        stop_orders = [o for o in open_orders if is_stop_order(o)]
         
-    except Exception as e:
-        log_state(f"Reconciliation error: {e}")
-        print(f"❌ State reconciliation failed: {e}")
+        # Keep bookkeeping in line with the exchange (e.g. after a warm start)
+        with position_lock:
+            amt = abs(float(exchange_position.get('contracts', exchange_position.get('positionAmt', 0))))
+            local_qty = current_position.get('remaining_quantity', current_position['quantity'])
+            if abs(amt - local_qty) > 1e-9:
+                clean = False
+                log_state(f"RECOVERY: Quantity mismatch (internal {local_qty}, exchange {amt}) - adopting exchange")
+                current_position['remaining_quantity'] = amt
+        if stop_orders and stop_order_id not in [o['id'] for o in stop_orders]:
+            clean = False
+            log_state(f"RECOVERY: Tracked SL {stop_order_id} not open - adopting {stop_orders[0]['id']}")
+            stop_order_id = stop_orders[0]['id']
+        
+        if len(stop_orders) == 0:
+            clean = False  # Keep warning every cycle until a stop exists
+            print(f"⚠️ CRITICAL: Position has NO STOP-LOSS!")
+            log_state("RECOVERY: Position exists but no SL - emergency SL required")
+            
+            # Use existing emergency SL or set new one
+            if current_position['sl_price'] == 0:
+                if current_position['side'] == 'long':
+                    current_position['sl_price'] = current_position['entry_price'] * 0.97
+                else:
+                    current_position['sl_price'] = current_position['entry_price'] * 1.03
+            
+            log_state(f"Emergency SL target: {current_position['sl_price']:.2f}")
+            
+        elif len(stop_orders) > 1:
+            clean = False
+            print(f"⚠️ WARNING: Multiple stop orders ({len(stop_orders)}) - cancelling extras")
+            # Keep the tracked stop (extras are e.g. superseded stops whose cancel failed)
+            for order in [o for o in stop_orders if o['id'] != stop_order_id]:
+                try:
+                    await exchange.cancel_order(order['id'], SYMBOL, cancel_params(order))
+                    log_state(f"Cancelled duplicate SL: {order['id']}")
+                    if order['id'] in order_history:
+                        del order_history[order['id']]
+                    open_orders = [o for o in open_orders if o['id'] != order['id']]
+                except Exception as e:
+                    log_state(f"Failed to cancel duplicate SL: {e}")
+    
+    # Only a clean pass may be skipped next time; anything acted on is re-checked
+    if clean:
+        last_reconcile_fingerprint = fingerprint
+    log_state("=== STATE RECONCILIATION COMPLETE ===")
+    return open_orders
+
+
+def reconcile_view() -> Optional[Dict[str, Any]]:
+    """Local position view for the reconcile fingerprint (the layout utils.account_sync.diff_symbol takes)"""
+    position = current_position
+    if not position:
+        return None
+    return {
+        'side': position['side'],
+        'quantity': position.get('remaining_quantity', position['quantity']),
+        'stop_order_id': stop_order_id,
+    }
 
 
 # ════════════════════════════════════════════════════════════════════════════
 # ORDER MANAGEMENT
 # ════════════════════════════════════════════════════════════════════════════
+def note_order_action():
+    """Called before orders on the position are sent: exchange data fetched earlier is stale"""
+    global trade_epoch
+    trade_epoch += 1
+
+
 async def cancel_all_orders() -> bool:
     """Cancel ALL open orders with retry and verification"""
     global order_history, consecutive_cancel_failures
     
     try:
         for attempt in range(3):
-            orders = await exchange.fetch_open_orders(SYMBOL)
+            orders = await fetch_symbol_orders()
             if len(orders) == 0:
                 consecutive_cancel_failures = 0  # Reset on success
                 return True
@@ -558,7 +821,7 @@ async def cancel_all_orders() -> bool:
             failed = 0
             for order in orders:
                 try:
-                    await exchange.cancel_order(order['id'], SYMBOL)
+                    await exchange.cancel_order(order['id'], SYMBOL, cancel_params(order))
                     log_state(f"Cancelled: {order['id']}")
                     if order['id'] in order_history:
                         del order_history[order['id']]
@@ -572,7 +835,7 @@ async def cancel_all_orders() -> bool:
             await asyncio.sleep(0.5)
         
         # Final verification
-        remaining = await exchange.fetch_open_orders(SYMBOL)
+        remaining = await fetch_symbol_orders()
         if len(remaining) > 0:
             log_state(f"⚠️ WARNING: {len(remaining)} orders remain after 3 attempts")
             consecutive_cancel_failures += 1
@@ -597,7 +860,7 @@ async def emergency_cleanup_orphans() -> bool:
     
     try:
         log_state("🚨 EMERGENCY ORPHAN CLEANUP TRIGGERED")
-        orders = await exchange.fetch_open_orders(SYMBOL)
+        orders = await fetch_symbol_orders()
         
         if len(orders) == 0:
             return True
@@ -608,7 +871,7 @@ async def emergency_cleanup_orphans() -> bool:
         for order in orders:
             for attempt in range(5):
                 try:
-                    await exchange.cancel_order(order['id'], SYMBOL)
+                    await exchange.cancel_order(order['id'], SYMBOL, cancel_params(order))
                     if order['id'] in order_history:
                         del order_history[order['id']]
                     log_state(f"✓ Emergency cleared: {order['id']}")
@@ -621,7 +884,7 @@ async def emergency_cleanup_orphans() -> bool:
                         failed_count += 1
         
         # Verify
-        remaining = await exchange.fetch_open_orders(SYMBOL)
+        remaining = await fetch_symbol_orders()
         log_state(f"Emergency cleanup result: {len(remaining)} orders remaining")
         
         success = len(remaining) == 0
@@ -692,7 +955,8 @@ async def place_entry(side: str, signal_price: float, atr: float):
 
     try:
         # Place market order
-        order = await exchange.create_market_order(SYMBOL, side_str, qty)
+        note_order_action()
+        order = await order_transport.create_market_order(SYMBOL, side_str, qty)
         print(f"✅ ENTRY ORDER SUBMITTED: {order.get('id')}")
         log_state(f"Entry order submitted: {order}")
         
@@ -728,6 +992,7 @@ async def place_entry(side: str, signal_price: float, atr: float):
                 'breakeven_triggered': False,
                 'trailing_active': False,
                 'trail_distance': 0.0,
+                'peak_r': 0.0,  # Best R reached (drives breakeven/trailing/partial exits)
                 'entry_notional': notional,
                 'entry_time': datetime.now(timezone.utc),
                 # Partial exit tracking
@@ -746,7 +1011,7 @@ async def place_entry(side: str, signal_price: float, atr: float):
             try:
                 log_state(f"SL placement attempt {attempt+1}/3: price={sl_price:.2f}, side={sl_side}, qty={qty}")
                 
-                sl_order = await exchange.create_order(
+                sl_order = await order_transport.create_order(
                     SYMBOL, 'STOP_MARKET', sl_side, qty, None,
                     {
                         'stopPrice': sl_price,
@@ -806,25 +1071,10 @@ def detect_momentum_slowdown(df: pd.DataFrame, side: str, lookback: int = MOMENT
         return False
     
     try:
-        # Calculate recent price changes (momentum)
-        recent_closes = df['close'].iloc[-lookback:].values
-        
-        # Average move per candle (recent)
-        recent_moves = []
-        for i in range(1, len(recent_closes)):
-            move = abs(recent_closes[i] - recent_closes[i-1])
-            recent_moves.append(move)
-        
-        recent_avg_move = np.mean(recent_moves) if recent_moves else 0
-        
-        # Compare to earlier momentum (5 candles before)
-        earlier_closes = df['close'].iloc[-lookback*2:-lookback].values
-        earlier_moves = []
-        for i in range(1, len(earlier_closes)):
-            move = abs(earlier_closes[i] - earlier_closes[i-1])
-            earlier_moves.append(move)
-        
-        earlier_avg_move = np.mean(earlier_moves) if earlier_moves else 0
+        # Average move per candle: recent window vs the window before it
+        closes = df['close'].to_numpy()[-lookback * 2:]
+        recent_avg_move = np.abs(np.diff(closes[-lookback:])).mean() if lookback > 1 else 0
+        earlier_avg_move = np.abs(np.diff(closes[:-lookback])).mean() if lookback > 1 else 0
         
         # Avoid division by zero
         if earlier_avg_move == 0:
@@ -846,114 +1096,158 @@ def detect_momentum_slowdown(df: pd.DataFrame, side: str, lookback: int = MOMENT
         return False
 
 
-def calculate_price_velocity(df: pd.DataFrame, periods: int = 3) -> float:
-    """
-    Calculate how fast price is moving (dollars per candle)
-    Higher value = stronger momentum
-    """
-    if len(df) < periods + 1:
-        return 0.0
-    
-    try:
-        recent_prices = df['close'].iloc[-periods:].values
-        price_changes = np.diff(recent_prices)
-        avg_velocity = np.mean(np.abs(price_changes))
-        return float(avg_velocity)
-    except:
-        return 0.0
+def seed_trail_stats(df: pd.DataFrame):
+    """Rebuild trail_stats from the closed bars of df (the last row is the forming candle)"""
+    closed = df.iloc[:-1]
+    atrs = closed['atr'].to_numpy() if 'atr' in closed.columns else [None] * len(closed)
+    ts = closed['timestamp'].astype('int64').to_numpy()
+    trail_stats.seed(zip(ts.tolist(), closed['close'].tolist(), list(atrs)))
+
+
+def record_closed_bar(df: pd.DataFrame):
+    """Fold the last row of df into trail_stats once its candle has closed (df_lock held)"""
+    if df.empty:
+        return
+    atr = float(df['atr'].iat[-1]) if 'atr' in df.columns else None
+    trail_stats.update(int(df['timestamp'].iat[-1].value), float(df['close'].iat[-1]), atr)
+
+    if current_position and current_position.get('trailing_active') and momentum_slowing():
+        log_state(f"Momentum slowdown detected: {trail_stats.momentum_ratio():.2f} (recent: {trail_stats.recent_avg_move:.2f}, "
+                  f"earlier: {trail_stats.earlier_avg_move:.2f})")
+
+
+def momentum_slowing() -> bool:
+    """detect_momentum_slowdown over the closed bars in trail_stats"""
+    if not ENABLE_MOMENTUM_TRAILING:
+        return False
+    ratio = trail_stats.momentum_ratio()
+    return ratio is not None and ratio < MOMENTUM_SLOW_THRESHOLD
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# EXIT POLICY CHAIN
+# ════════════════════════════════════════════════════════════════════════════
+def build_exit_chain():
+    """The exit rules selected by the profit-maximization flags (strategies/exit_policies.py)"""
+    rules = [tiered_distance(((3.0, TRAIL_TIGHT), (6.0, TRAIL_MEDIUM)), TRAIL_LOOSE) if ENABLE_DYNAMIC_TRAILING
+             else fixed_distance(TRAIL_DISTANCE_MULT)]
+    if ENABLE_VOLATILITY_ADJUST:
+        rules.append(volatility_scaled())
+    if ENABLE_MOMENTUM_TRAILING:
+        rules.append(momentum_cap(MOMENTUM_SLOW_THRESHOLD, MOMENTUM_TIGHT_MULT))
+    rules += [breakeven(BREAKEVEN_TRIGGER_R), trailing(TRAIL_ACTIVATE_AT_R, TRAIL_MIN_STEP_ATR)]
+    if ENABLE_PARTIAL_EXITS:
+        rules.append(scale_out((PARTIAL_EXIT_1_R, PARTIAL_EXIT_1_PCT), (PARTIAL_EXIT_2_R, PARTIAL_EXIT_2_PCT)))
+    return compile_chain(*rules)
+
+
+exit_chain = build_exit_chain()
 
 
 # ════════════════════════════════════════════════════════════════════════════
 # PROFIT MAXIMIZATION HELPERS
 # ════════════════════════════════════════════════════════════════════════════
-def get_dynamic_trail_distance(r_profit: float, atr: float, base_mult: float = TRAIL_DISTANCE_MULT) -> float:
+async def submit_reduce_and_stop(side_str: str, exit_qty: str, stop_qty: str, stop_price: float) -> list:
     """
-    Calculate trail distance based on profit level
-    More profit = looser trail (let winners run)
+    Reduce-only market exit + replacement stop for the remaining quantity, both in flight
+    at once: USD-M stops are algo orders that batchOrders refuses, so over REST the legs
+    go out as two concurrent requests (pipelined on the websocket - see utils/order_transport.py)
+    Returns [market_result, stop_result]; a failed leg is an Exception instance
     """
-    if not ENABLE_DYNAMIC_TRAILING:
-        return base_mult * atr
-    
-    if r_profit < 3.0:
-        return TRAIL_TIGHT * atr  # Tight trail for small profits
-    elif r_profit < 6.0:
-        return TRAIL_MEDIUM * atr  # Medium trail
-    else:
-        return TRAIL_LOOSE * atr  # Loose trail for big winners
+    stop_params = {'stopPrice': stop_price, 'timeInForce': 'GTE_GTC', 'type': 'STOP_MARKET', 'reduceOnly': True}
+    note_order_action()
+    return await order_transport.create_orders([
+        {'symbol': SYMBOL, 'type': 'market', 'side': side_str, 'amount': exit_qty, 'params': {'reduceOnly': True}},
+        {'symbol': SYMBOL, 'type': 'STOP_MARKET', 'side': side_str, 'amount': stop_qty, 'price': None,
+         'params': stop_params},
+    ])
+
+
+async def cancel_stop_quietly(order_id: str, label: str):
+    """Cancel a superseded stop off the exit's critical path (reduce-only, so a late cancel is harmless)"""
+    global last_reconcile_fingerprint
+    try:
+        await order_transport.cancel_order(order_id, SYMBOL, {'trigger': True})
+        order_history.pop(order_id, None)
+        log_state(f"Cancelled {label}: {order_id}")
+    except Exception as e:
+        # Still open: stays in order_history and the next reconciliation cancels it as a duplicate
+        order_history[order_id] = time.time()
+        last_reconcile_fingerprint = None
+        log_state(f"Failed to cancel {label} {order_id}: {e} - left for reconciliation")
 
 
-def get_volatility_adjusted_trail(current_atr: float, avg_atr: float, base_distance: float) -> float:
-    """
-    Adjust trail distance based on volatility changes
-    High volatility = wider trail, Low volatility = tighter trail
-    """
-    if not ENABLE_VOLATILITY_ADJUST or avg_atr == 0:
-        return base_distance
-    
-    volatility_ratio = current_atr / avg_atr
-    
-    if volatility_ratio > 1.5:
-        # High volatility - widen trail by 40%
-        return base_distance * 1.4
-    elif volatility_ratio < 0.7:
-        # Low volatility - tighten trail by 30%
-        return base_distance * 0.7
-    
-    return base_distance
+def schedule_stop_cancel(order_id: str, label: str):
+    """cancel_stop_quietly as a background task (kept in stop_cancels so it is not garbage-collected)"""
+    task = asyncio.create_task(cancel_stop_quietly(order_id, label))
+    stop_cancels.add(task)
+    task.add_done_callback(stop_cancels.discard)
 
 
-async def execute_partial_exit(exit_level: int, r_profit: float, price: float) -> bool:
+async def execute_partial_exits(exit_levels: list, r_profit: float, price: float) -> Optional[str]:
     """
-    Execute partial exit at specified R-level
-    Returns True if executed successfully
+    Execute every partial exit in exit_levels as one reduce order, together with a stop
+    resized to the quantity left at the current sl_price (sent concurrently)
+    Levels reached on the same update are merged: each level still closes its share of
+    what the previous ones left.
+    Returns: id of the resized stop (None if nothing was exited or the stop leg failed)
     """
+    global stop_order_id
+
     if not ENABLE_PARTIAL_EXITS or not current_position:
-        return False
-    
-    # Determine which partial exit
-    if exit_level == 1:
-        if current_position.get('partial_exit_1_done', False):
-            return False
-        r_target = PARTIAL_EXIT_1_R
-        pct = PARTIAL_EXIT_1_PCT
-    elif exit_level == 2:
-        if current_position.get('partial_exit_2_done', False):
-            return False
-        r_target = PARTIAL_EXIT_2_R
-        pct = PARTIAL_EXIT_2_PCT
-    else:
-        return False
-    
-    # Check if we've reached the target
-    if r_profit < r_target:
-        return False
-    
+        return None
+
+    # Levels of the exit chain's scale_out rule that are reached and not done yet
+    levels = [k for k in exit_levels
+              if 1 <= k <= len(exit_chain.levels)
+              and not current_position.get(f'partial_exit_{k}_done', False)
+              and r_profit >= exit_chain.levels[k - 1][0]]
+    if not levels:
+        return None
+    label = '+'.join(str(k) for k in levels)
+
     try:
         with position_lock:
             side = current_position['side']
             remaining_qty = current_position.get('remaining_quantity', current_position['quantity'])
-            exit_qty = remaining_qty * pct
-            exit_qty = exchange.amount_to_precision(SYMBOL, exit_qty)
-            
+            keep = 1.0
+            for k in levels:
+                keep *= 1 - exit_chain.levels[k - 1][1]
+            exit_qty = exchange.amount_to_precision(SYMBOL, remaining_qty * (1 - keep))
+            stop_qty = exchange.amount_to_precision(SYMBOL, remaining_qty - float(exit_qty))
+            stop_price = current_position['sl_price']
+
             if float(exit_qty) < 0.001:  # Too small to exit
-                return False
-        
-        # Execute partial exit
+                return None
+
+        # Execute partial exit + resized stop
         side_str = 'sell' if side == 'long' else 'buy'
-        order = await exchange.create_market_order(
-            SYMBOL, side_str, exit_qty, params={'reduceOnly': True}
-        )
-        
+        old_stop_id = stop_order_id
+        order, new_stop = await submit_reduce_and_stop(side_str, exit_qty, stop_qty, stop_price)
+
+        if isinstance(order, Exception):
+            if not isinstance(new_stop, Exception):
+                schedule_stop_cancel(new_stop['id'], "unused resized SL")
+            raise order
+
         exit_price = float(order.get('average') or order.get('price') or price)
         
         with position_lock:
             new_remaining = remaining_qty - float(exit_qty)
             current_position['remaining_quantity'] = new_remaining
-            
-            if exit_level == 1:
-                current_position['partial_exit_1_done'] = True
-            else:
-                current_position['partial_exit_2_done'] = True
+            for k in levels:
+                current_position[f'partial_exit_{k}_done'] = True
+
+        if isinstance(new_stop, Exception):
+            # The old stop is reduce-only, so it still protects the smaller position
+            log_state(f"Resized SL failed after partial exit {label}: {new_stop} - keeping {old_stop_id}")
+            new_stop = None
+        else:
+            stop_order_id = new_stop['id']
+            order_history[stop_order_id] = time.time()
+            log_state(f"SL resized to {stop_qty} @ {stop_price:.2f}: {stop_order_id}")
+            if old_stop_id:
+                schedule_stop_cancel(old_stop_id, "old SL")
         
         # Calculate profit on this partial
         entry = current_position['entry_price']
@@ -962,10 +1256,10 @@ async def execute_partial_exit(exit_level: int, r_profit: float, price: float) -
         else:
             partial_pnl = (entry - exit_price) * float(exit_qty)
         
-        print(f"✅ PARTIAL EXIT #{exit_level} @ +{r_profit:.2f}R")
-        print(f"   Closed: {exit_qty} ({pct*100:.0f}%) @ {exit_price:.2f}")
+        print(f"✅ PARTIAL EXIT #{label} @ +{r_profit:.2f}R")
+        print(f"   Closed: {exit_qty} ({(1 - keep)*100:.0f}%) @ {exit_price:.2f}")
         print(f"   Profit: +${partial_pnl:.2f} | Remaining: {new_remaining:.4f}")
-        log_state(f"Partial exit {exit_level}: {exit_qty} @ {exit_price:.2f}, PNL: +${partial_pnl:.2f}")
+        log_state(f"Partial exit {label}: {exit_qty} @ {exit_price:.2f}, PNL: +${partial_pnl:.2f}")
         
         # Log partial exit
         log_trade(
@@ -973,21 +1267,26 @@ async def execute_partial_exit(exit_level: int, r_profit: float, price: float) -
             entry,
             exit_price,
             float(exit_qty),
-            f"PARTIAL_EXIT_{exit_level} (+{r_profit:.2f}R)"
+            f"PARTIAL_EXIT_{label} (+{r_profit:.2f}R)"
         )
         
-        return True
+        return new_stop['id'] if new_stop else None
         
     except Exception as e:
-        log_state(f"Partial exit {exit_level} failed: {e}")
-        print(f"⚠️ Partial exit {exit_level} failed: {e}")
-        return False
+        log_state(f"Partial exit {label} failed: {e}")
+        print(f"⚠️ Partial exit {label} failed: {e}")
+        return None
 
 
 # ════════════════════════════════════════════════════════════════════════════
 # TRAILING STOP-LOSS
 # ════════════════════════════════════════════════════════════════════════════
-async def update_trailing_or_close(price: float, atr: float):
+async def update_trailing_or_close(price: float, atr: float, avg_atr: Optional[float] = None,
+                                   momentum_ratio: Optional[float] = None):
+    """
+    Breakeven / partial exits / trailing for the open position, decided by exit_chain
+    avg_atr, momentum_ratio: per-bar features cached by the tick driver (read from trail_stats when None)
+    """
     global current_position, stop_order_id
     
     if not current_position:
@@ -1005,97 +1304,78 @@ async def update_trailing_or_close(price: float, atr: float):
             return
         
         r_profit = (price - entry) / risk if side == 'long' else (entry - price) / risk
+        if 'peak_r' not in current_position:
+            # Position from before peak tracking: its flags imply the R already reached
+            current_position['peak_r'] = max(
+                BREAKEVEN_TRIGGER_R if current_position['breakeven_triggered'] else 0.0,
+                TRAIL_ACTIVATE_AT_R if current_position['trailing_active'] else 0.0,
+            )
+        current_position['peak_r'] = max(current_position['peak_r'], r_profit)
+        if current_position['peak_r'] < exit_chain.idle_below_r:
+            return  # No exit rule can act yet
+
+        if momentum_ratio is None:
+            momentum_ratio = trail_stats.momentum_ratio()
+        sign = 1.0 if side == 'long' else -1.0
+        exits = exit_chain.evaluate({
+            'side': sign, 'entry': entry, 'risk': risk, 'price': price,
+            'peak_r': current_position['peak_r'], 'atr': atr,
+            'avg_atr': avg_atr if avg_atr is not None else (trail_stats.avg_atr or atr),
+            'momentum_ratio': np.nan if momentum_ratio is None else momentum_ratio,
+        })
         updated = False
 
-    # ═══ PARTIAL EXITS (NEW) ═══
-    if ENABLE_PARTIAL_EXITS:
-        # Try partial exit 1
-        if r_profit >= PARTIAL_EXIT_1_R:
-            await execute_partial_exit(1, r_profit, price)
-        
-        # Try partial exit 2
-        if r_profit >= PARTIAL_EXIT_2_R:
-            await execute_partial_exit(2, r_profit, price)
-
     with position_lock:
+        breakeven_now = not current_position['breakeven_triggered'] and exits.get('breakeven_on', False)
+        trailing_now = not current_position['trailing_active'] and exits.get('trailing_on', False)
+        new_sl, moved = exit_chain.next_stop(current_position['sl_price'], exits, sign, atr)
+        momentum_tag = " [MOMENTUM]" if exits['momentum_tight'] else ""
+
         # Breakeven
-        if not current_position['breakeven_triggered'] and r_profit >= BREAKEVEN_TRIGGER_R:
-            current_position['sl_price'] = entry
+        if breakeven_now:
             current_position['breakeven_triggered'] = True
             print(f"✅ Breakeven triggered @ +{r_profit:.2f}R → SL @ {entry:.2f}")
             log_state(f"Breakeven: SL moved to {entry:.2f}")
-            updated = True
 
         # Trailing activation
-        if r_profit >= TRAIL_ACTIVATE_AT_R and not current_position['trailing_active']:
+        if trailing_now:
             current_position['trailing_active'] = True
-            
-            # ═══ DYNAMIC TRAIL DISTANCE (NEW) ═══
-            base_trail = get_dynamic_trail_distance(r_profit, atr)
-            current_position['trail_distance'] = base_trail
-            
-            print(f"✅ Trailing activated @ +{r_profit:.2f}R | distance {current_position['trail_distance']:.2f}")
-            log_state(f"Trailing activated: distance={current_position['trail_distance']:.2f}, r_profit={r_profit:.2f}")
-            updated = True
+            print(f"✅ Trailing activated @ +{r_profit:.2f}R | distance {float(exits['distance']):.2f}")
+            log_state(f"Trailing activated: distance={float(exits['distance']):.2f}, r_profit={r_profit:.2f}")
 
         # Trailing update
         if current_position['trailing_active']:
-            # ═══ DYNAMIC + VOLATILITY ADJUSTED TRAILING ═══
-            base_trail = get_dynamic_trail_distance(r_profit, atr)
-            
-            # Get average ATR for volatility adjustment
-            avg_atr = atr  # Default to current if can't calculate
-            if 'atr' in price_df.columns and len(price_df) >= 50:
-                with df_lock:
-                    avg_atr = price_df['atr'].iloc[-50:].mean()
-            
-            adjusted_trail = get_volatility_adjusted_trail(atr, avg_atr, base_trail)
-            
-            # ═══ MOMENTUM-BASED TIGHTENING (NEW) ═══
-            # If momentum is slowing, tighten the trail to catch the top/bottom
-            momentum_slow = False
-            if ENABLE_MOMENTUM_TRAILING and len(price_df) >= MOMENTUM_LOOKBACK + 5:
-                with df_lock:
-                    momentum_slow = detect_momentum_slowdown(price_df, side, MOMENTUM_LOOKBACK)
-                
-                if momentum_slow:
-                    # Tighten trail significantly when momentum dies
-                    momentum_trail = MOMENTUM_TIGHT_MULT * atr
-                    if momentum_trail < adjusted_trail:
-                        adjusted_trail = momentum_trail
-                        print(f"🎯 MOMENTUM SLOW - Trail tightened to {adjusted_trail:.2f}")
-                        log_state(f"Momentum tightening: trail={adjusted_trail:.2f}, r_profit={r_profit:.2f}")
-            
-            current_position['trail_distance'] = adjusted_trail
-            
-            if side == 'long':
-                new_sl = price - current_position['trail_distance']
-                if new_sl > current_position['sl_price'] + 0.1 * atr:
-                    current_position['sl_price'] = new_sl
-                    momentum_tag = " [MOMENTUM]" if momentum_slow else ""
-                    print(f"📈 Trailing SL moved to {new_sl:.2f} (dist: {current_position['trail_distance']:.2f}, +{r_profit:.2f}R){momentum_tag}")
-                    log_state(f"Trailing update: SL={new_sl:.2f}, r_profit={r_profit:.2f}, trail_dist={current_position['trail_distance']:.2f}, momentum_slow={momentum_slow}")
-                    updated = True
-            else:
-                new_sl = price + current_position['trail_distance']
-                if new_sl < current_position['sl_price'] - 0.3 * atr:
-                    current_position['sl_price'] = new_sl
-                    momentum_tag = " [MOMENTUM]" if momentum_slow else ""
-                    print(f"📉 Trailing SL moved to {new_sl:.2f} (dist: {current_position['trail_distance']:.2f}, +{r_profit:.2f}R){momentum_tag}")
-                    log_state(f"Trailing update: SL={new_sl:.2f}, r_profit={r_profit:.2f}, trail_dist={current_position['trail_distance']:.2f}, momentum_slow={momentum_slow}")
-                    updated = True
+            current_position['trail_distance'] = float(exits['distance'])
+            if exits['momentum_tight']:
+                print(f"🎯 MOMENTUM SLOW - Trail tightened to {current_position['trail_distance']:.2f}")
+                log_state(f"Momentum tightening: trail={current_position['trail_distance']:.2f}, r_profit={r_profit:.2f}")
+
+        if moved:
+            current_position['sl_price'] = new_sl
+            updated = True
+            if 'trailing' in moved:
+                arrow = "📈" if side == 'long' else "📉"
+                print(f"{arrow} Trailing SL moved to {new_sl:.2f} (dist: {current_position['trail_distance']:.2f}, +{r_profit:.2f}R){momentum_tag}")
+                log_state(f"Trailing update: SL={new_sl:.2f}, r_profit={r_profit:.2f}, trail_dist={current_position['trail_distance']:.2f}, momentum_tight={bool(exits['momentum_tight'])}")
+
+    # ═══ PARTIAL EXITS ═══
+    # The resized stop is placed at the stop decided above, so it also carries any move
+    if exits['scale_out']:
+        if await execute_partial_exits(list(range(1, int(exits['scale_out']) + 1)), r_profit, price):
+            updated = False
 
     # Update SL order only if changed
     if updated:
+        note_order_action()
         # Get all current orders
-        all_orders = await exchange.fetch_open_orders(SYMBOL)
+        all_orders = await fetch_symbol_orders()
         
         # Cancel only STOP orders (not all orders)
         stop_orders = [o for o in all_orders if 'STOP' in o.get('type', '').upper()]
         
         for order in stop_orders:
             try:
-                await exchange.cancel_order(order['id'], SYMBOL)
+                await order_transport.cancel_order(order['id'], SYMBOL, cancel_params(order))
                 log_state(f"Cancelled old SL: {order['id']}")
                 if order['id'] in order_history:
                     del order_history[order['id']]
@@ -1107,12 +1387,14 @@ async def update_trailing_or_close(price: float, atr: float):
         stop_order_id = None
         sl_side = 'sell' if side == 'long' else 'buy'
         sl_updated = False
+        with position_lock:
+            qty = current_position.get('remaining_quantity', current_position['quantity'])  # After any partial exit
         
         for attempt in range(3):
             try:
                 log_state(f"SL update attempt {attempt+1}/3: price={current_position['sl_price']:.2f}")
                 
-                new_sl_order = await exchange.create_order(
+                new_sl_order = await order_transport.create_order(
                     SYMBOL, 'STOP_MARKET', sl_side, qty, None,
                     {
                         'stopPrice': current_position['sl_price'],
@@ -1145,6 +1427,98 @@ async def update_trailing_or_close(price: float, atr: float):
             print(f"⚠️ SL update failed - position may be at risk")
 
 
+# ════════════════════════════════════════════════════════════════════════════
+# TICK-LEVEL TRAILING DRIVER
+# ════════════════════════════════════════════════════════════════════════════
+def refresh_trail_features(atr: Optional[float]):
+    """
+    Cache the candle-derived inputs of the trailing logic (called with df_lock held)
+    so the per-tick path never touches price_df
+    """
+    global tick_best_price
+    avg_atr = (trail_stats.avg_atr or atr) if atr else atr
+    momentum_ratio = trail_stats.momentum_ratio()
+
+    if (avg_atr, momentum_ratio) != (trail_features['avg_atr'], trail_features['momentum_ratio']):
+        tick_best_price = None  # Trail distance may have changed - re-evaluate on the next tick
+    trail_features.update(atr=atr, avg_atr=avg_atr, momentum_ratio=momentum_ratio)
+
+
+async def watch_tick_price() -> Optional[float]:
+    """Next tick price for the open position: bid for longs, ask for shorts (last trade for 'trades')"""
+    if MARKET_DATA_SOURCE == 'shm':
+        # Tick source is the daemon's (MD_TICKS); trade ticks carry bid = ask = last
+        tick = (await market_data.take((SYMBOL, TICK_TIMEFRAME)))[-1]
+        position = current_position
+        if not position:
+            return None
+        price = tick[1] if position['side'] == 'long' else tick[2]
+        return float(price) if price else None
+
+    if TICK_SOURCE == 'trades':
+        trades = await exchange.watch_trades(SYMBOL)
+        return float(trades[-1]['price']) if trades else None
+
+    tickers = await exchange.watch_bids_asks([SYMBOL])
+    ticker = tickers.get(SYMBOL) or {}
+    position = current_position
+    if not position:
+        return None
+    price = ticker.get('bid') if position['side'] == 'long' else ticker.get('ask')
+    return float(price) if price else None
+
+
+async def tick_trailing_driver():
+    """
+    Feed tick prices into update_trailing_or_close
+    Per tick only a float comparison runs: the full trailing logic is evaluated when the
+    price makes a new favourable extreme (the only time breakeven/partials/trail can move)
+    """
+    global tick_best_price, tick_position_ref, last_tick_time
+    while not bot_halted:
+        try:
+            if not current_position:
+                tick_best_price = None
+                await asyncio.sleep(0.5)
+                continue
+
+            price = await watch_tick_price()
+            position = current_position
+            if price is None or not position:
+                continue
+            last_tick_time = time.time()
+            if position is not tick_position_ref:
+                tick_position_ref = position
+                tick_best_price = None
+
+            # Lightweight pre-check: nothing can change unless the tick beats the best seen
+            if tick_best_price is not None:
+                if position['side'] == 'long' and price <= tick_best_price:
+                    continue
+                if position['side'] == 'short' and price >= tick_best_price:
+                    continue
+            if trade_lock.locked() or trail_features['atr'] is None:
+                continue  # An evaluation is in flight; the next extreme will be picked up
+
+            tick_best_price = price
+            async with trade_lock:
+                await update_trailing_or_close(
+                    price, trail_features['atr'],
+                    avg_atr=trail_features['avg_atr'],
+                    momentum_ratio=trail_features['momentum_ratio'],
+                )
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log_state(f"Tick driver error: {type(e).__name__}: {e}")
+            await asyncio.sleep(2)
+
+
+def tick_driver_active() -> bool:
+    return ENABLE_TICK_TRAILING and time.time() - last_tick_time < TICK_STALE_SEC
+
+
 # ════════════════════════════════════════════════════════════════════════════
 # POSITION CLOSE
 # ════════════════════════════════════════════════════════════════════════════
@@ -1163,7 +1537,8 @@ async def close_position(price: Optional[float] = None, reason: str = "Manual/SL
 
     try:
         side_str = 'sell' if side == 'long' else 'buy'
-        close_order = await exchange.create_market_order(
+        note_order_action()
+        close_order = await order_transport.create_market_order(
             SYMBOL, side_str, qty, params={'reduceOnly': True}
         )
         print(f"✅ CLOSED {reason} | {qty:.4f} @ ~{price or 'market'}")
@@ -1186,23 +1561,148 @@ async def close_position(price: Optional[float] = None, reason: str = "Manual/SL
 
 
 # ════════════════════════════════════════════════════════════════════════════
-# CANDLE TIMING HELPER
+# CANDLE UPDATES / BAR CLOSE
 # ════════════════════════════════════════════════════════════════════════════
-def is_candle_closed(candle_timestamp, timeframe: str = '3m') -> bool:
-    """Check if a candle is truly closed"""
-    tf_seconds = {'1m': 60, '3m': 180, '5m': 300, '15m': 900, '1h': 3600}[timeframe]
-    
-    candle_time = candle_timestamp.timestamp() if isinstance(candle_timestamp, datetime) else candle_timestamp / 1000
-    current_time = time.time()
-    
-    time_in_candle = current_time - candle_time
-    progress = time_in_candle / tf_seconds
-    
-    return progress >= CANDLE_CLOSE_THRESHOLD
+def merge_candles(rows: list):
+    """
+    Apply one kline update (rows oldest first) to price_df (df_lock held): the forming
+    row is updated or a new bar appended; when a new bar starts, the final values of the
+    bar before it are applied too
+    """
+    global price_df
+    candle = rows[-1]
+    ts_dt = pd.to_datetime(candle[0], unit='ms')
+    if not price_df.empty and price_df['timestamp'].iat[-1] == ts_dt:
+        # Update existing candle
+        price_df.loc[price_df.index[-1], ['open','high','low','close','volume']] = candle[1:6]
+        return
+    if not price_df.empty and price_df['timestamp'].iat[-1] > ts_dt:
+        return  # Older than the forming bar
+
+    if len(rows) > 1 and not price_df.empty and price_df['timestamp'].iat[-1] == pd.to_datetime(rows[-2][0], unit='ms'):
+        price_df.loc[price_df.index[-1], ['open','high','low','close','volume']] = rows[-2][1:6]
+    new_row = {
+        'timestamp': ts_dt,
+        'open': float(candle[1]),
+        'high': float(candle[2]),
+        'low': float(candle[3]),
+        'close': float(candle[4]),
+        'volume': float(candle[5]),
+    }
+    price_df = pd.concat([price_df, pd.DataFrame([new_row])], ignore_index=True)
+
+    if len(price_df) > 500:
+        price_df = price_df.iloc[-500:].reset_index(drop=True)
+
+
+def find_candle_gap(rows: list) -> Optional[Tuple[int, int]]:
+    """
+    (since_ms, end_ms) when a kline update skips bars after the last one in price_df
+    (stream outage, long REST fallback): the buffer's last bar is refetched, as it
+    still holds the values it had when updates stopped
+    """
+    if price_df.empty:
+        return None
+    last_ms = int(price_df['timestamp'].iat[-1].timestamp() * 1000)
+    ts = int(rows[-1][0])
+    if ts - last_ms <= bar_events.tf_ms:
+        return None
+    return last_ms, ts
+
+
+async def backfill_candles(since_ms: int, end_ms: int) -> Optional[list]:
+    """
+    Fill bars [since_ms, end_ms) of price_df with one bounded REST fetch (at most
+    MAX_BACKFILL_BARS; a longer gap replaces the buffer). Returns the newest backfilled
+    bar, or None when the fetch failed
+    """
+    global price_df
+    since = max(since_ms, end_ms - MAX_BACKFILL_BARS * bar_events.tf_ms)
+    missing = (end_ms - since) // bar_events.tf_ms
+    try:
+        data = await exchange.fetch_ohlcv(SYMBOL, TIMEFRAME, since=since, limit=missing)
+    except Exception as e:
+        log_state(f"Candle backfill failed: {e}")
+        return None
+    data = [row for row in data or [] if since <= row[0] < end_ms]
+    if not data:
+        log_state(f"Candle backfill returned no bars for {pd.to_datetime(since, unit='ms')}")
+        return None
+
+    fresh = pd.DataFrame(data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    fresh['timestamp'] = pd.to_datetime(fresh['timestamp'], unit='ms')
+    with df_lock:
+        if since > since_ms:
+            price_df = fresh
+        else:
+            price_df = pd.concat([price_df[price_df['timestamp'] < fresh['timestamp'].iloc[0]], fresh], ignore_index=True)
+            price_df = price_df.iloc[-500:].reset_index(drop=True)
+    log_state(f"Candle gap: backfilled {len(data)} bar(s) from {fresh['timestamp'].iloc[0]} to {fresh['timestamp'].iloc[-1]}")
+    return list(data[-1])
+
+
+def seed_bar_events(df: pd.DataFrame):
+    """Start close events after the history: its last row is the forming bar"""
+    if df.empty:
+        bar_events.seed(None)
+        return
+    ts = [int(t.timestamp() * 1000) for t in df['timestamp'].iloc[-2:]]
+    last = df.iloc[-1]
+    bar_events.seed(ts[-2] if len(ts) > 1 else None,
+                    [ts[-1], last['open'], last['high'], last['low'], last['close'], last['volume']])
+
+
+async def on_bar_closed(bar: list, price: float):
+    """Runs exactly once per closed bar: trailing features, then signal detection on the closed bars"""
+    global last_processed_candle_time
+    ts_dt = pd.to_datetime(bar[0], unit='ms')
+    last_processed_candle_time = ts_dt
+
+    with df_lock:
+        n = int(price_df['timestamp'].searchsorted(ts_dt, side='right'))
+        if n == 0 or price_df['timestamp'].iat[n - 1] != ts_dt:
+            log_state(f"Closed bar {ts_dt} missing from the candle buffer - skipped")
+            return
+        closed_df = price_df.iloc[:n]
+        record_closed_bar(closed_df)
+        if current_position or n < MIN_CANDLES_FOR_IND:
+            return
+        signal = detect_signal(closed_df)
+        atr = get_atr_from_df(closed_df)
+
+    if signal not in ['BUY', 'SELL'] or not atr:
+        return
+
+    async with trade_lock:
+        # Pre-entry verification
+        has_no_position = await verify_no_position()
+        if not has_no_position:
+            log_state(f"Signal {signal} BLOCKED - position exists")
+            print(f"⚠️ Signal {signal} BLOCKED - position detected")
+            return
+
+        # Check orphan orders
+        open_orders = await fetch_symbol_orders()
+        if len(open_orders) > 5:
+            log_state(f"Signal {signal} BLOCKED - {len(open_orders)} orphan orders")
+            print(f"⚠️ Signal {signal} BLOCKED - cleaning {len(open_orders)} orphan orders")
+            await emergency_cleanup_orphans()
+            return
+
+        # Check balance
+        balance = await exchange.fetch_balance()
+        usdt_free = balance.get('USDT', {}).get('free', 0)
+        if usdt_free >= POSITION_SIZE_USDT * 1.1:
+            print(f"  {'─'*60}")
+            await place_entry(signal, price, atr)
+            print(f"{'─'*60}\n")
+        else:
+            log_state(f"Signal {signal} skipped - low balance: ${usdt_free:.2f}")
+            print(f"⚠️ Signal {signal} ignored - insufficient balance (${usdt_free:.2f})")
 
 
 # ════════════════════════════════════════════════════════════════════════════
-# ORDER HISTORY CLEANUP
+# HOUSEKEEPING JOBS (scheduled beside the market-data loop, never inline)
 # ════════════════════════════════════════════════════════════════════════════
 def cleanup_old_order_history():
     """Remove order history entries older than 1 hour"""
@@ -1211,23 +1711,133 @@ def cleanup_old_order_history():
     order_history = {k: v for k, v in order_history.items() if current_time - v < 3600}
 
 
+async def reconcile_fetch(awaitable):
+    """
+    A REST fetch of the reconcile job, bounded by RECONCILE_TIMEOUT_SEC
+    Returns None on timeout; MAX_RECONCILE_TIMEOUTS in a row trip the circuit breaker
+    """
+    global consecutive_reconcile_timeouts
+    try:
+        result = await asyncio.wait_for(awaitable, RECONCILE_TIMEOUT_SEC)
+    except asyncio.TimeoutError:
+        consecutive_reconcile_timeouts += 1
+        log_state(f"Reconcile fetch timed out after {RECONCILE_TIMEOUT_SEC}s ({consecutive_reconcile_timeouts}/{MAX_RECONCILE_TIMEOUTS})")
+        if consecutive_reconcile_timeouts >= MAX_RECONCILE_TIMEOUTS:
+            await trigger_circuit_breaker(f"{MAX_RECONCILE_TIMEOUTS} consecutive reconcile fetch timeouts")
+        return None
+    consecutive_reconcile_timeouts = 0
+    return result
+
+
+async def reconcile_job():
+    """
+    Periodic state reconciliation, then the orphan-order scan (reuses the reconciliation fetch)
+    Only the fetches are timed: a repair or emergency cleanup, once started, is not cut
+    off halfway (its own REST calls are bounded by the ccxt timeout)
+    """
+    global last_reconcile_time
+    epoch = trade_epoch
+    snapshot = await reconcile_fetch(asyncio.gather(exchange.fetch_positions([SYMBOL]), fetch_symbol_orders()))
+    if snapshot is None:
+        return
+    open_orders = await reconcile_state(*snapshot, epoch=epoch)
+    last_reconcile_time = time.time()
+
+    if open_orders is None:
+        open_orders = await reconcile_fetch(fetch_symbol_orders())
+        if open_orders is None:
+            return
+    if len(open_orders) > 10:
+        print(f"🚨 ORPHAN ORDER ALERT: {len(open_orders)} orders - emergency cleanup")
+        async with trade_lock:
+            success = await emergency_cleanup_orphans()
+        if not success:
+            await trigger_circuit_breaker("Emergency cleanup failed with 10+ orphan orders")
+
+
+def print_status():
+    """Position status line"""
+    position = current_position
+    if not position or price_df.empty:
+        return
+    with df_lock:
+        price = float(price_df['close'].iat[-1])
+
+    with position_lock:
+        direction = "Long" if position['side'] == 'long' else "Short"
+        remaining_qty = position.get('remaining_quantity', position['quantity'])
+        
+        if position['side'] == 'long':
+            pnl_raw = (price - position['entry_price']) * remaining_qty
+        else:
+            pnl_raw = (position['entry_price'] - price) * remaining_qty
+        
+        sl_price = position['sl_price']
+        
+        # Show partial exit status
+        partial_status = ""
+        if ENABLE_PARTIAL_EXITS:
+            if position.get('partial_exit_1_done', False):
+                partial_status = " [P1✓]"
+            if position.get('partial_exit_2_done', False):
+                partial_status += " [P2✓]"
+    
+    pnl_sign = "+" if pnl_raw >= 0 else ""
+    print(f"[{datetime.now(timezone.utc).strftime('%H:%M:%S')}] {direction} @ {position['entry_price']:.2f}{partial_status} | "
+          f"Price: {price:.2f} | PNL: {pnl_sign}{pnl_raw:.2f} | SL: {sl_price:.2f}")
+
+
+def report_kline_connections():
+    """Per-connection share of first arrivals and lag behind the fastest connection"""
+    if kline_feed:
+        log_state(f"Kline connections: {kline_feed.summary()}")
+
+
+def build_housekeeping() -> HousekeepingScheduler:
+    """Jobs by priority: reconciliation first, then snapshots, then the rest"""
+    scheduler = HousekeepingScheduler(on_error=log_state)
+    scheduler.add('reconcile', reconcile_job, RECONCILE_INTERVAL_SEC, priority=10)
+    scheduler.add('snapshot', save_snapshot, SNAPSHOT_INTERVAL_SEC, priority=5)
+    scheduler.add('order_history', cleanup_old_order_history, ORDER_HISTORY_CLEANUP_SEC)
+    scheduler.add('status', print_status, STATUS_INTERVAL_SEC, jitter=0.0)
+    scheduler.add('report', lambda: log_state(f"Housekeeping: {scheduler.summary()}"), HOUSEKEEPING_REPORT_SEC)
+    if MARKET_DATA_SOURCE != 'shm' and MARKET_DATA_CONNECTIONS > 1:
+        scheduler.add('kline_connections', report_kline_connections, HOUSEKEEPING_REPORT_SEC)
+    return scheduler
+
+
 # ════════════════════════════════════════════════════════════════════════════
 # MAIN LOOP
 # ════════════════════════════════════════════════════════════════════════════
 async def main_loop():
-    global exchange, current_position, price_df, last_processed_candle_time, last_reconcile_time
-    global consecutive_network_failures, bot_halted
-
-    exchange = await init_exchange()
-    price_df = await load_historical_data()
+    global exchange, current_position, price_df, last_reconcile_time, order_transport, kline_feed
+    global consecutive_network_failures, bot_halted, last_candle_rx_time, housekeeping
+
+    heartbeat.beat(phase='init', force=True)
+    snapshot = load_snapshot()
+    exchange = await init_exchange(snapshot)
+    order_transport = create_order_transport(exchange, ORDER_TRANSPORT)
+    if not await order_transport.start():
+        log_state("Websocket order entry unavailable - orders go over REST for now")
+    heartbeat.beat(phase='history', force=True)
+    if snapshot:
+        price_df = await restore_from_snapshot(snapshot)
+    else:
+        price_df = await load_historical_data()
+    heartbeat.beat(phase='reconcile', force=True)
     
     if not price_df.empty:
         with df_lock:
             compute_indicators(price_df)
+            seed_trail_stats(price_df)
         print(f"Initial indicators computed on {len(price_df)} candles")
+    seed_bar_events(price_df)
+    if MARKET_DATA_SOURCE != 'shm' and not bar_events.attach(exchange, SYMBOL):
+        log_state("Kline final flag unavailable - bar closes detected from the next bar / REST")
 
-    # Initial state reconciliation
+    # Initial state reconciliation (also validates a restored snapshot)
     await reconcile_state()
+    last_reconcile_time = time.time()
 
     print(f"  {'═'*70}")
     print(f"🚀 HARDENED TRADING BOT V3 STARTED")
@@ -1242,145 +1852,109 @@ async def main_loop():
         with open(TRADE_LOG_FILE, 'w', encoding='utf-8') as f:
             f.write("Timestamp | Side | Entry | Exit | Qty | PNL USDT | PNL % | Reason\n")
 
-    # Initial cleanup
-    print("🧹 Initial cleanup...")
-    await cancel_all_orders()
-    await asyncio.sleep(1)
+    # Initial cleanup (a warm start keeps its validated stop-loss; orphans were handled by reconciliation)
+    if not snapshot:
+        print("🧹 Initial cleanup...")
+        await cancel_all_orders()
+        await asyncio.sleep(1)
+    save_snapshot()
+
+    tick_task = asyncio.create_task(tick_trailing_driver()) if ENABLE_TICK_TRAILING else None
+    housekeeping = build_housekeeping()
+    housekeeping.start()
+    kline_key = (SYMBOL, TIMEFRAME)
+    md_clients = []
+    if MARKET_DATA_SOURCE == 'shm':
+        # Final flags are relayed through the ring; REST still covers a silent daemon
+        kline_tasks = [asyncio.create_task(pump_shm(
+            market_data, SYMBOL, TIMEFRAME, on_final=bar_events.mark_final,
+            on_error=lambda e: log_state(f"Shared-memory market data: {type(e).__name__}: {e}")))]
+    else:
+        # Redundant connections: a stall on one is covered by the others
+        kline_feed = FirstArrivalFeed(market_data)
+        md_clients = create_market_data_clients(MARKET_DATA_CONNECTIONS - 1)
+        for client in md_clients:
+            bar_events.attach(client, SYMBOL)
+        kline_tasks = [
+            asyncio.create_task(pump_ohlcv(
+                client, kline_feed.connection(f"ws{i}"), SYMBOL, TIMEFRAME,
+                on_error=lambda e, i=i: log_state(f"watch_ohlcv error (ws{i}): {type(e).__name__}: {e}")))
+            for i, client in enumerate([exchange] + md_clients)
+        ]
+    last_stream_rx = time.time()
+    conflated_seen = market_data.conflated(kline_key)
 
     while not bot_halted:
         try:
-            # Periodic state reconciliation
-            current_time = time.time()
-            if current_time - last_reconcile_time >= RECONCILE_INTERVAL_SEC:
-                await reconcile_state()
-                last_reconcile_time = current_time
-                
-                # Cleanup old order history
-                cleanup_old_order_history()
-                
-                # Check for orphan order accumulation
-                open_orders = await exchange.fetch_open_orders(SYMBOL)
-                if len(open_orders) > 10:
-                    print(f"🚨 ORPHAN ORDER ALERT: {len(open_orders)} orders - emergency cleanup")
-                    success = await emergency_cleanup_orphans()
-                    if not success:
-                        await trigger_circuit_breaker("Emergency cleanup failed with 10+ orphan orders")
-
-            # Watch OHLCV via WebSocket (with timeout fallback)
+            heartbeat.beat(last_candle_rx_time)
+            
+            # Newest OHLCV state from the WebSocket pump: wakes on every push, and at the latest
+            # when the forming bar should have closed (REST then confirms the close the stream has not delivered)
+            now = time.time()
+            bar_wait = bar_events.close_deadline(last_candle_rx_time) - now
+            stream_wait = WATCH_TIMEOUT_SEC - (now - last_stream_rx)
             try:
                 ohlcv_list = await asyncio.wait_for(
-                    exchange.watch_ohlcv(SYMBOL, TIMEFRAME),
-                    timeout=15.0
+                    market_data.take(kline_key),
+                    timeout=max(0.1, min(bar_wait, stream_wait))
                 )
-                candle = ohlcv_list[-1]
+                last_candle_rx_time = last_stream_rx = time.time()
                 consecutive_network_failures = 0  # Reset on success
+
+                conflated = market_data.conflated(kline_key)
+                if conflated > conflated_seen:
+                    log_state(f"Skipped {conflated - conflated_seen} stale kline update(s) after a slow iteration")
+                    conflated_seen = conflated
                 
             except asyncio.TimeoutError:
-                consecutive_network_failures += 1
-                log_state(f"watch_ohlcv timeout (failure {consecutive_network_failures}/{MAX_NETWORK_FAILURES})")
-                
-                if consecutive_network_failures >= MAX_NETWORK_FAILURES:
-                    await trigger_circuit_breaker(f"{MAX_NETWORK_FAILURES} consecutive network timeouts")
+                if time.time() - last_stream_rx >= WATCH_TIMEOUT_SEC:
+                    last_stream_rx = time.time()
+                    consecutive_network_failures += 1
+                    log_state(f"watch_ohlcv timeout (failure {consecutive_network_failures}/{MAX_NETWORK_FAILURES})")
+                    
+                    if consecutive_network_failures >= MAX_NETWORK_FAILURES:
+                        await trigger_circuit_breaker(f"{MAX_NETWORK_FAILURES} consecutive network timeouts")
                 
-                # Fallback to polling
-                ohlcv_list = await exchange.fetch_ohlcv(SYMBOL, TIMEFRAME, limit=1)
+                # Fallback to polling (the previous bar's final values and the current bar)
+                ohlcv_list = await exchange.fetch_ohlcv(SYMBOL, TIMEFRAME, limit=2)
                 if not ohlcv_list:
                     await asyncio.sleep(1)
                     continue
-                candle = ohlcv_list[-1]
+                last_candle_rx_time = time.time()
             
-            ts_ms = candle[0]
-            ts_dt = pd.to_datetime(ts_ms, unit='ms')
+            candle = ohlcv_list[-1]
+            closed_bar = bar_events.update(ohlcv_list)
+
+            # Bars missed since the last update: fetch only those, not the history
+            gap = find_candle_gap(ohlcv_list)
+            backfilled = await backfill_candles(*gap) if gap else None
+            if backfilled:
+                # Signals only on the newest missed bar; the older ones are past acting on
+                closed_bar = backfilled
+                bar_events.seed(int(backfilled[0]), candle)
 
             # Thread-safe DataFrame update
             with df_lock:
-                if not price_df.empty and price_df['timestamp'].iloc[-1] == ts_dt:
-                    # Update existing candle
-                    price_df.loc[price_df.index[-1], ['open','high','low','close','volume']] = candle[1:6]
-                else:
-                    # New candle
-                    new_row = {
-                        'timestamp': ts_dt,
-                        'open': float(candle[1]),
-                        'high': float(candle[2]),
-                        'low': float(candle[3]),
-                        'close': float(candle[4]),
-                        'volume': float(candle[5]),
-                    }
-                    price_df = pd.concat([price_df, pd.DataFrame([new_row])], ignore_index=True)
-
-                    if len(price_df) > 500:
-                        price_df = price_df.iloc[-500:].reset_index(drop=True)
+                merge_candles(ohlcv_list)
 
                 # Compute indicators
                 compute_indicators(price_df)
+                if backfilled:
+                    seed_trail_stats(price_df)
                 price = float(candle[4])
                 atr = get_atr_from_df(price_df)
+                if ENABLE_TICK_TRAILING:
+                    refresh_trail_features(atr)
 
             # Manage existing position (thread-safe read)
             if current_position and atr and len(price_df) >= MIN_CANDLES_FOR_IND:
-                await update_trailing_or_close(price, atr)
-                
-                with position_lock:
-                    direction = "Long" if current_position['side'] == 'long' else "Short"
-                    remaining_qty = current_position.get('remaining_quantity', current_position['quantity'])
-                    
-                    if current_position['side'] == 'long':
-                        pnl_raw = (price - current_position['entry_price']) * remaining_qty
-                    else:
-                        pnl_raw = (current_position['entry_price'] - price) * remaining_qty
-                    
-                    sl_price = current_position['sl_price']
-                    
-                    # Show partial exit status
-                    partial_status = ""
-                    if ENABLE_PARTIAL_EXITS:
-                        if current_position.get('partial_exit_1_done', False):
-                            partial_status = " [P1✓]"
-                        if current_position.get('partial_exit_2_done', False):
-                            partial_status += " [P2✓]"
-                
-                pnl_sign = "+" if pnl_raw >= 0 else ""
-                print(f"[{datetime.now(timezone.utc).strftime('%H:%M:%S')}] {direction} @ {current_position['entry_price']:.2f}{partial_status} | "
-                      f"Price: {price:.2f} | PNL: {pnl_sign}{pnl_raw:.2f} | SL: {sl_price:.2f}")
-
-            # Signal detection on closed candles only
-            if ts_dt != last_processed_candle_time:
-                if is_candle_closed(ts_dt, TIMEFRAME):
-                    last_processed_candle_time = ts_dt
-                    
-                    if not current_position and len(price_df) >= MIN_CANDLES_FOR_IND:
-                        with df_lock:
-                            signal = detect_signal(price_df)
-
-                        if signal in ['BUY', 'SELL'] and atr:
-                            # Pre-entry verification
-                            has_no_position = await verify_no_position()
-                            if not has_no_position:
-                                log_state(f"Signal {signal} BLOCKED - position exists")
-                                print(f"⚠️ Signal {signal} BLOCKED - position detected")
-                                continue
-                            
-                            # Check orphan orders
-                            open_orders = await exchange.fetch_open_orders(SYMBOL)
-                            if len(open_orders) > 5:
-                                log_state(f"Signal {signal} BLOCKED - {len(open_orders)} orphan orders")
-                                print(f"⚠️ Signal {signal} BLOCKED - cleaning {len(open_orders)} orphan orders")
-                                await emergency_cleanup_orphans()
-                                continue
-
-                            # Check balance
-                            balance = await exchange.fetch_balance()
-                            usdt_free = balance.get('USDT', {}).get('free', 0)
-                            if usdt_free >= POSITION_SIZE_USDT * 1.1:
-                                print(f"  {'─'*60}")
-                                await place_entry(signal, price, atr)
-                                print(f"{'─'*60}\n")
-                            else:
-                                log_state(f"Signal {signal} skipped - low balance: ${usdt_free:.2f}")
-                                print(f"⚠️ Signal {signal} ignored - insufficient balance (${usdt_free:.2f})")
-
-            await asyncio.sleep(0.1)
+                if not tick_driver_active():
+                    async with trade_lock:
+                        await update_trailing_or_close(price, atr)
+
+            # Signal detection once per closed bar
+            if closed_bar:
+                await on_bar_closed(closed_bar, price)
 
         except KeyboardInterrupt:
             print("  Stopped by user.")
@@ -1391,8 +1965,26 @@ async def main_loop():
             await asyncio.sleep(5)
 
     # Cleanup
+    await housekeeping.stop()
+    log_state(f"Housekeeping: {housekeeping.summary()}")
+    log_state(f"Order transport ({order_transport.name}): {order_transport.summary()}")
+    for task in kline_tasks:
+        task.cancel()
+    if kline_feed and len(kline_feed.stats) > 1:
+        print(f"Kline connections: {kline_feed.summary()}")
+    if tick_task:
+        tick_task.cancel()
+    if stop_cancels:
+        await asyncio.wait(list(stop_cancels), timeout=5)
+    stats = market_data.stats.get(kline_key)
+    if stats:
+        print(f"Kline updates: {stats['received']} received | {stats['delivered']} processed | {stats['conflated']} conflated")
     if current_position:
         await close_position(reason="Script stopped")
+    if not bot_halted:
+        save_snapshot()
+    for client in md_clients:
+        await client.close()
     if exchange:
         await exchange.close()
     print("Bot shutdown complete.")
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Account-wide reconciliation
+One fetch_positions() + two fetch_open_orders() per sweep (regular orders, then the
+conditional ones: stop orders live on Binance's separate algo-order endpoint and are
+only returned with trigger=True) cover every symbol on the account, so the REST cost
+of a reconcile cycle does not grow with the number of symbols. A host can register a
+symbol, a function returning its local view of the position, and a handler that
+receives the discrepancies for that symbol.
+
+Used by the account-wide tools (emergency_sl_placer.py, verify_positions.py,
+protection_daemon.py). The bots run as separate processes and still reconcile their
+own symbol (unified_trading_bot_v3.reconcile_state); nothing routes sweeps to them.
+"""
+import asyncio
+import inspect
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+QTY_TOLERANCE = 1e-9
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# HELPERS
+# ════════════════════════════════════════════════════════════════════════════
+def position_amount(position: Dict[str, Any]) -> float:
+    """Signed position size (positive long, negative short)"""
+    amt = float(position.get('contracts') or position.get('info', {}).get('positionAmt') or 0)
+    if position.get('side') == 'short' and amt > 0:
+        amt = -amt
+    return amt
+
+
+def is_stop_order(order: Dict[str, Any]) -> bool:
+    order_type = (order.get('type', '') or order.get('info', {}).get('type', '')).upper()
+    return any(x in order_type for x in ['STOP_MARKET', 'STOP_LOSS', 'TAKE_PROFIT_MARKET', 'STOP'])
+
+
+def cancel_params(order: Dict[str, Any]) -> Dict[str, Any]:
+    """cancel_order params for an open order (USD-M stops live on the algo-order endpoint)"""
+    return {'trigger': True} if is_stop_order(order) else {}
+
+
+def index_positions(positions: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Open positions keyed by symbol (flat entries dropped)"""
+    return {p['symbol']: p for p in positions if position_amount(p) != 0}
+
+
+def index_orders(orders: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Open orders grouped by symbol"""
+    grouped = defaultdict(list)
+    for order in orders:
+        grouped[order['symbol']].append(order)
+    return dict(grouped)
+
+
+def order_key(order: Dict[str, Any]) -> tuple:
+    """Fields of an open order that matter for reconciliation"""
+    stop_price = order.get('stopPrice') or order.get('info', {}).get('stopPrice')
+    return (order['id'], order.get('type'), order.get('side'), order.get('amount'), stop_price)
+
+
+def state_fingerprint(position: Optional[Dict[str, Any]], orders: List[Dict[str, Any]]) -> int:
+    """Compact hash of one symbol's exchange state (position size/entry + open order set)"""
+    pos = (position_amount(position), position.get('entryPrice')) if position else None
+    return hash((pos, tuple(sorted(order_key(o) for o in orders))))
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# DIFF
+# ════════════════════════════════════════════════════════════════════════════
+def exchange_issues(position: Optional[Dict[str, Any]], orders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Problems visible from exchange data alone (no local state needed)"""
+    issues = []
+    stops = [o for o in orders if is_stop_order(o)]
+    if position:
+        if not stops:
+            issues.append({'kind': 'unprotected', 'detail': f"position {position_amount(position)} has no stop-loss"})
+        elif len(stops) > 1:
+            issues.append({'kind': 'duplicate_stops', 'detail': f"{len(stops)} stop orders",
+                           'order_ids': [o['id'] for o in stops]})
+    elif orders:
+        issues.append({'kind': 'orphan_orders', 'detail': f"{len(orders)} orders with no position",
+                       'order_ids': [o['id'] for o in orders]})
+    return issues
+
+
+def diff_symbol(local: Optional[Dict[str, Any]], position: Optional[Dict[str, Any]],
+                orders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Compare a strategy's local view with the exchange for one symbol
+    local: None when flat, else {'side': 'long'|'short', 'quantity': float, 'stop_order_id': str|None}
+    """
+    issues = []
+    if position and not local:
+        issues.append({'kind': 'unknown_position', 'detail': f"exchange has {position_amount(position)}, local is flat"})
+    elif local and not position:
+        issues.append({'kind': 'phantom_position', 'detail': f"local {local['side']} {local['quantity']}, exchange is flat"})
+    elif local and position:
+        amt = position_amount(position)
+        exchange_side = 'long' if amt > 0 else 'short'
+        if exchange_side != local['side']:
+            issues.append({'kind': 'side_mismatch', 'detail': f"local {local['side']}, exchange {exchange_side}"})
+        elif abs(abs(amt) - local['quantity']) > QTY_TOLERANCE:
+            issues.append({'kind': 'size_mismatch', 'detail': f"local {local['quantity']}, exchange {abs(amt)}"})
+        stop_id = local.get('stop_order_id')
+        if stop_id and stop_id not in [o['id'] for o in orders]:
+            issues.append({'kind': 'stop_missing', 'detail': f"tracked stop {stop_id} is not open"})
+
+    return issues + exchange_issues(position, orders)
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# RECONCILER
+# ════════════════════════════════════════════════════════════════════════════
+class AccountReconciler:
+    """Sweeps the whole account and routes per-symbol reports to the owning strategy"""
+
+    def __init__(self, exchange, unowned_fn: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        """unowned_fn(report): optional handler for symbols no strategy registered"""
+        self.exchange = exchange
+        self.unowned_fn = unowned_fn
+        self.owners: Dict[str, Dict[str, Callable]] = {}
+        self.last_sweep_at = 0.0
+        self.sweeps = 0
+
+        # Account-wide open orders are intentional here
+        exchange.options['warnOnFetchOpenOrdersWithoutSymbol'] = False
+
+    def register(self, symbol: str, local_state_fn: Callable[[], Optional[Dict[str, Any]]],
+                 report_fn: Callable[[Dict[str, Any]], Any]):
+        """
+        local_state_fn(): the strategy's current view (see diff_symbol)
+        report_fn(report): called every sweep with
+            {'symbol', 'position', 'orders', 'issues'}; may be a coroutine function
+        """
+        self.owners[symbol] = {'local': local_state_fn, 'report': report_fn}
+
+    def unregister(self, symbol: str):
+        self.owners.pop(symbol, None)
+
+    async def sweep(self) -> Dict[str, Any]:
+        """Three REST calls regardless of how many symbols are registered"""
+        positions, orders, trigger_orders = await asyncio.gather(
+            self.exchange.fetch_positions(),
+            self.exchange.fetch_open_orders(),
+            self.exchange.fetch_open_orders(params={'trigger': True}),
+        )
+        self.last_sweep_at = time.time()
+        self.sweeps += 1
+        return {
+            'positions': index_positions(positions),
+            'orders': index_orders(orders + trigger_orders),
+            'fetched_at': self.last_sweep_at,
+        }
+
+    def build_reports(self, snapshot: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Per-symbol reports for every registered symbol plus any unowned activity"""
+        reports = {}
+        symbols = set(self.owners) | set(snapshot['positions']) | set(snapshot['orders'])
+        for symbol in sorted(symbols):
+            position = snapshot['positions'].get(symbol)
+            orders = snapshot['orders'].get(symbol, [])
+            owner = self.owners.get(symbol)
+            if owner:
+                issues = diff_symbol(owner['local'](), position, orders)
+            else:
+                issues = [{'kind': 'unowned', 'detail': 'no registered strategy for this symbol'}]
+                issues += exchange_issues(position, orders)
+            reports[symbol] = {'symbol': symbol, 'position': position, 'orders': orders, 'issues': issues}
+        return reports
+
+    async def run_cycle(self) -> Dict[str, Dict[str, Any]]:
+        """Sweep once and deliver each report to its owner"""
+        reports = self.build_reports(await self.sweep())
+        for symbol, report in reports.items():
+            owner = self.owners.get(symbol)
+            handler = owner['report'] if owner else self.unowned_fn
+            if handler is None:
+                continue
+            result = handler(report)
+            if inspect.isawaitable(result):
+                await result
+        return reports
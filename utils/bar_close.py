@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Bar-close events
+Turns kline updates into exactly one close event per bar, as soon as the exchange says
+the bar is final instead of guessing from the wall clock:
+  1. the kline's final flag (Binance 'x'), read from the raw stream message
+  2. the first update of the next bar (the final push was missed or coalesced)
+  3. a timer fallback for the caller: when the stream is quiet past bar end + grace,
+     a REST fetch that already contains the next bar closes the previous one
+
+Candles are ccxt rows [timestamp_ms, open, high, low, close, volume].
+
+Usage:
+    bars = BarCloseTracker('3m')
+    bars.attach(exchange, symbol)              # final-flag hook on the ccxt.pro client
+    bars.seed(last_closed_ts, forming_row)     # from the startup history
+    closed = bars.update(ohlcv)                # each watch_ohlcv / fetch_ohlcv result
+    timeout = bars.close_deadline(last_rx) - time.time()
+"""
+import time
+from typing import Optional, Sequence
+
+TIMEFRAME_MS = {
+    '1m': 60_000, '3m': 180_000, '5m': 300_000, '15m': 900_000,
+    '30m': 1_800_000, '1h': 3_600_000, '4h': 14_400_000,
+}
+CLOSE_GRACE_SEC = 2.0  # Quiet time after bar end before the caller falls back to REST
+
+
+class BarCloseTracker:
+    def __init__(self, timeframe: str, grace_sec: float = CLOSE_GRACE_SEC):
+        self.timeframe = timeframe
+        self.tf_ms = TIMEFRAME_MS[timeframe]
+        self.grace_sec = grace_sec
+        self.forming: Optional[list] = None        # Latest state of the open bar
+        self.last_closed_ts: Optional[int] = None  # Bar of the last close event
+        self.final: Optional[list] = None          # Bar the stream flagged final, not yet consumed
+
+    def seed(self, last_closed_ts: Optional[int], forming: Optional[Sequence[float]] = None):
+        """Bars up to last_closed_ts are already handled (e.g. the startup history)"""
+        self.last_closed_ts = last_closed_ts
+        self.forming = list(forming) if forming is not None else None
+        self.final = None
+
+    # ── final flag ──
+    def attach(self, exchange, symbol: str) -> bool:
+        """
+        Wrap the client's kline handler to catch Binance's final flag, which ccxt drops
+        when it parses the message. Clients without the handler (simulators, other
+        exchanges) rely on next-bar detection alone.
+        """
+        handler = getattr(exchange, 'handle_ohlcv', None)
+        market_id = (getattr(exchange, 'markets', None) or {}).get(symbol, {}).get('id')
+        if handler is None or market_id is None:
+            return False
+        interval = self.timeframe
+
+        def handle_ohlcv(client, message):
+            kline = message.get('k') if isinstance(message, dict) else None
+            if kline and kline.get('x') and kline.get('s') == market_id and kline.get('i') == interval:
+                self.mark_final([int(kline['t']), float(kline['o']), float(kline['h']),
+                                 float(kline['l']), float(kline['c']), float(kline['v'])])
+            return handler(client, message)
+
+        exchange.handle_ohlcv = handle_ohlcv
+        return True
+
+    def mark_final(self, bar: Sequence[float]):
+        """The source says bar is final (stream flag, or a relay such as the shared-memory ring)"""
+        self.final = [int(bar[0])] + [float(v) for v in bar[1:6]]
+
+    # ── updates ──
+    def update(self, ohlcv: Sequence[Sequence[float]]) -> Optional[list]:
+        """
+        Feed the rows of one kline update (stream push or REST fetch, oldest first)
+        Returns the bar that closed with it (final values), at most once per bar, or None
+        """
+        if not ohlcv:
+            return None
+        latest = list(ohlcv[-1])
+        ts = int(latest[0])
+        closed = None
+
+        if self.final is not None and self.final[0] == ts:
+            closed, self.final = self.final, None
+        elif self.forming is not None and ts > self.forming[0]:
+            # Final values of the previous bar when the update carries them
+            closed = next((list(c) for c in ohlcv if int(c[0]) == self.forming[0]), self.forming)
+
+        if self.forming is None or ts >= self.forming[0]:
+            self.forming = latest
+        return self._claim(closed)
+
+    def _claim(self, bar: Optional[list]) -> Optional[list]:
+        if bar is None or (self.last_closed_ts is not None and int(bar[0]) <= self.last_closed_ts):
+            return None
+        self.last_closed_ts = int(bar[0])
+        return bar
+
+    # ── timer fallback ──
+    def close_deadline(self, last_rx: Optional[float]) -> float:
+        """
+        Wall-clock time after which the caller should fetch the bar over REST: the
+        open bar's end (or the last update, if later) plus the grace period
+        """
+        if self.forming is None or self.forming[0] == self.last_closed_ts:
+            return (last_rx or time.time()) + self.grace_sec
+        bar_end = (self.forming[0] + self.tf_ms) / 1000
+        return max(bar_end, last_rx or 0.0) + self.grace_sec
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Multi-timeframe candle aggregator
+One base stream (1m klines or raw trades) builds every higher timeframe the strategies
+need, so a single websocket subscription replaces one subscription or REST poll per
+timeframe. Each update costs O(1) per timeframe: closed base bars of the current bucket
+are folded into running open/high/low/volume, and the forming base bar is merged on top.
+
+Candles are ccxt rows [timestamp_ms, open, high, low, close, volume].
+
+Usage:
+    agg = CandleAggregator('1m', ['3m', '5m', '1h'])
+    agg.subscribe('5m', atr.update)            # called with each closed 5m candle
+    agg.update(kline)                          # from watch_ohlcv(symbol, '1m')
+    agg.update_trade(ts_ms, price, amount)     # or from watch_trades(symbol)
+"""
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence
+
+TIMEFRAME_MS = {
+    '1m': 60_000, '3m': 180_000, '5m': 300_000, '15m': 900_000,
+    '30m': 1_800_000, '1h': 3_600_000, '4h': 14_400_000,
+}
+HISTORY_BARS = 500  # Closed bars kept per timeframe
+
+
+class _Bucket:
+    """One forming higher-timeframe bar"""
+
+    __slots__ = ('ts', 'open', 'high', 'low', 'volume', 'complete')
+
+    def __init__(self, ts: int, candle: Sequence[float], complete: bool):
+        self.ts = ts
+        self.open = float(candle[1])
+        self.high = float(candle[2])
+        self.low = float(candle[3])
+        self.volume = 0.0
+        self.complete = complete  # False when the stream started inside this bucket
+
+    def fold(self, candle: Sequence[float]):
+        """Add a closed base bar"""
+        self.high = max(self.high, float(candle[2]))
+        self.low = min(self.low, float(candle[3]))
+        self.volume += float(candle[5])
+
+    def merged(self, forming: Optional[Sequence[float]], close: float) -> list:
+        if forming is None:
+            return [self.ts, self.open, self.high, self.low, close, self.volume]
+        return [self.ts, self.open, max(self.high, float(forming[2])), min(self.low, float(forming[3])),
+                float(forming[4]), self.volume + float(forming[5])]
+
+
+class CandleAggregator:
+    def __init__(self, base: str = '1m', timeframes: Sequence[str] = ('3m', '5m', '15m', '1h'),
+                 history: int = HISTORY_BARS):
+        self.base = base
+        self.base_ms = TIMEFRAME_MS[base]
+        for tf in timeframes:
+            if TIMEFRAME_MS[tf] % self.base_ms:
+                raise ValueError(f"{tf} is not a multiple of the {base} base timeframe")
+        self.timeframes = [tf for tf in timeframes if tf != base]
+        self.tf_ms = {tf: TIMEFRAME_MS[tf] for tf in self.timeframes}
+
+        self.forming_base: Optional[list] = None   # Latest state of the forming base bar
+        self.last_close: Optional[float] = None
+        self.buckets: Dict[str, Optional[_Bucket]] = {tf: None for tf in self.timeframes}
+        self.closed: Dict[str, deque] = {tf: deque(maxlen=history) for tf in [base] + self.timeframes}
+        self.on_close: Dict[str, List[Callable]] = {tf: [] for tf in [base] + self.timeframes}
+        self.on_update: Dict[str, List[Callable]] = {tf: [] for tf in [base] + self.timeframes}
+
+    # ── subscriptions ──
+    def subscribe(self, timeframe: str, on_close: Optional[Callable[[list], None]] = None,
+                  on_update: Optional[Callable[[list], None]] = None):
+        """on_close(candle) once per closed bar; on_update(candle) on every change of the forming bar"""
+        if timeframe not in self.on_close:
+            raise ValueError(f"{timeframe} is not aggregated (base {self.base}, timeframes {self.timeframes})")
+        if on_close:
+            self.on_close[timeframe].append(on_close)
+        if on_update:
+            self.on_update[timeframe].append(on_update)
+
+    def seed(self, timeframe: str, closed: Sequence[Sequence[float]], forming: Optional[Sequence[float]] = None):
+        """
+        Closed history for a timeframe (e.g. one REST fetch at startup), and optionally its
+        forming bar so the first bucket the stream joins mid-way still closes as a full bar
+        (its volume may count the overlap twice)
+        """
+        self.closed[timeframe].extend(list(c) for c in closed)
+        if forming is not None and timeframe in self.buckets:
+            bucket = _Bucket(int(forming[0]), forming, complete=True)
+            bucket.fold(forming)
+            self.buckets[timeframe] = bucket
+
+    # ── reads ──
+    def forming(self, timeframe: str) -> Optional[list]:
+        """Current state of the forming bar"""
+        if timeframe == self.base:
+            return list(self.forming_base) if self.forming_base else None
+        bucket = self.buckets[timeframe]
+        if bucket is None:
+            return None
+        return bucket.merged(self.forming_base if self._in_bucket(timeframe, self.forming_base) else None,
+                             self.last_close)
+
+    def _in_bucket(self, timeframe: str, candle: Optional[Sequence[float]]) -> bool:
+        bucket = self.buckets[timeframe]
+        return candle is not None and bucket is not None and int(candle[0]) - int(candle[0]) % self.tf_ms[timeframe] == bucket.ts
+
+    # ── updates ──
+    def update(self, candle: Sequence[float]):
+        """A base kline update (forming or final); updates older than the forming bar are ignored"""
+        ts = int(candle[0])
+        if self.forming_base is not None:
+            if ts < self.forming_base[0]:
+                return
+            if ts > self.forming_base[0]:
+                self._close_base(self.forming_base)
+        self.forming_base = [ts, float(candle[1]), float(candle[2]), float(candle[3]), float(candle[4]), float(candle[5])]
+        self.last_close = self.forming_base[4]
+
+        for tf in self.timeframes:
+            bucket_ts = ts - ts % self.tf_ms[tf]
+            bucket = self.buckets[tf]
+            if bucket is None or bucket_ts != bucket.ts:
+                if bucket is not None and bucket_ts > bucket.ts:
+                    self._close_bucket(tf)
+                # A bucket joined after its first base bar is incomplete
+                self.buckets[tf] = _Bucket(bucket_ts, candle, complete=(ts == bucket_ts) or bucket is not None)
+            if self.on_update[tf]:
+                merged = self.forming(tf)
+                for callback in self.on_update[tf]:
+                    callback(merged)
+        for callback in self.on_update[self.base]:
+            callback(list(self.forming_base))
+
+    def update_trade(self, ts_ms: int, price: float, amount: float = 0.0):
+        """A trade: folded into the forming base bar, then aggregated like a kline update"""
+        bar_ts = int(ts_ms) - int(ts_ms) % self.base_ms
+        price = float(price)
+        forming = self.forming_base
+        if forming is not None and bar_ts == forming[0]:
+            candle = [bar_ts, forming[1], max(forming[2], price), min(forming[3], price), price, forming[5] + float(amount)]
+        else:
+            candle = [bar_ts, price, price, price, price, float(amount)]
+        self.update(candle)
+
+    def _close_base(self, candle: list):
+        self.closed[self.base].append(candle)
+        for callback in self.on_close[self.base]:
+            callback(candle)
+        for tf in self.timeframes:
+            if self._in_bucket(tf, candle):
+                self.buckets[tf].fold(candle)
+
+    def _close_bucket(self, timeframe: str):
+        bucket = self.buckets[timeframe]
+        self.buckets[timeframe] = None
+        if not bucket.complete:
+            return  # Started mid-bucket: not a real bar
+        candle = bucket.merged(None, self.closed[self.base][-1][4] if self.closed[self.base] else self.last_close)
+        self.closed[timeframe].append(candle)
+        for callback in self.on_close[timeframe]:
+            callback(candle)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+On-disk candle store
+Closed candles per symbol and timeframe, kept as one float64 array of ccxt rows
+[timestamp_ms, open, high, low, close, volume] sorted by timestamp (data/candles/
+ETHUSDT_3m.npy). Reads are memory-mapped; a write merges the new rows into the file
+and replaces it atomically, so a reader never sees a half-written history. Writers
+(several bot instances may share the store) take an exclusive lock on a per-file
+.lock, so one merge never drops another's rows.
+
+Merging is vectorized (stable sort + run ends): rows with the same timestamp keep the
+latest copy, with no per-row Python work and no DataFrame round trip.
+
+Usage:
+    store = CandleStore()                                  # data/candles
+    store.write('ETH/USDT:USDT', '3m', rows)               # merge closed candles in
+    rows = store.read('ETH/USDT:USDT', '3m', since=ms)     # (n, 6) array, oldest first
+    df = store.frame('ETH/USDT:USDT', '3m', since=ms)      # timestamp / open / ... columns
+"""
+import fcntl
+import os
+import tempfile
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+STORE_DIR = 'data/candles'
+COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+def as_rows(ohlcv) -> np.ndarray:
+    """ccxt rows (list or array) as an (n, 6) float64 array"""
+    rows = np.asarray(ohlcv, dtype=np.float64)
+    return rows.reshape(-1, 6) if rows.size else np.empty((0, 6))
+
+
+def merge_rows(*parts) -> np.ndarray:
+    """Concatenate row arrays, sort by timestamp and keep the last copy of each timestamp"""
+    rows = np.concatenate([as_rows(p) for p in parts]) if parts else np.empty((0, 6))
+    if len(rows) < 2:
+        return rows
+    order = np.argsort(rows[:, 0], kind='stable')  # Equal timestamps stay in input order
+    rows = rows[order]
+    ts = rows[:, 0]
+    last = np.empty(len(rows), dtype=bool)
+    last[:-1] = ts[1:] != ts[:-1]
+    last[-1] = True
+    return rows[last]
+
+
+def rows_to_frame(rows: np.ndarray) -> pd.DataFrame:
+    """The DataFrame layout the bots build from fetch_ohlcv"""
+    df = pd.DataFrame(as_rows(rows), columns=COLUMNS)
+    df['timestamp'] = pd.to_datetime(df['timestamp'].astype('int64'), unit='ms')
+    return df
+
+
+class CandleStore:
+    def __init__(self, root: str = STORE_DIR):
+        self.root = root
+
+    def path(self, symbol: str, timeframe: str) -> str:
+        return os.path.join(self.root, f"{symbol.split(':')[0].replace('/', '')}_{timeframe}.npy")
+
+    def read(self, symbol: str, timeframe: str, since: Optional[int] = None, until: Optional[int] = None) -> np.ndarray:
+        """Stored rows with since <= timestamp < until (an empty array when nothing is stored)"""
+        path = self.path(symbol, timeframe)
+        if not os.path.exists(path):
+            return np.empty((0, 6))
+        rows = np.load(path, mmap_mode='r')
+        ts = rows[:, 0]
+        start = 0 if since is None else int(np.searchsorted(ts, since, side='left'))
+        end = len(rows) if until is None else int(np.searchsorted(ts, until, side='left'))
+        return np.array(rows[start:end])
+
+    def frame(self, symbol: str, timeframe: str, since: Optional[int] = None, until: Optional[int] = None) -> pd.DataFrame:
+        return rows_to_frame(self.read(symbol, timeframe, since, until))
+
+    def write(self, symbol: str, timeframe: str, ohlcv) -> int:
+        """Merge rows into the stored history (new values win); returns the stored row count"""
+        rows = as_rows(ohlcv)
+        if not len(rows):
+            return len(self.read(symbol, timeframe))
+        path = self.path(symbol, timeframe)
+        os.makedirs(self.root, exist_ok=True)
+        with open(f"{path}.lock", 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)  # Released when the file is closed
+            merged = merge_rows(self.read(symbol, timeframe), rows)
+            fd, tmp = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.{os.getpid()}.", suffix='.tmp', dir=self.root)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    np.save(f, merged)
+                os.replace(tmp, path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        return len(merged)
@@ -7,20 +7,14 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import asyncio
-import ccxt.pro as ccxtpro
-from config.api_keys import API_KEY, API_SECRET
+from utils.exchange_broker import connect_exchange
 
 async def check_balance():
     """Check USDT balance on Binance testnet"""
-    exchange = ccxtpro.binanceusdm({
-        'apiKey': API_KEY,
-        'secret': API_SECRET,
-        'enableRateLimit': True,
-    })
-    exchange.enableDemoTrading(True)
+    print("Connecting to Binance Testnet...")
+    exchange = await connect_exchange('demo')  # Broker if running, else direct client
     
     try:
-        print("Connecting to Binance Testnet...")
         balance = await exchange.fetch_balance()
         
         usdt = balance.get('USDT', {})
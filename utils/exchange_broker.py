@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Exchange Broker - one warm exchange client shared by local tools over IPC
+The broker keeps a single ccxt.pro client (keep-alive HTTP session, loaded markets,
+synced time offset) and serves JSON-line requests on a Unix socket. Status checks and
+one-shot tools call it instead of paying for a TLS handshake and a markets download
+on every run. When no broker is running, connect_exchange() falls back to a direct
+client from utils.exchange_factory, so tools work either way.
+
+Run:
+    python3 utils/exchange_broker.py [live|demo|sandbox]
+
+Protocol (one JSON object per line):
+    -> {"id": 1, "method": "fetch_balance", "args": [], "kwargs": {}}
+    <- {"id": 1, "result": {...}}  or  {"id": 1, "error": {"type": "InsufficientFunds", "message": "..."}}
+"""
+import asyncio
+import inspect
+import itertools
+import json
+import os
+import socket
+import sys
+import time
+from typing import Any, Dict
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.exchange_factory import (
+    MARKETS_CACHE_MAX_AGE_SEC, create_exchange, get_exchange, close_shared,
+    prepare_exchange, prepare_exchange_sync, write_markets_cache,
+)
+
+SOCKET_DIR = 'data'
+CONNECT_TIMEOUT_SEC = 1.0
+REQUEST_TIMEOUT_SEC = 30.0
+STREAM_LIMIT = 16 * 1024 * 1024  # Account-wide positions/markets replies are far above asyncio's 64 KiB line default
+
+# Methods the broker will forward (everything a tool needs; nothing that reconfigures the client)
+BROKER_METHODS = {
+    'fetch_balance', 'fetch_positions', 'fetch_open_orders', 'fetch_order', 'fetch_orders',
+    'fetch_my_trades', 'fetch_ticker', 'fetch_tickers', 'fetch_ohlcv', 'fetch_order_book',
+    'fetch_funding_rate', 'create_order', 'cancel_order', 'cancel_all_orders',
+    'set_leverage', 'set_position_mode', 'amount_to_precision', 'price_to_precision',
+}
+
+
+def socket_path(mode: str = 'live') -> str:
+    suffix = '' if mode == 'live' else f'_{mode}'
+    return os.path.join(SOCKET_DIR, f'exchange_broker{suffix}.sock')
+
+
+class BrokerError(Exception):
+    """Remote failure that does not map to a ccxt exception class"""
+
+
+def _raise_remote(error: Dict[str, str]):
+    """Re-raise a broker error as the ccxt exception it came from when possible"""
+    import ccxt
+    cls = getattr(ccxt, error.get('type', ''), None)
+    if isinstance(cls, type) and issubclass(cls, Exception):
+        raise cls(error.get('message', ''))
+    raise BrokerError(f"{error.get('type')}: {error.get('message')}")
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# SERVER
+# ════════════════════════════════════════════════════════════════════════════
+class ExchangeBroker:
+    def __init__(self, mode: str = 'live'):
+        self.mode = mode
+        self.path = socket_path(mode)
+        self.client = None
+        self.requests = 0
+        self.errors = 0
+        self.clients_connected = 0
+
+    async def _call(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        method = request.get('method')
+        response = {'id': request.get('id')}
+        if method not in BROKER_METHODS:
+            response['error'] = {'type': 'BrokerError', 'message': f"method '{method}' not allowed"}
+            return response
+        try:
+            result = getattr(self.client, method)(*request.get('args', []), **request.get('kwargs', {}))
+            if inspect.isawaitable(result):
+                result = await asyncio.wait_for(result, timeout=REQUEST_TIMEOUT_SEC)
+            response['result'] = result
+        except Exception as e:
+            self.errors += 1
+            response['error'] = {'type': type(e).__name__, 'message': str(e)}
+        return response
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.clients_connected += 1
+        try:
+            async for line in reader:
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    continue
+                self.requests += 1
+                response = await self._call(request)
+                writer.write((json.dumps(response, default=str) + '\n').encode())
+                await writer.drain()
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            self.clients_connected -= 1
+            writer.close()
+
+    async def _refresh_markets(self):
+        """Keep markets + time offset (and the shared disk cache) fresh"""
+        while True:
+            await asyncio.sleep(MARKETS_CACHE_MAX_AGE_SEC / 2)
+            try:
+                await self.client.load_markets(reload=True)
+                write_markets_cache(self.client, self.mode)
+            except Exception as e:
+                print(f"Markets refresh failed: {e}")
+
+    async def serve_forever(self):
+        self.client = await get_exchange(self.mode)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if os.path.exists(self.path):
+            os.remove(self.path)  # Stale socket from a previous run
+        server = await asyncio.start_unix_server(self._handle, path=self.path, limit=STREAM_LIMIT)
+        os.chmod(self.path, 0o600)
+        refresher = asyncio.create_task(self._refresh_markets())
+        print(f"🔌 Exchange broker ({self.mode}) listening on {self.path}")
+        try:
+            async with server:
+                while True:
+                    await asyncio.sleep(60)
+                    print(f"[{time.strftime('%H:%M:%S')}] Requests: {self.requests} | Errors: {self.errors} | "
+                          f"Clients: {self.clients_connected}")
+        finally:
+            refresher.cancel()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            await close_shared()
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# CLIENTS
+# ════════════════════════════════════════════════════════════════════════════
+class BrokerClient:
+    """Async proxy: await client.fetch_balance() is forwarded to the broker"""
+
+    via_broker = True
+
+    def __init__(self, mode: str = 'live'):
+        self.mode = mode
+        self.options: Dict[str, Any] = {}  # ccxt-compatible attribute (options are set broker-side)
+        self._ids = itertools.count(1)
+        self._lock = asyncio.Lock()
+        self._reader = None
+        self._writer = None
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_unix_connection(socket_path(self.mode), limit=STREAM_LIMIT), timeout=CONNECT_TIMEOUT_SEC
+        )
+        return self
+
+    async def call(self, method: str, *args, **kwargs):
+        request = {'id': next(self._ids), 'method': method, 'args': list(args), 'kwargs': kwargs}
+        async with self._lock:  # One request in flight per connection
+            self._writer.write((json.dumps(request) + '\n').encode())
+            await self._writer.drain()
+            response = await asyncio.wait_for(self._read_response(request['id']), timeout=REQUEST_TIMEOUT_SEC + 5)
+        if 'error' in response:
+            _raise_remote(response['error'])
+        return response.get('result')
+
+    async def _read_response(self, request_id: int) -> dict:
+        """Reply to request_id; late replies to timed-out or cancelled calls are dropped"""
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                raise BrokerError("broker closed the connection")
+            response = json.loads(line)
+            if response.get('id') == request_id:
+                return response
+
+    def __getattr__(self, name: str):
+        if name in BROKER_METHODS:
+            return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+        raise AttributeError(name)
+
+    async def close(self):
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+
+
+class SyncBrokerClient:
+    """Blocking proxy for synchronous scripts"""
+
+    via_broker = True
+
+    def __init__(self, mode: str = 'live'):
+        self.mode = mode
+        self.options: Dict[str, Any] = {}
+        self._ids = itertools.count(1)
+        self._sock = None
+        self._file = None
+
+    def connect(self):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(CONNECT_TIMEOUT_SEC)
+        try:
+            self._sock.connect(socket_path(self.mode))
+        except OSError:
+            self._sock.close()
+            raise
+        self._sock.settimeout(REQUEST_TIMEOUT_SEC + 5)
+        self._file = self._sock.makefile('rwb')
+        return self
+
+    def call(self, method: str, *args, **kwargs):
+        request = {'id': next(self._ids), 'method': method, 'args': list(args), 'kwargs': kwargs}
+        if self._file is None:
+            self.connect()  # Dropped after a timeout
+        try:
+            self._file.write((json.dumps(request) + '\n').encode())
+            self._file.flush()
+            response = self._read_response(request['id'])
+        except OSError:
+            # A socket file is unusable after a timeout; the next call reconnects
+            self.close()
+            raise
+        if 'error' in response:
+            _raise_remote(response['error'])
+        return response.get('result')
+
+    def _read_response(self, request_id: int) -> dict:
+        while True:
+            line = self._file.readline()
+            if not line:
+                raise BrokerError("broker closed the connection")
+            response = json.loads(line)
+            if response.get('id') == request_id:
+                return response
+
+    def __getattr__(self, name: str):
+        if name in BROKER_METHODS:
+            return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+        raise AttributeError(name)
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._sock.close()
+            self._file = None
+
+
+async def connect_exchange(mode: str = 'live'):
+    """
+    Broker connection when one is running, otherwise a direct client with cached markets
+    Either way the result supports the BROKER_METHODS and `await close()`
+    """
+    try:
+        return await BrokerClient(mode).connect()
+    except (OSError, asyncio.TimeoutError):
+        client = create_exchange(mode)
+        await prepare_exchange(client, mode)
+        return client
+
+
+def connect_exchange_sync(mode: str = 'live'):
+    """connect_exchange for synchronous scripts"""
+    try:
+        return SyncBrokerClient(mode).connect()
+    except OSError:
+        client = create_exchange(mode, pro=False)
+        prepare_exchange_sync(client, mode)
+        return client
+
+
+if __name__ == '__main__':
+    broker_mode = sys.argv[1] if len(sys.argv) > 1 else 'live'
+    try:
+        asyncio.run(ExchangeBroker(broker_mode).serve_forever())
+    except KeyboardInterrupt:
+        print("\n✓ Exchange broker stopped")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Exchange client factory
+One place that builds Binance USD-M clients for the bots and tools:
+- shared config (keys, rate limiting, futures defaults)
+- market metadata + server time offset cached on disk, so a start does not
+  download every market again
+- one shared client per process and mode (get_exchange)
+Modes: 'live', 'demo' (Binance demo trading) and 'sandbox' (legacy testnet).
+"""
+import os
+import pickle
+import time
+from typing import Any, Dict, Optional
+
+MODES = ('live', 'demo', 'sandbox')
+MARKETS_CACHE_DIR = 'data'
+MARKETS_CACHE_MAX_AGE_SEC = 6 * 3600  # Listings/precision change rarely; the clock offset drifts slowly
+
+_shared: Dict[str, Any] = {}
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# CLIENT CONSTRUCTION
+# ════════════════════════════════════════════════════════════════════════════
+def exchange_config(options: Optional[Dict[str, Any]] = None, with_keys: bool = True) -> Dict[str, Any]:
+    """ccxt constructor config shared by every client"""
+    config = {
+        'enableRateLimit': True,
+        'options': {
+            'defaultType': 'future',
+            'adjustForTimeDifference': True,
+            'warnOnFetchOpenOrdersWithoutSymbol': False,
+            **(options or {}),
+        },
+    }
+    if with_keys:
+        from config.api_keys import API_KEY, API_SECRET  # Lazy: public-data tools need no keys
+        config['apiKey'] = API_KEY
+        config['secret'] = API_SECRET
+    return config
+
+
+def create_exchange(mode: str = 'live', pro: bool = True, options: Optional[Dict[str, Any]] = None,
+                    with_keys: bool = True):
+    """
+    New Binance USD-M client (markets not loaded yet - see prepare_exchange)
+    pro: ccxt.pro client (websockets + async REST); False for the synchronous ccxt client
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown exchange mode '{mode}' (expected one of {MODES})")
+
+    if pro:
+        import ccxt.pro as ccxt_module
+    else:
+        import ccxt as ccxt_module
+
+    client = ccxt_module.binanceusdm(exchange_config(options, with_keys))
+    if mode == 'demo':
+        client.enable_demo_trading(True)
+    elif mode == 'sandbox':
+        client.set_sandbox_mode(True)
+    return client
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# MARKETS / TIME OFFSET CACHE
+# ════════════════════════════════════════════════════════════════════════════
+def markets_cache_file(mode: str = 'live') -> str:
+    suffix = '' if mode == 'live' else f'_{mode}'
+    return os.path.join(MARKETS_CACHE_DIR, f'markets_cache{suffix}.pkl')
+
+
+def read_markets_cache(mode: str = 'live', max_age: Optional[float] = MARKETS_CACHE_MAX_AGE_SEC) -> Optional[Dict[str, Any]]:
+    """Cached {'saved_at', 'markets', 'time_difference'}, or None if missing/unreadable/too old"""
+    try:
+        with open(markets_cache_file(mode), 'rb') as f:
+            cache = pickle.load(f)
+    except Exception:
+        return None
+    if max_age is not None and time.time() - cache.get('saved_at', 0) > max_age:
+        return None
+    return cache
+
+
+def write_markets_cache(client, mode: str = 'live'):
+    """Persist the client's markets and time offset (atomic replace)"""
+    path = markets_cache_file(mode)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump({
+            'saved_at': time.time(),
+            'markets': client.markets,
+            'time_difference': client.options.get('timeDifference', 0),
+        }, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def apply_markets_cache(client, mode: str = 'live', max_age: Optional[float] = MARKETS_CACHE_MAX_AGE_SEC) -> bool:
+    """Load markets + time offset from disk into the client. Returns False on a cache miss."""
+    cache = read_markets_cache(mode, max_age)
+    if not cache or not cache.get('markets'):
+        return False
+    client.set_markets(cache['markets'])
+    client.options['timeDifference'] = cache.get('time_difference', 0)
+    return True
+
+
+async def prepare_exchange(client, mode: str = 'live', reload: bool = False) -> str:
+    """
+    Make an async client ready for trading calls
+    Returns: 'cache' or 'exchange' (where the markets came from)
+    """
+    if not reload and apply_markets_cache(client, mode):
+        return 'cache'
+    await client.load_markets(reload=True)
+    try:
+        write_markets_cache(client, mode)
+    except Exception as e:
+        print(f"Markets cache write failed: {e}")
+    return 'exchange'
+
+
+def prepare_exchange_sync(client, mode: str = 'live', reload: bool = False) -> str:
+    """prepare_exchange for synchronous ccxt clients"""
+    if not reload and apply_markets_cache(client, mode):
+        return 'cache'
+    client.load_markets(reload=True)
+    try:
+        write_markets_cache(client, mode)
+    except Exception as e:
+        print(f"Markets cache write failed: {e}")
+    return 'exchange'
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# SHARED CLIENT
+# ════════════════════════════════════════════════════════════════════════════
+async def get_exchange(mode: str = 'live', reload: bool = False):
+    """The process-wide async client for a mode, created and prepared on first use"""
+    client = _shared.get(mode)
+    if client is None:
+        client = create_exchange(mode)
+        source = await prepare_exchange(client, mode, reload)
+        print(f"Exchange ready ({mode}): {len(client.markets)} markets from {source}")
+        _shared[mode] = client
+    return client
+
+
+async def close_shared():
+    """Close every shared client (call once at shutdown)"""
+    while _shared:
+        _, client = _shared.popitem()
+        await client.close()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Heartbeat channel between agent.py and a trading bot
+The agent creates a pipe and passes the write end to the bot (BOT_HEARTBEAT_FD).
+The bot reports loop progress and market-data age; the agent turns that into
+liveness metrics (stalls, loop lag, stale candles) instead of relying on the exit code.
+"""
+import asyncio
+import json
+import os
+import time
+from typing import Optional
+
+HEARTBEAT_FD_ENV = 'BOT_HEARTBEAT_FD'
+MIN_BEAT_INTERVAL_SEC = 1.0  # Bot side: at most one write per second
+
+
+class HeartbeatWriter:
+    """Bot side. A no-op when the bot is not started by the agent."""
+
+    def __init__(self, min_interval: float = MIN_BEAT_INTERVAL_SEC):
+        fd = os.environ.get(HEARTBEAT_FD_ENV)
+        self.fd = int(fd) if fd else None
+        self.min_interval = min_interval
+        self.loops = 0
+        self.last_sent = 0.0
+        self.loop_started = time.monotonic()
+        self.max_loop_sec = 0.0
+
+        if self.fd is not None:
+            try:
+                os.set_blocking(self.fd, False)
+            except OSError:
+                self.fd = None
+
+    def beat(self, last_candle_at: Optional[float] = None, phase: str = 'loop', force: bool = False):
+        """
+        Record one loop iteration and report it if the interval elapsed
+        last_candle_at: wall-clock time the last candle update was received
+        """
+        now = time.monotonic()
+        self.max_loop_sec = max(self.max_loop_sec, now - self.loop_started)
+        self.loop_started = now
+        self.loops += 1
+
+        if self.fd is None or (not force and now - self.last_sent < self.min_interval):
+            return
+
+        message = {
+            'loops': self.loops,
+            'phase': phase,
+            'max_loop_sec': round(self.max_loop_sec, 3),
+            'candle_age': round(time.time() - last_candle_at, 3) if last_candle_at else None,
+        }
+        try:
+            os.write(self.fd, (json.dumps(message) + '\n').encode())
+        except BlockingIOError:
+            return  # Agent is not reading - drop this beat rather than block the bot
+        except OSError:
+            self.fd = None  # Agent went away
+            return
+
+        self.last_sent = now
+        self.max_loop_sec = 0.0
+
+
+class HeartbeatMonitor:
+    """Agent side. Reads beats from the pipe and classifies bot liveness."""
+
+    def __init__(self, stall_sec: float, lag_warn_sec: float, max_candle_age_sec: float,
+                 startup_grace_sec: float):
+        self.stall_sec = stall_sec
+        self.lag_warn_sec = lag_warn_sec
+        self.max_candle_age_sec = max_candle_age_sec
+        self.startup_grace_sec = startup_grace_sec
+        self.reset()
+
+    def reset(self):
+        self.started_at = time.monotonic()
+        self.last_beat_at = None
+        self.last_beat = {}
+        self.beats = 0
+        self.max_lag_sec = 0.0
+        self.task = None
+
+    def open_pipe(self):
+        """Create a fresh pipe for a new bot process. Returns (read_fd, write_fd)."""
+        self.reset()
+        read_fd, write_fd = os.pipe()
+        os.set_inheritable(write_fd, True)
+        return read_fd, write_fd
+
+    def attach(self, read_fd: int):
+        """Start consuming beats from the read end of the pipe"""
+        self.task = asyncio.create_task(self._read_loop(read_fd))
+
+    async def _read_loop(self, read_fd: int):
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        pipe = os.fdopen(read_fd, 'rb', buffering=0)
+        transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+        try:
+            async for line in reader:
+                try:
+                    beat = json.loads(line)
+                except ValueError:
+                    continue
+                now = time.monotonic()
+                if self.last_beat_at is not None:
+                    self.max_lag_sec = max(self.max_lag_sec, now - self.last_beat_at)
+                self.last_beat_at = now
+                self.last_beat = beat
+                self.beats += 1
+        finally:
+            transport.close()
+
+    def close(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    def beat_age(self) -> Optional[float]:
+        return None if self.last_beat_at is None else time.monotonic() - self.last_beat_at
+
+    def status(self):
+        """
+        Classify liveness
+        Returns: (state, detail) with state in starting/ok/lagging/stalled/stale_data
+        """
+        age = self.beat_age()
+        if age is None:
+            waited = time.monotonic() - self.started_at
+            if waited > self.startup_grace_sec:
+                return 'stalled', f"no heartbeat {waited:.0f}s after start"
+            return 'starting', f"waiting for first heartbeat ({waited:.0f}s)"
+
+        if age > self.stall_sec:
+            return 'stalled', f"no loop progress for {age:.0f}s (phase: {self.last_beat.get('phase')})"
+
+        candle_age = self.last_beat.get('candle_age')
+        if candle_age is not None and candle_age + age > self.max_candle_age_sec:
+            return 'stale_data', f"last candle update {candle_age + age:.0f}s ago"
+
+        if age > self.lag_warn_sec:
+            return 'lagging', f"loop lag {age:.1f}s"
+        return 'ok', f"loop lag {age:.1f}s"
+
+    def summary(self) -> str:
+        candle_age = self.last_beat.get('candle_age')
+        candle_str = f"{candle_age:.1f}s" if candle_age is not None else "n/a"
+        return (f"Loops: {self.last_beat.get('loops', 0)} | Max loop: {self.last_beat.get('max_loop_sec', 0):.2f}s | "
+                f"Max beat gap: {self.max_lag_sec:.1f}s | Candle age: {candle_str}")
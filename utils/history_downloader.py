@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Parallel history downloader
+Splits a long OHLCV range into 1000-candle pages and fetches them concurrently instead
+of one page after another. Page starts are spaced to stay within a kline weight budget
+(Binance USD-M: weight 5 per 1000-candle page, 2400/min per IP), so the download leaves
+room for the trading calls; a ccxt client with enableRateLimit throttles at the same rate.
+
+  - pages the candle store already holds in full are not fetched again
+  - a page that fails with a network / rate-limit error is retried with backoff
+  - pages are merged by timestamp with merge_rows (vectorized, last copy wins)
+  - closed candles are written to the candle store (utils/candle_store.py); the forming
+    bar is only returned
+
+Usage:
+    downloader = HistoryDownloader(exchange, CandleStore())
+    rows = await downloader.download('ETH/USDT:USDT', '3m', since_ms)   # (n, 6) array up to now
+    downloader.summary()
+
+    python3 utils/history_downloader.py ETH/USDT:USDT 3m 365    # a year of 3m candles into data/candles
+"""
+import asyncio
+import os
+import sys
+import time
+from typing import Callable, Optional
+
+import numpy as np
+from ccxt.base.errors import NetworkError
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.candle_store import CandleStore, as_rows, merge_rows
+
+PAGE_LIMIT = 1000
+PAGE_WEIGHT = 5                 # Request weight of a klines call with limit 500-1000
+WEIGHT_BUDGET_PER_MIN = 1200    # Half of the IP limit; the rest stays with the trading calls
+MAX_CONCURRENT = 4              # Pages in flight at once
+PAGE_RETRIES = 3
+RETRY_DELAY_SEC = 1.0           # Doubled on each retry of a page
+
+
+class HistoryDownloader:
+    def __init__(self, exchange, store: Optional[CandleStore] = None, max_concurrent: int = MAX_CONCURRENT,
+                 weight_per_min: float = WEIGHT_BUDGET_PER_MIN, retries: int = PAGE_RETRIES,
+                 on_error: Optional[Callable[[str], None]] = None):
+        self.exchange = exchange
+        self.store = store
+        self.interval = 60 * PAGE_WEIGHT / weight_per_min  # Seconds between page starts
+        self.retries = retries
+        self.on_error = on_error
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._next_start = 0.0
+        self.stats = {'pages': 0, 'stored': 0, 'retries': 0, 'failed': 0, 'rows': 0, 'seconds': 0.0}
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"{s['rows']} candles, {s['pages']} page(s) fetched, {s['stored']} from store"
+                + (f", {s['retries']} retried" if s['retries'] else '')
+                + (f", {s['failed']} failed" if s['failed'] else '')
+                + f" in {s['seconds']:.1f}s")
+
+    async def download(self, symbol: str, timeframe: str, since: int, until: Optional[int] = None) -> np.ndarray:
+        """
+        Candles with since <= timestamp < until (default: up to and including the forming bar)
+        Rows of pages that failed every retry are missing from the result: check
+        stats['failed'] before using it (a repeated download skips the pages already stored)
+        """
+        start_time = time.perf_counter()
+        tf_ms = self.exchange.parse_timeframe(timeframe) * 1000
+        now = int(time.time() * 1000)
+        until = until or now + 1
+        first = -(-since // tf_ms) * tf_ms
+
+        stored = self.store.read(symbol, timeframe, first, until) if self.store else as_rows([])
+        stored_ts = stored[:, 0]
+        pages = []
+        for page_start in range(first, until, PAGE_LIMIT * tf_ms):
+            page_end = min(page_start + PAGE_LIMIT * tf_ms, until)
+            expected = -(-(page_end - page_start) // tf_ms)
+            held = np.searchsorted(stored_ts, page_end) - np.searchsorted(stored_ts, page_start)
+            if held >= expected:
+                self.stats['stored'] += 1
+            else:
+                pages.append((page_start, expected))
+
+        results = await asyncio.gather(*(self._fetch_page(symbol, timeframe, page_start, limit)
+                                         for page_start, limit in pages))
+        fetched = merge_rows(*[rows for rows in results if rows is not None])
+        fetched = fetched[(fetched[:, 0] >= first) & (fetched[:, 0] < until)]
+        if self.store is not None:
+            closed = fetched[fetched[:, 0] + tf_ms <= now]
+            if len(closed):
+                self.store.write(symbol, timeframe, closed)
+
+        rows = merge_rows(stored, fetched)
+        self.stats['rows'] = len(rows)
+        self.stats['seconds'] = time.perf_counter() - start_time
+        return rows
+
+    async def _pace(self):
+        """Space page starts by self.interval, whatever the concurrency"""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        start = max(now, self._next_start)
+        self._next_start = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def _fetch_page(self, symbol: str, timeframe: str, since: int, limit: int) -> Optional[np.ndarray]:
+        async with self._slots:
+            for attempt in range(self.retries + 1):
+                await self._pace()
+                try:
+                    rows = await self.exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+                    self.stats['pages'] += 1
+                    return as_rows(rows)
+                except NetworkError as e:  # Includes rate-limit, DDoS-protection and timeout errors
+                    if attempt == self.retries:
+                        self._error(f"History page {since} failed after {self.retries} retries: {type(e).__name__}: {e}")
+                        break
+                    self.stats['retries'] += 1
+                    await asyncio.sleep(RETRY_DELAY_SEC * 2 ** attempt)
+        self.stats['failed'] += 1
+        return None
+
+    def _error(self, message: str):
+        if self.on_error:
+            self.on_error(message)
+
+
+async def main():
+    from utils.exchange_factory import create_exchange, prepare_exchange
+
+    if len(sys.argv) < 4:
+        print("Usage: python3 utils/history_downloader.py SYMBOL TIMEFRAME DAYS")
+        return
+    symbol, timeframe, days = sys.argv[1], sys.argv[2], float(sys.argv[3])
+    exchange = create_exchange('live', with_keys=False)
+    try:
+        await prepare_exchange(exchange, 'live')
+        store = CandleStore()
+        since = int((time.time() - days * 86400) * 1000)
+        downloader = HistoryDownloader(exchange, store, on_error=print)
+        await downloader.download(symbol, timeframe, since)
+        print(f"{symbol} {timeframe}: {downloader.summary()} → {store.path(symbol, timeframe)}")
+        if downloader.stats['failed']:
+            sys.exit(1)  # The stored history has holes; rerun to fetch only the missing pages
+    finally:
+        await exchange.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Conflating market-data buffer
+A pump task reads the websocket as fast as it delivers and keeps only the latest state
+per (symbol, timeframe); the strategy takes whatever is newest when it is ready. After a
+slow iteration (order placement, verification retries) it jumps straight to current
+data instead of replaying the backlog, and the skipped updates are counted.
+
+Kline rows are conflated per bar: the newest row of each bar timestamp is kept (the last
+CONFLATE_BARS bars), so a bar that closed during a stall still arrives with its final values.
+
+The same buffer can instead be fed from the shared-memory ring of market_data_daemon.py
+(pump_shm), so the strategy process runs without market-data websockets of its own.
+
+Redundant connections: FirstArrivalFeed sits between several pumps (one client each) and
+the buffer. An update is identified by (bar timestamp, cumulative volume) - volume only
+grows within a bar, so it orders a bar's updates like a sequence number. The first copy
+is passed on, later copies and older states are dropped, and every connection's lag
+behind the first arrival is measured. One stalled connection no longer stalls the bot.
+
+Usage:
+    market_data = ConflatingBuffer()
+    task = asyncio.create_task(pump_ohlcv(exchange, market_data, symbol, '3m'))
+    # or: pump_shm(market_data, symbol, '3m', on_final=bars.mark_final)
+    # or, N connections: feed = FirstArrivalFeed(market_data)
+    #     for i, client in enumerate(clients): pump_ohlcv(client, feed.connection(f'ws{i}'), symbol, '3m')
+    rows = await market_data.take((symbol, '3m'))     # newest rows, oldest first
+    market_data.stats[(symbol, '3m')]                 # received / delivered / conflated
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from utils.shm_ring import KIND_BAR, KIND_BAR_FINAL, KIND_TICK, ShmRing, ring_name, timeframe_ms
+
+CONFLATE_BARS = 2        # Bars kept per key between takes (forming bar + the one before)
+PUMP_RETRY_SEC = 1.0     # Pause after a failed watch call
+SHM_POLL_SEC = 0.005     # Ring poll interval of pump_shm
+TICK_TIMEFRAME = 'tick'  # Buffer key (symbol, 'tick') for ticks relayed by pump_shm
+DEDUPE_WINDOW = 256      # Recent update ids remembered per key by FirstArrivalFeed
+
+
+class ConflatingBuffer:
+    def __init__(self, bars: int = CONFLATE_BARS):
+        self.bars = bars
+        self._pending: Dict[Hashable, Dict[int, list]] = {}
+        self._ready: Dict[Hashable, asyncio.Event] = {}
+        self._puts: Dict[Hashable, int] = {}
+        self.stats: Dict[Hashable, Dict[str, int]] = {}
+
+    def _event(self, key: Hashable) -> asyncio.Event:
+        if key not in self._ready:
+            self._ready[key] = asyncio.Event()
+            self.stats[key] = {'received': 0, 'delivered': 0, 'conflated': 0}
+        return self._ready[key]
+
+    def put(self, key: Hashable, rows: List[list]):
+        """Store one update (ccxt rows, oldest first); replaces older states of the same bars"""
+        if not rows:
+            return
+        event = self._event(key)
+        pending = self._pending.setdefault(key, {})
+        for row in rows:
+            pending[int(row[0])] = row
+        if len(pending) > self.bars:
+            for ts in sorted(pending)[:-self.bars]:
+                del pending[ts]
+        self._puts[key] = self._puts.get(key, 0) + 1
+        self.stats[key]['received'] += 1
+        event.set()
+
+    def take_nowait(self, key: Hashable) -> Optional[List[list]]:
+        """Newest rows since the last take (None if nothing new)"""
+        pending = self._pending.pop(key, None)
+        if not pending:
+            return None
+        self._event(key).clear()
+        puts = self._puts.pop(key, 0)
+        stats = self.stats[key]
+        stats['delivered'] += 1
+        stats['conflated'] += max(0, puts - 1)
+        return [pending[ts] for ts in sorted(pending)]
+
+    async def take(self, key: Hashable) -> List[list]:
+        """Wait for the next update of key and return the newest rows"""
+        while True:
+            rows = self.take_nowait(key)
+            if rows is not None:
+                return rows
+            await self._event(key).wait()
+
+    def conflated(self, key: Hashable) -> int:
+        return self.stats.get(key, {}).get('conflated', 0)
+
+
+class FirstArrivalFeed:
+    """Dedupes the same stream arriving over several connections; the first copy goes to buffer"""
+
+    def __init__(self, buffer: ConflatingBuffer, window: int = DEDUPE_WINDOW):
+        self.buffer = buffer
+        self.bars = buffer.bars
+        self.window = window
+        self._seen: Dict[Hashable, 'OrderedDict[Tuple[int, float], float]'] = {}
+        self._newest: Dict[Hashable, Tuple[int, float]] = {}
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    def connection(self, name: str) -> '_FeedConnection':
+        self.stats.setdefault(name, {'received': 0, 'first': 0, 'late': 0, 'stale': 0,
+                                     'avg_lag_ms': 0.0, 'max_lag_ms': 0.0, 'last_rx': 0.0})
+        return _FeedConnection(self, name)
+
+    def offer(self, name: str, key: Hashable, rows: List[list]) -> bool:
+        """One update from connection name; True when it was the first copy (and was put)"""
+        if not rows:
+            return False
+        now = time.perf_counter()
+        stats = self.stats[name]
+        stats['received'] += 1
+        stats['last_rx'] = time.time()
+        update_id = (int(rows[-1][0]), float(rows[-1][5]))
+        seen = self._seen.setdefault(key, OrderedDict())
+
+        first_rx = seen.get(update_id)
+        if first_rx is not None:
+            lag_ms = (now - first_rx) * 1000
+            stats['late'] += 1
+            stats['avg_lag_ms'] += (lag_ms - stats['avg_lag_ms']) / stats['late']
+            stats['max_lag_ms'] = max(stats['max_lag_ms'], lag_ms)
+            return False
+        newest = self._newest.get(key)
+        if newest is not None and update_id < newest:
+            stats['stale'] += 1  # A state the other connections have already moved past
+            return False
+
+        seen[update_id] = now
+        if len(seen) > self.window:
+            seen.popitem(last=False)
+        self._newest[key] = update_id
+        stats['first'] += 1
+        self.buffer.put(key, rows)
+        return True
+
+    def summary(self) -> str:
+        return ' | '.join(f"{name}: {s['first']}/{s['received']} first, lag avg {s['avg_lag_ms']:.0f}ms "
+                          f"max {s['max_lag_ms']:.0f}ms" + (f", {s['stale']} stale" if s['stale'] else '')
+                          for name, s in self.stats.items())
+
+
+class _FeedConnection:
+    """The buffer interface pump_ohlcv writes to, for one connection of a FirstArrivalFeed"""
+
+    def __init__(self, feed: FirstArrivalFeed, name: str):
+        self.feed = feed
+        self.name = name
+        self.bars = feed.bars
+
+    def put(self, key: Hashable, rows: List[list]):
+        self.feed.offer(self.name, key, rows)
+
+
+async def pump_ohlcv(exchange, buffer, symbol: str, timeframe: str,
+                     on_error: Optional[Callable[[Exception], None]] = None):
+    """
+    Feed watch_ohlcv updates into buffer under (symbol, timeframe) until cancelled
+    buffer: a ConflatingBuffer, or a FirstArrivalFeed connection
+    """
+    key = (symbol, timeframe)
+    while True:
+        try:
+            rows = await exchange.watch_ohlcv(symbol, timeframe)
+            buffer.put(key, [list(r) for r in rows[-buffer.bars:]])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if on_error:
+                on_error(e)
+            await asyncio.sleep(PUMP_RETRY_SEC)
+
+
+async def pump_shm(buffer: ConflatingBuffer, symbol: str, timeframe: str,
+                   on_final: Optional[Callable[[list], None]] = None,
+                   on_error: Optional[Callable[[Exception], None]] = None,
+                   poll_sec: float = SHM_POLL_SEC):
+    """
+    Feed records from the market-data ring into buffer until cancelled
+    Bars of timeframe go to (symbol, timeframe) as ccxt rows; ticks go to (symbol, 'tick')
+    as [ts, bid, ask, bid_qty, ask_qty, last]. on_final(row) is called before a bar the
+    exchange flagged final is put. Waits for the writer (on_error once, then retries quietly).
+    """
+    bar_key, tick_key = (symbol, timeframe), (symbol, TICK_TIMEFRAME)
+    tf_ms = timeframe_ms(timeframe)
+    ring, waiting = None, 0
+    try:
+        while ring is None:
+            try:
+                ring = ShmRing.attach(ring_name(symbol))
+            except FileNotFoundError as e:
+                if on_error and waiting == 0:
+                    on_error(e)
+                waiting += 1
+                await asyncio.sleep(PUMP_RETRY_SEC)
+        reader = ring.reader()
+        lost = 0
+        while True:
+            bars, ticks = [], []
+            for kind, record_tf, ts, values in reader.poll():
+                if kind == KIND_TICK:
+                    ticks.append([ts, *values])
+                elif record_tf == tf_ms and kind in (KIND_BAR, KIND_BAR_FINAL):
+                    row = [ts, *values]
+                    if kind == KIND_BAR_FINAL and on_final:
+                        on_final(row)
+                    bars.append(row)
+            if bars:
+                buffer.put(bar_key, bars)
+            if ticks:
+                buffer.put(tick_key, ticks[-buffer.bars:])
+            if reader.lost > lost and on_error:
+                on_error(RuntimeError(f"{reader.lost - lost} ring record(s) overwritten before they were read"))
+            lost = reader.lost
+            await asyncio.sleep(poll_sec)
+    finally:
+        if ring is not None:
+            ring.close()
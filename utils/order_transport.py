@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Order transport
+Sends the bot's latency-critical orders either over REST (the ccxt default) or over
+Binance's websocket trading API (ws-fapi order.place / order.cancel) on one persistent
+connection. Websocket requests carry a correlation id, so several can be in flight at once
+(a reduce-only exit and its replacement stop go out back to back instead of as one HTTP
+batch). Requests are signed one by one: ws-fapi session.logon needs Ed25519 keys and the
+bot's keys are HMAC.
+
+Falling back to REST is safe because every websocket order carries its own client order id:
+  - the exchange rejected it (invalid order, margin, ...) → the error is raised as with REST
+  - the connection failed or timed out before the ack → the order is looked up by its
+    client id over REST and only re-sent (same id, so Binance refuses a duplicate) when
+    it does not exist; the websocket path then rests for WS_RETRY_SEC
+
+Usage:
+    transport = create_order_transport(exchange, 'ws')     # or 'rest'
+    await transport.start()                                # opens the websocket (False: REST for now)
+    order = await transport.create_market_order(symbol, 'buy', qty)
+    legs = await transport.create_orders([...])            # failed legs are Exception instances
+    transport.summary()                                    # per path: count / avg / max ms, fallbacks
+"""
+import asyncio
+import itertools
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from ccxt.base.errors import NetworkError, NotSupported, OrderNotFound
+
+WS_TIMEOUT_SEC = 5.0     # Ack deadline of a websocket request before it counts as lost
+WS_RETRY_SEC = 30.0      # REST only for this long after a websocket failure
+
+
+def create_order_transport(exchange, kind: str = 'rest') -> 'RestTransport':
+    if kind == 'ws':
+        return WsApiTransport(exchange)
+    if kind != 'rest':
+        raise ValueError(f"Unknown order transport {kind!r} (use 'rest' or 'ws')")
+    return RestTransport(exchange)
+
+
+class RestTransport:
+    name = 'rest'
+
+    def __init__(self, exchange):
+        self.exchange = exchange
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    def _record(self, path: str, start: float):
+        ms = (time.perf_counter() - start) * 1000
+        stats = self.stats.setdefault(path, {'count': 0, 'avg_ms': 0.0, 'max_ms': 0.0})
+        stats['count'] += 1
+        stats['avg_ms'] += (ms - stats['avg_ms']) / stats['count']
+        stats['max_ms'] = max(stats['max_ms'], ms)
+
+    def summary(self) -> str:
+        return ' | '.join(f"{path}: {s['count']} avg {s['avg_ms']:.1f}ms max {s['max_ms']:.1f}ms"
+                          for path, s in self.stats.items()) or 'no orders'
+
+    async def start(self) -> bool:
+        return True
+
+    # ── orders ──
+    async def create_order(self, symbol: str, type: str, side: str, amount, price=None,
+                           params: Optional[Dict[str, Any]] = None) -> dict:
+        start = time.perf_counter()
+        order = await self.exchange.create_order(symbol, type, side, amount, price, params or {})
+        self._record('rest', start)
+        return order
+
+    async def create_market_order(self, symbol: str, side: str, amount,
+                                  params: Optional[Dict[str, Any]] = None) -> dict:
+        return await self.create_order(symbol, 'market', side, amount, None, params)
+
+    async def create_orders(self, orders: List[dict]) -> list:
+        """Several orders in one go; returns one result per order, an Exception for a failed leg"""
+        if getattr(self.exchange, 'has', {}).get('createOrders'):
+            start = time.perf_counter()
+            try:
+                results = await self.exchange.create_orders(orders)
+                self._record('rest_batch', start)
+                # Rejected batch entries come back without an id
+                return [r if r.get('id') else Exception(str(r.get('info', r))) for r in results]
+            except NotSupported:
+                pass  # e.g. conditional (algo) orders cannot be batched on USD-M since the algo-order migration
+        return list(await asyncio.gather(
+            *(self.create_order(o['symbol'], o['type'], o['side'], o['amount'], o.get('price'), o.get('params'))
+              for o in orders),
+            return_exceptions=True,
+        ))
+
+    async def cancel_order(self, order_id: str, symbol: str, params: Optional[Dict[str, Any]] = None) -> dict:
+        """params: {'trigger': True} for a stop order (REST and ws-fapi cancels then go to the algo-order endpoint)"""
+        start = time.perf_counter()
+        result = await self.exchange.cancel_order(order_id, symbol, params or {})
+        self._record('rest_cancel', start)
+        return result
+
+
+class WsApiTransport(RestTransport):
+    name = 'ws'
+
+    def __init__(self, exchange, timeout: float = WS_TIMEOUT_SEC, retry_sec: float = WS_RETRY_SEC):
+        super().__init__(exchange)
+        self.timeout = timeout
+        self.retry_sec = retry_sec
+        self.ws_down_until = 0.0
+        self.fallbacks = 0
+        self._ids = itertools.count(1)
+        self._prefix = f"ocws{os.getpid() % 100000}t{int(time.time()) % 100000}"
+
+    def summary(self) -> str:
+        return super().summary() + (f" | {self.fallbacks} REST fallback(s)" if self.fallbacks else '')
+
+    def ws_available(self) -> bool:
+        return time.monotonic() >= self.ws_down_until and hasattr(self.exchange, 'create_order_ws')
+
+    def _ws_failed(self):
+        self.fallbacks += 1
+        self.ws_down_until = time.monotonic() + self.retry_sec
+
+    async def start(self) -> bool:
+        """
+        Open the websocket and check the keys before the first order needs it
+        False when it failed (orders go over REST until WS_RETRY_SEC has passed)
+        """
+        if not hasattr(self.exchange, 'fetch_balance_ws'):
+            self.ws_down_until = float('inf')
+            return False
+        try:
+            await asyncio.wait_for(self.exchange.fetch_balance_ws({'method': 'v2/account.balance'}), self.timeout)
+            return True
+        except Exception:
+            self._ws_failed()
+            return False
+
+    # ── orders ──
+    async def create_order(self, symbol: str, type: str, side: str, amount, price=None,
+                           params: Optional[Dict[str, Any]] = None) -> dict:
+        if not self.ws_available():
+            return await super().create_order(symbol, type, side, amount, price, params)
+
+        params = dict(params or {})
+        client_id = params.setdefault('clientOrderId', f"{self._prefix}n{next(self._ids)}")
+        start = time.perf_counter()
+        try:
+            order = await asyncio.wait_for(
+                self.exchange.create_order_ws(symbol, type, side, amount, price, params), self.timeout)
+            self._record('ws', start)
+            return order
+        except NotSupported:
+            self.ws_down_until = float('inf')
+        except (NetworkError, asyncio.TimeoutError):
+            # Ack lost: the order may or may not exist
+            self._ws_failed()
+            existing = await self._find_order(symbol, client_id, params)
+            if existing:
+                return existing
+        return await super().create_order(symbol, type, side, amount, price, params)
+
+    async def create_orders(self, orders: List[dict]) -> list:
+        """Pipelined: every leg is sent before the first ack arrives"""
+        if not self.ws_available():
+            return await super().create_orders(orders)
+        return list(await asyncio.gather(
+            *(self.create_order(o['symbol'], o['type'], o['side'], o['amount'], o.get('price'), o.get('params'))
+              for o in orders),
+            return_exceptions=True,
+        ))
+
+    async def cancel_order(self, order_id: str, symbol: str, params: Optional[Dict[str, Any]] = None) -> dict:
+        if not self.ws_available():
+            return await super().cancel_order(order_id, symbol, params)
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(self.exchange.cancel_order_ws(order_id, symbol, params or {}), self.timeout)
+            self._record('ws_cancel', start)
+            return result
+        except (NetworkError, NotSupported, asyncio.TimeoutError):
+            # A repeated cancel is harmless: at worst REST reports the order as already gone
+            self._ws_failed()
+        return await super().cancel_order(order_id, symbol, params)
+
+    async def _find_order(self, symbol: str, client_id: str, params: Dict[str, Any]) -> Optional[dict]:
+        conditional = any(params.get(k) is not None for k in ('stopPrice', 'triggerPrice', 'stopLossPrice', 'takeProfitPrice'))
+        lookup = {'clientOrderId': client_id}
+        if conditional:
+            lookup['trigger'] = True
+        try:
+            return await self.exchange.fetch_order(None, symbol, lookup)
+        except OrderNotFound:
+            return None
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Housekeeping scheduler
+Runs periodic jobs (reconciliation, cleanup, snapshots, status) as their own asyncio
+tasks, so the market-data/decision loop never waits on them. Each job has an interval
+(start to start) with jitter, an optional timeout and a priority; at most max_concurrent
+jobs run at once and, when several are due, the highest priority goes first.
+
+Waits use the event loop's timers rather than asyncio.sleep, so patching asyncio.sleep
+(e.g. in the benchmarks) does not turn the intervals into a busy loop.
+
+Usage:
+    scheduler = HousekeepingScheduler(on_error=log)
+    scheduler.add('reconcile', reconcile_job, interval=30, timeout=20, priority=10)
+    scheduler.add('status', print_status, interval=5)
+    scheduler.start()
+    ...
+    scheduler.stats['reconcile']      # runs / failures / timeouts / last_ms / avg_ms / max_ms
+    await scheduler.stop()
+"""
+import asyncio
+import heapq
+import inspect
+import itertools
+import random
+import time
+from typing import Callable, Dict, Optional
+
+
+class Job:
+    def __init__(self, name: str, fn: Callable, interval: float, jitter: float, timeout: Optional[float],
+                 priority: int, initial_delay: float):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.jitter = jitter
+        self.timeout = timeout
+        self.priority = priority
+        self.initial_delay = initial_delay
+        self.stats = {'runs': 0, 'failures': 0, 'timeouts': 0, 'last_ms': 0.0, 'avg_ms': 0.0, 'max_ms': 0.0}
+
+    def record(self, duration_ms: float):
+        stats = self.stats
+        stats['runs'] += 1
+        stats['last_ms'] = duration_ms
+        stats['avg_ms'] += (duration_ms - stats['avg_ms']) / stats['runs']
+        stats['max_ms'] = max(stats['max_ms'], duration_ms)
+
+    def next_delay(self, elapsed: float) -> float:
+        interval = self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+        return max(0.0, interval - elapsed)
+
+
+class _PriorityGate:
+    """Semaphore that hands free slots to the highest-priority waiter"""
+
+    def __init__(self, slots: int):
+        self.free = slots
+        self.waiters = []  # heap of (-priority, seq, future)
+        self._seq = itertools.count()
+
+    async def acquire(self, priority: int):
+        if self.free > 0 and not self.waiters:
+            self.free -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (-priority, next(self._seq), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # Slot was handed over just before the cancellation
+            raise
+
+    def release(self):
+        while self.waiters:
+            _, _, future = heapq.heappop(self.waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.free += 1
+
+
+class HousekeepingScheduler:
+    def __init__(self, max_concurrent: int = 1, on_error: Optional[Callable[[str], None]] = None):
+        self.jobs: Dict[str, Job] = {}
+        self.on_error = on_error
+        self._gate = _PriorityGate(max_concurrent)
+        self._tasks = []
+        self._stopping = None
+
+    @property
+    def stats(self) -> Dict[str, dict]:
+        return {name: job.stats for name, job in self.jobs.items()}
+
+    def add(self, name: str, fn: Callable, interval: float, jitter: float = 0.1, timeout: Optional[float] = None,
+            priority: int = 0, initial_delay: Optional[float] = None):
+        """
+        fn: sync or async callable without arguments
+        initial_delay: first run after this many seconds (default: one interval)
+        """
+        if name in self.jobs:
+            raise ValueError(f"Job {name} already scheduled")
+        self.jobs[name] = Job(name, fn, interval, jitter, timeout, priority,
+                              interval if initial_delay is None else initial_delay)
+
+    def start(self):
+        self._stopping = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run(job), name=f"housekeeping:{job.name}")
+                       for job in self.jobs.values()]
+
+    async def stop(self):
+        if self._stopping:
+            self._stopping.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def summary(self) -> str:
+        return ' | '.join(f"{name}: {s['runs']} runs avg {s['avg_ms']:.0f}ms max {s['max_ms']:.0f}ms"
+                          + (f" ({s['failures']} failed, {s['timeouts']} timed out)" if s['failures'] or s['timeouts'] else '')
+                          for name, s in self.stats.items())
+
+    async def _wait(self, delay: float) -> bool:
+        """Wait delay seconds; True when the scheduler is stopping"""
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=delay)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _run(self, job: Job):
+        delay = job.initial_delay
+        while not await self._wait(delay):
+            await self._gate.acquire(job.priority)
+            start = time.perf_counter()
+            try:
+                result = job.fn()
+                if inspect.isawaitable(result):
+                    await asyncio.wait_for(result, job.timeout) if job.timeout else await result
+            except asyncio.TimeoutError:
+                job.stats['timeouts'] += 1
+                self._error(f"Housekeeping job {job.name} timed out after {job.timeout}s")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job.stats['failures'] += 1
+                self._error(f"Housekeeping job {job.name} failed: {type(e).__name__}: {e}")
+            finally:
+                self._gate.release()
+            elapsed = time.perf_counter() - start
+            job.record(elapsed * 1000)
+            delay = job.next_delay(elapsed)
+
+    def _error(self, message: str):
+        if self.on_error:
+            self.on_error(message)
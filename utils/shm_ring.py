@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Shared-memory ring buffer for market data
+One writer process (market_data_daemon.py) appends fixed-size records; any number of
+reader processes follow it without locks. The ring lives in multiprocessing.shared_memory
+and outlives both sides, so either can be restarted or profiled on its own.
+
+Sequence protocol (per-slot seqlock):
+  writer, record n in slot n % slots:  slot.seq = 2n+1  →  fields  →  slot.seq = 2n+2
+                                       then header.head = n+1
+  reader, record n:  s1 = slot.seq; copy fields; s2 = slot.seq
+                     valid when s1 == s2 == 2n+2 (otherwise the writer lapped the reader)
+A reader that falls more than `slots` records behind skips to the oldest record still in
+the ring and counts the records it lost.
+
+Records are read through NumPy views on the shared buffer (no copies of the ring);
+only the fields of each new record are copied out.
+
+Usage:
+    ring = ShmRing.create(ring_name('ETH/USDT:USDT'))      # writer
+    ring.write_bar(ts_ms, '3m', o, h, l, c, v)             # final=True once the bar closed
+    ring.write_tick(ts_ms, bid, ask, bid_qty, ask_qty)
+
+    ring = ShmRing.attach(ring_name('ETH/USDT:USDT'))      # reader
+    reader = ring.reader()
+    for kind, timeframe_ms, ts, values in reader.poll(): ...
+"""
+import os
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+MAGIC = 0x4F434D44  # 'OCMD'
+VERSION = 1
+DEFAULT_SLOTS = 4096
+
+KIND_BAR = 1        # values: open, high, low, close, volume
+KIND_TICK = 2       # values: bid, ask, bid_qty, ask_qty, last (0 when unknown)
+KIND_BAR_FINAL = 3  # A bar the exchange flagged final (same values as KIND_BAR)
+
+HEADER = np.dtype([
+    ('magic', '<u4'), ('version', '<u4'), ('slots', '<u8'),
+    ('head', '<u8'),            # Records written so far
+    ('writer_pid', '<u8'),
+    ('last_write_ns', '<u8'),   # time.time_ns() of the last record
+    ('_pad', '<u8', (2,)),
+])
+RECORD = np.dtype([
+    ('seq', '<u8'), ('kind', '<u4'), ('timeframe_ms', '<u4'), ('ts', '<i8'), ('values', '<f8', (5,)),
+])
+
+
+def ring_name(symbol: str, prefix: str = 'openclaw_md') -> str:
+    """Shared-memory name for a symbol's market data"""
+    return f"{prefix}_{symbol.split(':')[0].replace('/', '')}"
+
+
+def timeframe_ms(timeframe: str) -> int:
+    units = {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000}
+    return int(timeframe[:-1]) * units[timeframe[-1]]
+
+
+class ShmRing:
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        self.header = np.ndarray((), dtype=HEADER, buffer=shm.buf, offset=0)
+        if int(self.header['magic']) != MAGIC or int(self.header['version']) != VERSION:
+            raise ValueError(f"{shm.name} is not a v{VERSION} market-data ring")
+        self.slots = int(self.header['slots'])
+        self.records = np.ndarray((self.slots,), dtype=RECORD, buffer=shm.buf, offset=HEADER.itemsize)
+        # Field views: element access without building structured scalars
+        self.seq = self.records['seq']
+        self.kind = self.records['kind']
+        self.tf = self.records['timeframe_ms']
+        self.ts = self.records['ts']
+        self.values = self.records['values']
+
+    # ── lifecycle ──
+    @classmethod
+    def create(cls, name: str, slots: int = DEFAULT_SLOTS) -> 'ShmRing':
+        """Writer side: attach to an existing ring (a restarted writer continues its sequence) or create it"""
+        try:
+            ring = cls.attach(name)
+            if ring.slots == slots:
+                ring.header['writer_pid'] = os.getpid()
+                return ring
+            ring.close()
+            cls.unlink(name)
+        except FileNotFoundError:
+            pass
+        shm = shared_memory.SharedMemory(name=name, create=True, size=HEADER.itemsize + slots * RECORD.itemsize)
+        _untrack(shm)
+        header = np.ndarray((), dtype=HEADER, buffer=shm.buf, offset=0)
+        header[()] = (MAGIC, VERSION, slots, 0, os.getpid(), 0, (0, 0))
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> 'ShmRing':
+        """Reader side (FileNotFoundError until the writer has created the ring)"""
+        shm = shared_memory.SharedMemory(name=name, create=False)
+        _untrack(shm)
+        return cls(shm, owner=False)
+
+    @staticmethod
+    def unlink(name: str):
+        shm = shared_memory.SharedMemory(name=name, create=False)
+        shm.close()
+        shm.unlink()
+
+    def close(self):
+        # Drop the views before the mapping goes away
+        self.header = self.records = self.seq = self.kind = self.tf = self.ts = self.values = None
+        self.shm.close()
+
+    # ── writer ──
+    def write(self, kind: int, tf_ms: int, ts: int, values):
+        n = int(self.header['head'])
+        i = n % self.slots
+        self.seq[i] = 2 * n + 1
+        self.kind[i] = kind
+        self.tf[i] = tf_ms
+        self.ts[i] = ts
+        self.values[i] = values
+        self.seq[i] = 2 * n + 2
+        self.header['last_write_ns'] = time.time_ns()
+        self.header['head'] = n + 1
+
+    def write_bar(self, ts: int, timeframe: str, open_: float, high: float, low: float, close: float, volume: float,
+                  final: bool = False):
+        self.write(KIND_BAR_FINAL if final else KIND_BAR, timeframe_ms(timeframe), ts, (open_, high, low, close, volume))
+
+    def write_tick(self, ts: int, bid: float, ask: float, bid_qty: float = 0.0, ask_qty: float = 0.0, last: float = 0.0):
+        self.write(KIND_TICK, 0, ts, (bid, ask, bid_qty, ask_qty, last))
+
+    # ── reader ──
+    def reader(self, from_start: bool = False) -> 'RingReader':
+        return RingReader(self, 0 if from_start else max(0, int(self.header['head']) - 1))
+
+    def age_sec(self) -> Optional[float]:
+        """Seconds since the writer's last record (None before the first)"""
+        last = int(self.header['last_write_ns'])
+        return (time.time_ns() - last) / 1e9 if last else None
+
+
+class RingReader:
+    """One consumer's position in the ring"""
+
+    def __init__(self, ring: ShmRing, start: int = 0):
+        self.ring = ring
+        self.next = start
+        self.lost = 0  # Records overwritten before they were read
+
+    def poll(self) -> List[Tuple[int, int, int, tuple]]:
+        """New records since the last poll: (kind, timeframe_ms, ts, values)"""
+        ring = self.ring
+        slots = ring.slots
+        head = int(ring.header['head'])
+        if head < self.next:
+            self.next = 0  # Ring was recreated
+        if head - self.next > slots:
+            self.lost += head - self.next - slots
+            self.next = head - slots
+
+        out = []
+        seq, kind, tf, ts, values = ring.seq, ring.kind, ring.tf, ring.ts, ring.values
+        while self.next < head:
+            i = self.next % slots
+            expected = 2 * self.next + 2
+            s1 = int(seq[i])
+            record = (int(kind[i]), int(tf[i]), int(ts[i]), tuple(values[i].tolist()))
+            s2 = int(seq[i])
+            if s1 == s2 == expected:
+                out.append(record)
+                self.next += 1
+                continue
+            # Lapped while reading: jump to the oldest record that is still intact
+            head = int(ring.header['head'])
+            self.lost += max(1, head - slots - self.next)
+            self.next = max(self.next + 1, head - slots + 1)
+        return out
+
+
+def _untrack(shm: shared_memory.SharedMemory):
+    """
+    The resource tracker unlinks segments when the process that opened them exits;
+    the ring must survive restarts of either side, so it is removed explicitly instead
+    """
+    try:
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except Exception:
+        pass
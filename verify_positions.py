@@ -3,35 +3,27 @@
 Verify Actual Positions & Orders on Binance Futures
 Check what the API really shows vs what bot reports
 """
-import ccxt
 import sys
 sys.path.append('.')
-from config.api_keys import API_KEY, API_SECRET
+from utils.exchange_broker import connect_exchange_sync
+from utils.account_sync import index_positions, index_orders, exchange_issues
 import json
 
 print("="*60)
 print("VERIFY LIVE POSITIONS & ORDERS")
 print("="*60)
 
-exchange = ccxt.binanceusdm({
-    'apiKey': API_KEY,
-    'secret': API_SECRET,
-    'enableRateLimit': True,
-    'options': {
-        'defaultType': 'future',
-        'adjustForTimeDifference': True,
-    },
-    'verbose': False,
-})
+# Broker if running, else a direct client with cached markets
+exchange = connect_exchange_sync('live')
 
 try:
-    # Fetch positions
+    # Fetch positions (all symbols, one call)
     print("\n[1/3] Fetching open positions...")
-    positions = exchange.fetch_positions(['ETH/USDT:USDT'])
+    positions = index_positions(exchange.fetch_positions())
     print(f"      Total positions: {len(positions)}")
     
     if positions:
-        for pos in positions:
+        for pos in positions.values():
             print(f"\n      Symbol: {pos['symbol']}")
             print(f"        Contracts: {pos['contracts']}")
             print(f"        Collateral: {pos.get('collateral', 'N/A')}")
@@ -43,14 +35,14 @@ try:
     else:
         print("      ✓ No open positions")
     
-    # Fetch open orders
+    # Fetch open orders (all symbols; stop orders are conditional and fetched separately)
     print("\n[2/3] Fetching open orders...")
-    orders = exchange.fetch_open_orders('ETH/USDT:USDT')
+    orders = exchange.fetch_open_orders() + exchange.fetch_open_orders(params={'trigger': True})
     print(f"      Total open orders: {len(orders)}")
     
     if orders:
         for order in orders:
-            print(f"\n      Order ID: {order['id']}")
+            print(f"\n      Order ID: {order['id']} ({order['symbol']})")
             print(f"        Type: {order['type']}")
             print(f"        Side: {order['side']}")
             print(f"        Amount: {order['amount']}")
@@ -59,6 +51,12 @@ try:
     else:
         print("      ✓ No open orders")
     
+    # Protection check per symbol
+    orders_by_symbol = index_orders(orders)
+    for symbol in sorted(set(positions) | set(orders_by_symbol)):
+        for issue in exchange_issues(positions.get(symbol), orders_by_symbol.get(symbol, [])):
+            print(f"\n      ⚠️ {symbol}: {issue['kind']} - {issue['detail']}")
+    
     # Fetch balance
     print("\n[3/3] Fetching wallet balance...")
     balance = exchange.fetch_balance(params={'type': 'future'})